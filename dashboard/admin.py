@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Country, Indicator, CountryData, HappinessData
+from .models import (
+    Country, Indicator, CountryData, HappinessData, RegionalAggregate, SyncLedger, IngestRun, DatasetVersion
+)
 
 
 @admin.register(Country)
@@ -20,15 +22,43 @@ class IndicatorAdmin(admin.ModelAdmin):
 
 @admin.register(CountryData)
 class CountryDataAdmin(admin.ModelAdmin):
-    list_display = ['country', 'indicator', 'date', 'value']
-    list_filter = ['country', 'indicator', 'date']
+    list_display = ['country', 'indicator', 'year', 'value']
+    list_filter = ['country', 'indicator', 'year']
     search_fields = ['country__name', 'indicator__name']
-    ordering = ['country', 'indicator', 'date']
+    ordering = ['country', 'indicator', 'year']
 
 
 @admin.register(HappinessData)
 class HappinessDataAdmin(admin.ModelAdmin):
-    list_display = ['country_name', 'year', 'ladder_score', 'region']
+    list_display = ['country_name', 'year', 'ladder_score', 'rank', 'region']
     list_filter = ['year', 'region']
     search_fields = ['country_name']
-    ordering = ['-ladder_score', 'year']
\ No newline at end of file
+    ordering = ['-ladder_score', 'year']
+
+
+@admin.register(RegionalAggregate)
+class RegionalAggregateAdmin(admin.ModelAdmin):
+    list_display = ['region', 'income_level', 'year', 'metric', 'count', 'mean', 'median']
+    list_filter = ['metric', 'year', 'region', 'income_level']
+    ordering = ['metric', 'income_level', 'region', 'year']
+
+
+@admin.register(SyncLedger)
+class SyncLedgerAdmin(admin.ModelAdmin):
+    list_display = ['scope', 'key', 'last_updated', 'last_synced_at', 'record_count']
+    list_filter = ['scope']
+    search_fields = ['key']
+    ordering = ['scope', 'key']
+
+
+@admin.register(IngestRun)
+class IngestRunAdmin(admin.ModelAdmin):
+    list_display = ['id', 'status', 'started_at', 'finished_at']
+    list_filter = ['status']
+    ordering = ['-started_at']
+
+
+@admin.register(DatasetVersion)
+class DatasetVersionAdmin(admin.ModelAdmin):
+    list_display = ['name', 'version', 'updated_at']
+    ordering = ['name']
\ No newline at end of file
@@ -0,0 +1,241 @@
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import FloatField
+from django.db.models.functions import Cast
+
+from .facts import FACT_TABLE, UnknownIndicatorError, fact_columns, indicator_column, read_fact_rows
+from .models import Country, Indicator, CountryData, DatasetVersion
+
+logger = logging.getLogger(__name__)
+
+class AnalyticCube:
+    """Dense in-memory copy of CountryData for read-only queries.
+
+    ``values[c, i, y]`` holds indicator ``i`` for country ``c`` in year
+    ``years[y]`` as float64 with NaN for gaps. ``present``
+    marks the CountryData rows that exist, so rows stored with a null value
+    are still served, as ``value: None``. Codes map to array positions through
+    ``country_index`` and ``indicator_index``, and each country's region is
+    an integer code into ``regions``.
+    """
+
+    def __init__(self, version: str, countries: List[Tuple[str, str, str]], indicators: List[Tuple[str, str]],
+                 years: List[int]):
+        self.version = version
+        self.country_ids = [country_id for country_id, _, _ in countries]
+        self.country_names = [name for _, name, _ in countries]
+        self.country_index = {country_id: position for position, country_id in enumerate(self.country_ids)}
+        self.regions = sorted({region for _, _, region in countries if region})
+        region_index = {region: position for position, region in enumerate(self.regions)}
+        self.country_regions = np.array([region_index.get(region, -1) for _, _, region in countries], dtype=np.int32)
+
+        self.indicator_ids = [indicator_id for indicator_id, _ in indicators]
+        self.indicator_names = [name for _, name in indicators]
+        self.indicator_index = {indicator_id: position for position, indicator_id in enumerate(self.indicator_ids)}
+
+        self.years = np.array(years, dtype=np.int32)
+        self.first_year = years[0] if years else 0
+        shape = (len(self.country_ids), len(self.indicator_ids), len(years))
+        self.values = np.full(shape, np.nan)
+        self.present = np.zeros(shape, dtype=bool)
+        self.units = {}  # Non-empty units keyed by (country, indicator, year) position
+
+    @classmethod
+    def build(cls, version: str = None) -> 'AnalyticCube':
+        """Load every CountryData row from the database"""
+        started = time.perf_counter()
+        version = DatasetVersion.current() if version is None else version
+
+        data = list(
+            CountryData.objects.filter(year__isnull=False).order_by()
+            .annotate(value_float=Cast('value', FloatField()))
+            .values_list('country_id', 'indicator_id', 'year', 'value_float', 'unit')
+        )
+        years = sorted({row[2] for row in data})
+        if years:
+            years = list(range(years[0], years[-1] + 1))
+        cube = cls(
+            version,
+            list(Country.objects.order_by('id').values_list('id', 'name', 'region_value')),
+            list(Indicator.objects.order_by('id').values_list('id', 'name')),
+            years,
+        )
+
+        if data:
+            rows = [
+                (cube.country_index[country_id], cube.indicator_index[indicator_id], year - cube.first_year,
+                 np.nan if value is None else value, unit)
+                for country_id, indicator_id, year, value, unit in data
+            ]
+            countries, indicators, years_at, values, units = zip(*rows)
+            cube.values[list(countries), list(indicators), list(years_at)] = values
+            cube.present[list(countries), list(indicators), list(years_at)] = True
+            cube.units = {
+                (country, indicator, year): unit
+                for country, indicator, year, _, unit in rows if unit
+            }
+
+        logger.info(
+            f"Built analytic cube {version} with {len(data)} indicator values in {time.perf_counter() - started:.2f}s"
+        )
+        return cube
+
+    def year_position(self, year: int) -> Optional[int]:
+        position = int(year) - self.first_year
+        return position if 0 <= position < len(self.years) else None
+
+    def indicator_series(self, country_code: str, indicator_code: str) -> List[Dict]:
+        """Yearly values of one indicator for one country, shaped like CountryDataSerializer output"""
+        country = self.country_index[country_code]
+        indicator = self.indicator_index[indicator_code]
+        return [
+            self._data_row(country, indicator, int(position))
+            for position in np.flatnonzero(self.present[country, indicator])
+        ]
+
+    def region_indicator(self, region: str, indicator_code: str, year: int) -> List[Dict]:
+        """One indicator for every country of a region in a year, highest value first"""
+        indicator = self.indicator_index[indicator_code]
+        position = self.year_position(year)
+        if region not in self.regions or position is None:
+            return []
+
+        countries = np.flatnonzero(self.country_regions == self.regions.index(region))
+        countries = countries[self.present[countries, indicator, position]]
+        values = self.values[countries, indicator, position]
+        order = np.argsort(-values, kind='stable')  # NaN sorts last, as NULL does in the ORM's descending order
+        return [self._data_row(int(country), indicator, position) for country in countries[order]]
+
+    def _data_row(self, country: int, indicator: int, position: int) -> Dict:
+        year = int(self.years[position])
+        value = self.values[country, indicator, position]
+        return {
+            'country': self.country_ids[country],
+            'country_name': self.country_names[country],
+            'indicator': self.indicator_ids[indicator],
+            'indicator_name': self.indicator_names[indicator],
+            'date': str(year),
+            'year': year,
+            'value': None if np.isnan(value) else f'{value:.4f}',
+            'unit': self.units.get((country, indicator, position), ''),
+        }
+
+
+_cube = None
+_cube_lock = threading.Lock()
+
+
+def cube_enabled() -> bool:
+    return getattr(settings, 'DASHBOARD_ANALYTIC_CUBE', False)
+
+
+def get_cube() -> AnalyticCube:
+    """Return the process-wide cube, rebuilding it when an ingest has bumped a dataset version"""
+    global _cube
+    version = DatasetVersion.current()
+    if _cube is None or _cube.version != version:
+        with _cube_lock:
+            if _cube is None or _cube.version != version:
+                _cube = AnalyticCube.build(version)
+    return _cube
+
+
+CORRELATION_CACHE_TIMEOUT = 24 * 60 * 60  # Entries are keyed by dataset version, so they never go stale
+
+
+def _statistic(value: float) -> Optional[float]:
+    return None if np.isnan(value) else float(value)
+
+
+def happiness_correlations(indicator_codes: Optional[List[str]], start_year: Optional[int], end_year: Optional[int],
+                           metric: str = 'ladder_score') -> Dict:
+    """Correlate a happiness metric with indicators over country-years in a year range.
+
+    Every requested indicator (all of them when ``indicator_codes`` is empty)
+    is compared in one vectorized pass over the country-year fact table, each
+    against the country-years where both values are present. Open year bounds
+    cover every year. Results are cached per dataset version.
+    """
+    version = DatasetVersion.current()
+    codes = sorted(indicator_codes) if indicator_codes else None
+    key = f"correlations:{version}:{metric}:{start_year}:{end_year}:{','.join(codes) if codes else '*'}"
+    result = cache.get(key)
+    if result is not None:
+        return result
+
+    result = {'metric': metric, 'start_year': start_year, 'end_year': end_year, 'countries': {}, 'results': []}
+    available = set(fact_columns())
+    if not available:
+        logger.warning(f"{FACT_TABLE} has not been built yet; run refresh_aggregates")
+        return result
+    if codes is None:
+        codes = [code for code in Indicator.objects.order_by('id').values_list('id', flat=True)
+                 if indicator_column(code) in available]
+    missing = [code for code in codes if indicator_column(code) not in available]
+    if missing:
+        raise UnknownIndicatorError(', '.join(missing))
+
+    rows = read_fact_rows(start_year, end_year, [metric] + [indicator_column(code) for code in codes])
+    keys = [(row[0], row[2]) for row in rows]
+    values = np.array([row[3:] for row in rows], dtype=float).reshape(len(rows), len(codes) + 1)
+    y, x = values[:, 0], values[:, 1:]
+
+    # Pairwise-complete observations per indicator, with absent pairs masked to NaN on both sides
+    present = ~np.isnan(x) & ~np.isnan(y)[:, None]
+    x = np.where(present, x, np.nan)
+    y_by_indicator = np.where(present, y[:, None], np.nan)
+    n = present.sum(axis=0)
+    countries = {rows[row][0]: rows[row][1] for row in np.flatnonzero(present.any(axis=1))}
+
+    slope, intercept, pearson = _least_squares(x, y_by_indicator, n)
+    # Spearman is Pearson on average ranks, taken within each indicator's present pairs
+    _, _, spearman = _least_squares(
+        pd.DataFrame(x).rank().to_numpy(), pd.DataFrame(y_by_indicator).rank().to_numpy(), n
+    )
+
+    names = dict(Indicator.objects.filter(id__in=codes).values_list('id', 'name'))
+    results = []
+    for position, code in enumerate(codes):
+        points = np.flatnonzero(present[:, position])
+        results.append({
+            'indicator': code,
+            'indicator_name': names.get(code, code),
+            'n': int(n[position]),
+            'pearson': _statistic(pearson[position]),
+            'spearman': _statistic(spearman[position]),
+            'slope': _statistic(slope[position]),
+            'intercept': _statistic(intercept[position]),
+            'r_squared': _statistic(pearson[position] ** 2),
+            'points': [
+                [keys[row][0], keys[row][1], float(x[row, position]), float(y[row])] for row in points
+            ],
+        })
+
+    result.update(countries=countries, results=results)
+    cache.set(key, result, CORRELATION_CACHE_TIMEOUT)
+    return result
+
+
+def _least_squares(x: np.ndarray, y: np.ndarray, n: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Column-wise OLS slope and intercept of y on x, and their Pearson correlation, ignoring NaN pairs"""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_x = np.nansum(x, axis=0) / n
+        mean_y = np.nansum(y, axis=0) / n
+        dx, dy = x - mean_x, y - mean_y
+        sxx = np.nansum(dx * dx, axis=0)
+        syy = np.nansum(dy * dy, axis=0)
+        sxy = np.nansum(dx * dy, axis=0)
+        slope = sxy / sxx
+        intercept = mean_y - slope * mean_x
+        pearson = sxy / np.sqrt(sxx * syy)
+    # Too few points or a constant series leave the statistics undefined
+    undefined = (n < 3) | (sxx <= 0) | (syy <= 0)
+    slope[undefined] = intercept[undefined] = pearson[undefined] = np.nan
+    return slope, intercept, pearson
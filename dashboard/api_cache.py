@@ -0,0 +1,121 @@
+import hashlib
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.http import HttpResponse
+from django.urls import URLPattern, URLResolver, get_resolver
+
+from .conditional import is_dashboard_api, normalized_path
+
+STATS_PREFIX = 'api-response-stats'
+REPLAYED_HEADERS = ('Vary', 'Allow')  # Set by the view, so a cache hit must restore them
+
+
+def response_cache_config() -> Optional[Dict]:
+    """DASHBOARD_API_RESPONSE_CACHE with defaults filled in, or None when the cache is disabled"""
+    config = getattr(settings, 'DASHBOARD_API_RESPONSE_CACHE', None)
+    if not config:
+        return None
+    return {'CACHE': 'api_responses', 'TIMEOUT': 24 * 60 * 60, **config}
+
+
+def is_process_local(cache) -> bool:
+    """Whether entries in ``cache`` are only visible to the process that stored them"""
+    return isinstance(cache, LocMemCache)
+
+
+def response_cache_key(url_name: str, request, version: str) -> str:
+    """Key of a response: the view, its normalized URL, the dataset version it was built from and the
+    origin it was requested on, which absolute links in the body (such as ``next``) are built from"""
+    origin = f'{request.scheme}://{request.get_host()}'
+    digest = hashlib.sha256(f'{version}\n{origin}\n{normalized_path(request)}'.encode()).hexdigest()
+    return f'api-response:{url_name}:{digest}'
+
+
+def api_url_names() -> List[str]:
+    """URL names of every dashboard API route"""
+    names = []
+
+    def walk(patterns):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                walk(pattern.url_patterns)
+            elif isinstance(pattern, URLPattern) and pattern.name and is_dashboard_api(pattern.callback):
+                names.append(pattern.name)
+
+    walk(get_resolver().url_patterns)
+    return sorted(set(names))
+
+
+def response_cache_stats() -> Dict[str, Dict[str, float]]:
+    """Hits, misses and hit ratio per API view, counted in the cache backend across all workers"""
+    config = response_cache_config()
+    if config is None:
+        return {}
+    cache = caches[config['CACHE']]
+    stats = {}
+    for url_name in api_url_names():
+        hits = cache.get(f'{STATS_PREFIX}:{url_name}:hits', 0)
+        misses = cache.get(f'{STATS_PREFIX}:{url_name}:misses', 0)
+        if hits or misses:
+            stats[url_name] = {'hits': hits, 'misses': misses, 'hit_ratio': hits / (hits + misses)}
+    return stats
+
+
+def _count(cache, url_name: str, outcome: str):
+    key = f'{STATS_PREFIX}:{url_name}:{outcome}'
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:  # Evicted between add() and incr()
+        cache.set(key, 1, None)
+
+
+class DatasetResponseCacheMiddleware:
+    """Serve repeated dashboard API requests from stored response bytes.
+
+    Entries are keyed by view, normalized query and the dataset version the
+    conditional GET middleware (which must come first) read for the request,
+    so an ingest's version bump retires every entry without deleting any;
+    old entries simply expire. Any Django cache backend works, but only a
+    shared one (file, database, memcached, Redis) lets workers reuse each
+    other's entries and the ones prewarm_api_cache stores.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        pending = getattr(request, '_response_cache_key', None)
+        if pending is not None and response.status_code == 200 and not response.streaming:
+            cache, key, timeout = pending
+            headers = {name: response[name] for name in REPLAYED_HEADERS if response.has_header(name)}
+            # Authentication reads the session, for which SessionMiddleware adds Vary: Cookie
+            session = getattr(request, 'session', None)
+            session_accessed = session is not None and session.accessed
+            cache.set(key, (response.content, response['Content-Type'], headers, session_accessed), timeout)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        config = response_cache_config()
+        version = getattr(request, 'dataset_version', None)
+        if config is None or version is None or request.method not in ('GET', 'HEAD') or not is_dashboard_api(view_func):
+            return None
+
+        cache = caches[config['CACHE']]
+        url_name = request.resolver_match.url_name
+        key = response_cache_key(url_name, request, version)
+        cached = cache.get(key)
+        if cached is not None:
+            _count(cache, url_name, 'hits')
+            content, content_type, headers, session_accessed = cached
+            if session_accessed and hasattr(request, 'session'):
+                request.session.accessed = True
+            return HttpResponse(content, content_type=content_type, headers=headers)
+
+        _count(cache, url_name, 'misses')
+        request._response_cache_key = (cache, key, config['TIMEOUT'])
+        return None
@@ -0,0 +1,279 @@
+import logging
+import os
+import re
+import tempfile
+import time
+from contextlib import contextmanager
+from decimal import Decimal, InvalidOperation
+from io import StringIO
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+
+from .facts import HAPPINESS_COLUMNS, rebuild_country_year_facts
+from .models import Country, Indicator, CountryData, HappinessData, DatasetVersion, COUNTRY_NAME_TO_CODE_MAPPING
+from .services import HappinessDataService, rank_happiness_data, refresh_regional_aggregates
+from .worldbank_stub import WorldBankStubAdapter
+
+logger = logging.getLogger(__name__)
+
+
+def make_synthetic_happiness_workbook(path: str, rows: int = 100000, sheets: int = 6, seed: int = 0):
+    """Write a multi-sheet workbook shaped like the World Happiness Report, one year per sheet"""
+    rng = np.random.default_rng(seed)
+    names = list(COUNTRY_NAME_TO_CODE_MAPPING)
+    columns = list(HappinessDataService.COLUMN_MAP)
+    per_sheet = [rows // sheets + (1 if index < rows % sheets else 0) for index in range(sheets)]
+
+    with pd.ExcelWriter(path, engine='openpyxl') as writer:
+        for index, count in enumerate(per_sheet):
+            year = 2020 + index % 6
+            data = {
+                'Country name': rng.choice(names, size=count),
+                'Year': np.full(count, year),
+                'Ladder score': rng.uniform(2, 8, size=count).round(4),
+            }
+            for column in columns:
+                if column not in data:
+                    values = rng.uniform(0, 2, size=count).round(6)
+                    values[rng.random(count) < 0.02] = 0  # Zero marks missing data
+                    data[column] = values
+            pd.DataFrame(data, columns=columns).to_excel(writer, sheet_name=str(year + 10 * (index // 6)), index=False)
+
+
+def legacy_parse_happiness_workbook(path: str) -> List[Dict]:
+    """The previous row-by-row parser: re-reads the file per sheet and walks rows with iterrows()"""
+    def safe_decimal(value) -> Optional[Decimal]:
+        if pd.isna(value) or value is None or value == '':
+            return None
+        try:
+            decimal_value = Decimal(str(value))
+            return None if decimal_value == Decimal('0.000000') else decimal_value
+        except (InvalidOperation, ValueError):
+            return None
+
+    records = []
+    excel_file = pd.ExcelFile(path)
+    for sheet_name in excel_file.sheet_names:
+        df = pd.read_excel(path, sheet_name=sheet_name)
+        df.columns = df.columns.str.strip()
+        if 'Year' not in df.columns:
+            year_match = re.search(r'(\d{4})', sheet_name)
+            if not year_match:
+                continue
+            df['Year'] = int(year_match.group(1))
+        df = df[df['Year'].between(2020, 2025)]
+        for _, row in df.iterrows():
+            country_name = str(row.get('Country name', '')).strip()
+            if not country_name or country_name.lower() in ['nan', 'none']:
+                continue
+            country_name = country_name.rstrip('*').strip()
+            record = {
+                'country_name': country_name,
+                'wb_country_code': COUNTRY_NAME_TO_CODE_MAPPING.get(country_name),
+                'year': int(row.get('Year', 0)),
+            }
+            for column, field_name in HappinessDataService.COLUMN_MAP.items():
+                if field_name in HappinessDataService.DECIMAL_FIELDS:
+                    record[field_name] = safe_decimal(row.get(column))
+            if not record['ladder_score'] or record['year'] < 2020:
+                continue
+            records.append(record)
+    return records
+
+
+def benchmark_happiness_parse(rows: int = 100000, sheets: int = 6, workbook_path: str = None,
+                              include_legacy: bool = True) -> Dict[str, float]:
+    """Time the vectorized happiness parser, a parsed-cache load and optionally the legacy parser"""
+    cleanup = workbook_path is None
+    if workbook_path is None:
+        handle, workbook_path = tempfile.mkstemp(suffix='.xlsx')
+        os.close(handle)
+    if cleanup or not os.path.exists(workbook_path):
+        started = time.perf_counter()
+        make_synthetic_happiness_workbook(workbook_path, rows=rows, sheets=sheets)
+        logger.info(f"Generated {rows} row workbook in {time.perf_counter() - started:.1f}s")
+
+    try:
+        results = {}
+        started = time.perf_counter()
+        records = HappinessDataService(workbook_path, use_cache=False).process_happiness_excel_file()
+        results['vectorized_seconds'] = time.perf_counter() - started
+        results['records'] = len(records)
+
+        cached_service = HappinessDataService(workbook_path)
+        try:
+            cached_service.process_happiness_excel_file()  # Populate the cache
+            started = time.perf_counter()
+            HappinessDataService(workbook_path).process_happiness_excel_file()
+            results['cached_seconds'] = time.perf_counter() - started
+        finally:
+            if os.path.exists(cached_service.cache_path):
+                os.remove(cached_service.cache_path)
+
+        if include_legacy:
+            started = time.perf_counter()
+            legacy_records = legacy_parse_happiness_workbook(workbook_path)
+            results['legacy_seconds'] = time.perf_counter() - started
+            results['legacy_records'] = len(legacy_records)
+            results['speedup'] = results['legacy_seconds'] / results['vectorized_seconds']
+        return results
+    finally:
+        if cleanup:
+            os.remove(workbook_path)
+
+
+@contextmanager
+def scratch_database():
+    """Point the default connection at a freshly migrated temporary SQLite file for the duration"""
+    handle, path = tempfile.mkstemp(suffix='.sqlite3')
+    os.close(handle)
+    os.remove(path)
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    previous_name = test_settings.get('NAME')
+    test_settings['NAME'] = path
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield path
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        test_settings['NAME'] = previous_name
+
+
+def benchmark_worldbank_ingest(scales: Iterable[int] = (1, 10, 100), latency: float = 0.2,
+                               max_workers: int = None) -> List[Dict]:
+    """Time a full load_worldbank_data run against the offline stand-in at each data scale.
+
+    Every scale runs in its own scratch database with the response cache
+    disabled, so each run pays for all of its requests, parsing and writes.
+    """
+    results = []
+    for scale in scales:
+        stub_config = {'SCALE': scale, 'LATENCY': latency}
+        with scratch_database(), override_settings(
+            WORLDBANK_OFFLINE_STUB=stub_config,
+            WORLDBANK_RESPONSE_CACHE=None,
+            WORLDBANK_MAX_WORKERS=max_workers or 8,
+        ):
+            cache.clear()
+            WorldBankStubAdapter.reset_count()
+            output = StringIO()
+            started = time.perf_counter()
+            call_command('load_worldbank_data', '--force', stdout=output)
+            elapsed = time.perf_counter() - started
+
+            rows = CountryData.objects.count()
+            results.append({
+                'scale': scale,
+                'seconds': elapsed,
+                'requests': WorldBankStubAdapter.request_count,
+                'countries': Country.objects.count(),
+                'rows': rows,
+                'rows_per_second': rows / elapsed if elapsed else 0.0,
+                'output': output.getvalue(),
+            })
+        cache.clear()
+        logger.info(f"Ingest benchmark at {scale}x: {rows} rows in {elapsed:.1f}s")
+    return results
+
+
+def make_synthetic_happiness_rows(years: Iterable[int] = range(2020, 2026), seed: int = 0) -> int:
+    """Create a HappinessData row per country and year with random scores"""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for country_id, name, region in Country.objects.values_list('id', 'name', 'region_value'):
+        for year in years:
+            values = {factor: Decimal(f'{rng.uniform(0, 2):.6f}') for factor in HAPPINESS_COLUMNS}
+            values['ladder_score'] = Decimal(f'{rng.uniform(2, 8):.4f}')
+            rows.append(HappinessData(country_name=name, country_id=country_id, year=year, region=region, **values))
+    HappinessData.objects.bulk_create(rows, batch_size=500)
+    rank_happiness_data()
+    refresh_regional_aggregates()
+    rebuild_country_year_facts()
+    DatasetVersion.bump(DatasetVersion.HAPPINESS)
+    return len(rows)
+
+
+def _latency_summary(seconds: List[float]) -> Dict[str, float]:
+    milliseconds = np.array(seconds) * 1000
+    return {
+        'median_ms': float(np.median(milliseconds)),
+        'p95_ms': float(np.percentile(milliseconds, 95)),
+    }
+
+
+def benchmark_api_latency(scale: int = 1, iterations: int = 200, seed: int = 0) -> Dict[str, Dict]:
+    """Time the country, regional indicator and regional happiness APIs on the ORM and analytic cube paths.
+
+    Data comes from the offline World Bank stand-in at ``scale`` plus synthetic
+    happiness rows, in a scratch database. Both paths serve the same requests,
+    and responses that differ between them are counted as mismatches.
+    """
+    rng = np.random.default_rng(seed)
+    with scratch_database(), override_settings(
+        WORLDBANK_OFFLINE_STUB={'SCALE': scale},
+        WORLDBANK_RESPONSE_CACHE=None,
+        DASHBOARD_API_RESPONSE_CACHE=None,  # Every request must reach the view being measured
+        ALLOWED_HOSTS=['testserver'],
+    ):
+        cache.clear()
+        call_command('load_worldbank_data', '--force', stdout=StringIO())
+        make_synthetic_happiness_rows(seed=seed)
+
+        countries = list(Country.objects.values_list('id', flat=True))
+        indicators = list(Indicator.objects.values_list('id', flat=True))
+        regions = sorted(set(Country.objects.exclude(region_value='').values_list('region_value', flat=True)))
+        endpoints = {
+            'country_indicator': [
+                f'/api/country-data/{rng.choice(countries)}/{rng.choice(indicators)}/' for _ in range(iterations)
+            ],
+            'regional_indicator': [
+                f'/api/regional-indicators/{rng.choice(regions)}/{rng.choice(indicators)}/{rng.integers(2020, 2026)}/'
+                for _ in range(iterations)
+            ],
+            'regional_happiness': [
+                '/api/regional-happiness/' + (f'?year={rng.integers(2020, 2026)}' if index % 2 else '')
+                for index in range(iterations)
+            ],
+        }
+
+        client = Client()
+        results = {}
+        responses = {}
+        for path_name, use_cube in (('orm', False), ('cube', True)):
+            with override_settings(DASHBOARD_ANALYTIC_CUBE=use_cube):
+                started = time.perf_counter()
+                client.get(endpoints['country_indicator'][0])  # Builds the cube on the cube path
+                results[f'{path_name}_warmup_ms'] = (time.perf_counter() - started) * 1000
+                for endpoint, urls in endpoints.items():
+                    seconds = []
+                    for url in urls:
+                        started = time.perf_counter()
+                        response = client.get(url)
+                        seconds.append(time.perf_counter() - started)
+                        responses.setdefault(url, {})[path_name] = response.json()
+                    results.setdefault(endpoint, {}).update(
+                        {f'{path_name}_{key}': value for key, value in _latency_summary(seconds).items()}
+                    )
+
+        results['mismatches'] = sum(
+            1 for answers in responses.values() if not _same_response(answers['orm'], answers['cube'])
+        )
+        return results
+
+
+def _same_response(orm, cube) -> bool:
+    """Compare responses, allowing float rounding in averages"""
+    if isinstance(orm, list) and isinstance(cube, list):
+        return len(orm) == len(cube) and all(_same_response(a, b) for a, b in zip(orm, cube))
+    if isinstance(orm, dict) and isinstance(cube, dict):
+        return orm.keys() == cube.keys() and all(_same_response(orm[key], cube[key]) for key in orm)
+    if isinstance(orm, float) or isinstance(cube, float):
+        return orm is not None and cube is not None and abs(float(orm) - float(cube)) < 1e-6
+    return orm == cube
@@ -0,0 +1,269 @@
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised instead of sending a request while the circuit breaker is open"""
+
+
+class TokenBucket:
+    """Thread-safe token bucket limiting requests to ``rate`` per second with bursts of ``capacity``"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping until one is available"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """Stops sending requests after ``failure_threshold`` consecutive failures.
+
+    Once ``reset_timeout`` seconds have passed the circuit is half-open: a
+    single trial request is let through, which closes the circuit on success
+    or opens it again on failure. Requests arriving meanwhile wait for the
+    trial's outcome instead of failing outright.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+    TRIAL_WAIT = 60.0  # Longest wait on a trial request before giving up on it
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opens = 0
+        self._trial_in_flight = False
+        self._lock = threading.Condition()
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a request may be sent now, waiting out a half-open trial"""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    raise CircuitOpenError('Circuit breaker is open; World Bank API calls are paused')
+                self.state = self.HALF_OPEN
+            while self.state == self.HALF_OPEN and self._trial_in_flight:
+                if not self._lock.wait(timeout=self.TRIAL_WAIT):
+                    raise CircuitOpenError('Circuit breaker is half-open; the trial request did not finish')
+            if self.state == self.OPEN:
+                raise CircuitOpenError('Circuit breaker reopened; the trial request failed')
+            if self.state == self.HALF_OPEN:
+                self._trial_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+            self._lock.notify_all()
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            self._lock.notify_all()
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.opens += 1
+                    logger.warning(f"Circuit breaker opened after {self.failures} consecutive failures")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def seconds_until_trial(self) -> float:
+        """How long until an open circuit lets a trial request through"""
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD limit on in-flight requests.
+
+    The limit grows by roughly one per round of successful requests and is
+    halved whenever a request fails, is throttled, or takes longer than
+    ``latency_target`` seconds.
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1, latency_target: float = 5.0):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.latency_target = latency_target
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self.lowest_limit = max_limit
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def slot(self):
+        """Hold one in-flight slot for the duration of a request"""
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.in_flight -= 1
+                self._condition.notify_all()
+
+    def record(self, latency: float, ok: bool):
+        """Adjust the limit from the outcome of one request"""
+        with self._condition:
+            if ok and latency <= self.latency_target:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            else:
+                self.limit = max(self.min_limit, self.limit / 2)
+                self.lowest_limit = min(self.lowest_limit, int(self.limit))
+            self._condition.notify_all()
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header given as seconds or an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RequestPolicy:
+    """Rate limiting, retries with jittered exponential backoff, circuit breaking
+    and adaptive concurrency around each World Bank API request.
+    """
+
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, rate: float = 10.0, burst: float = 20.0, max_attempts: int = 4,
+                 backoff_base: float = 0.5, backoff_cap: float = 30.0, failure_threshold: int = 5,
+                 reset_timeout: float = 30.0, max_concurrency: int = 8, latency_target: float = 5.0):
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.limiter = AdaptiveConcurrencyLimiter(max_concurrency, latency_target=latency_target)
+        self.retries = 0
+        self.throttled = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, config: Dict = None, max_concurrency: int = 8) -> 'RequestPolicy':
+        """Build a policy from a WORLDBANK_CLIENT_POLICY-style dict of upper-case keys"""
+        options = {key.lower(): value for key, value in (config or {}).items()}
+        options.setdefault('max_concurrency', max_concurrency)
+        return cls(**options)
+
+    def backoff_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Full-jitter exponential backoff, never shorter than the server's Retry-After"""
+        delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** (attempt - 1)))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def execute(self, send: Callable[[], requests.Response]) -> requests.Response:
+        """Send a request under the policy, retrying transient failures.
+
+        Returns the final response (which may still carry an error status once
+        attempts run out) or re-raises the last connection error or timeout.
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            self.breaker.before_call()
+            self.bucket.acquire()
+            retry_after = None
+            with self.limiter.slot():
+                started = time.monotonic()
+                try:
+                    response = send()
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                    self.limiter.record(time.monotonic() - started, ok=False)
+                    self.breaker.record_failure()
+                    with self._lock:
+                        self.errors += 1
+                    if attempt == self.max_attempts:
+                        raise
+                    logger.warning(f"Request attempt {attempt} failed: {e}")
+                except Exception:
+                    # Not worth retrying, but it still ends a half-open trial so the breaker can recover
+                    self.limiter.record(time.monotonic() - started, ok=False)
+                    self.breaker.record_failure()
+                    with self._lock:
+                        self.errors += 1
+                    raise
+                else:
+                    latency = time.monotonic() - started
+                    if response.status_code not in self.RETRY_STATUSES:
+                        self.limiter.record(latency, ok=True)
+                        self.breaker.record_success()
+                        return response
+
+                    self.limiter.record(latency, ok=False)
+                    with self._lock:
+                        if response.status_code == 429:
+                            self.throttled += 1
+                        else:
+                            self.errors += 1
+                    if response.status_code == 429:
+                        # Throttling means the API is up, so only server errors trip the breaker
+                        self.breaker.record_success()
+                    else:
+                        self.breaker.record_failure()
+                    if attempt == self.max_attempts:
+                        return response
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                    logger.warning(f"Request attempt {attempt} got HTTP {response.status_code}")
+
+            with self._lock:
+                self.retries += 1
+            time.sleep(self.backoff_delay(attempt, retry_after))
+
+    def wait_for_circuit(self):
+        """Sleep until an open circuit is ready to let a trial request through"""
+        delay = self.breaker.seconds_until_trial()
+        if delay:
+            logger.info(f"Waiting {delay:.1f}s for the circuit breaker before retrying failed requests")
+            time.sleep(delay)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'retries': self.retries,
+            'throttled': self.throttled,
+            'errors': self.errors,
+            'circuit_opens': self.breaker.opens,
+            'lowest_concurrency': self.limiter.lowest_limit,
+        }
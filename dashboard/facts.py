@@ -0,0 +1,221 @@
+import logging
+import re
+import time
+from typing import Dict, List, Optional
+
+from django.core.cache import cache
+from django.db import connection, connections, router, transaction
+
+from .models import CountryData, DatasetVersion, Indicator
+
+logger = logging.getLogger(__name__)
+
+FACT_TABLE = 'dashboard_country_year_fact'
+HAPPINESS_COLUMNS = [
+    'ladder_score', 'upper_whisker', 'lower_whisker',
+    'explained_by_log_gdp_per_capita', 'explained_by_social_support',
+    'explained_by_healthy_life_expectancy', 'explained_by_freedom_to_make_life_choices',
+    'explained_by_generosity', 'explained_by_perceptions_of_corruption', 'dystopia_plus_residual',
+]
+METADATA_COLUMNS = ['country_id', 'year', 'country_name', 'region', 'income_level']
+MAX_INDICATOR_COLUMNS = 1900  # SQLite allows 2000 columns per table by default
+COLUMNAR_CACHE_TIMEOUT = 24 * 60 * 60  # Cache keys carry the dataset version; the timeout only frees memory
+
+
+class UnknownIndicatorError(LookupError):
+    """Raised when an indicator has no column in the fact table"""
+
+
+def indicator_column(indicator_code: str) -> str:
+    """Column holding an indicator in the fact table, e.g. NY.GDP.PCAP.CD -> ind_ny_gdp_pcap_cd"""
+    return 'ind_' + re.sub(r'[^0-9a-z]+', '_', indicator_code.lower()).strip('_')
+
+
+def rebuild_country_year_facts() -> int:
+    """Regenerate the wide (country, year) fact table from the normalized tables.
+
+    Each row joins a country's happiness scores and metadata with one REAL
+    column per loaded indicator, pivoted from CountryData. The table is built
+    under a new name and swapped in within one transaction, so readers never
+    see it half-built and indicators added since the last build gain columns.
+    Returns the number of rows written.
+    """
+    started = time.perf_counter()
+    columns = {}
+    for code in Indicator.objects.order_by('id').values_list('id', flat=True):
+        column = indicator_column(code)
+        if column in columns.values():
+            logger.warning(f"Indicator {code} maps to column {column} already in use; leaving it out of the fact table")
+            continue
+        columns[code] = column
+    if len(columns) > MAX_INDICATOR_COLUMNS:
+        raise ValueError(f"{len(columns)} indicators exceed the fact table's {MAX_INDICATOR_COLUMNS} column limit")
+
+    quote = connection.ops.quote_name
+    building = f'{FACT_TABLE}__building'
+    indicator_definitions = ''.join(f', {quote(column)} REAL' for column in columns.values())
+    happiness_definitions = ''.join(f', {quote(column)} REAL' for column in HAPPINESS_COLUMNS)
+    pivot = ''.join(
+        f', MAX(CASE WHEN indicator_id = %s THEN CAST(value AS REAL) END) AS {quote(column)}'
+        for column in columns.values()
+    )
+    happiness_values = ''.join(f', CAST(h.{quote(column)} AS REAL)' for column in HAPPINESS_COLUMNS)
+    indicator_values = ''.join(f', p.{quote(column)}' for column in columns.values())
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {quote(building)}')
+        cursor.execute(
+            f'CREATE TABLE {quote(building)} ('
+            f'year INTEGER NOT NULL, country_id TEXT NOT NULL, country_name TEXT NOT NULL, '
+            f'region TEXT NOT NULL, income_level TEXT NOT NULL{happiness_definitions}{indicator_definitions}, '
+            f'PRIMARY KEY (year, country_id)) WITHOUT ROWID'
+        )
+        # One row per country and year with happiness or indicator data; the lowest id wins
+        # when several happiness names resolve to the same country
+        cursor.execute(
+            f'INSERT INTO {quote(building)} '
+            f'WITH keys AS ('
+            f'  SELECT country_id, year FROM dashboard_happinessdata WHERE country_id IS NOT NULL'
+            f'  UNION SELECT country_id, year FROM dashboard_countrydata WHERE year IS NOT NULL'
+            f'), pivot AS ('
+            f'  SELECT country_id, year{pivot} FROM dashboard_countrydata'
+            f'  WHERE year IS NOT NULL GROUP BY country_id, year'
+            f') '
+            f'SELECT k.year, k.country_id, c.name, c.region_value, c.income_level_value'
+            f'{happiness_values}{indicator_values} '
+            f'FROM keys k JOIN dashboard_country c ON c.id = k.country_id '
+            f'LEFT JOIN dashboard_happinessdata h ON h.id = ('
+            f'  SELECT MIN(id) FROM dashboard_happinessdata WHERE country_id = k.country_id AND year = k.year'
+            f') '
+            f'LEFT JOIN pivot p ON p.country_id = k.country_id AND p.year = k.year',
+            list(columns),
+        )
+        rows = cursor.rowcount
+        cursor.execute(f'DROP TABLE IF EXISTS {quote(FACT_TABLE)}')
+        cursor.execute(f'ALTER TABLE {quote(building)} RENAME TO {quote(FACT_TABLE)}')
+
+    logger.info(
+        f"Rebuilt {FACT_TABLE}: {rows} country-years x {len(columns)} indicators "
+        f"in {time.perf_counter() - started:.2f}s"
+    )
+    return rows
+
+
+def _read_connection():
+    """Connection reads should use, so the serving tier's snapshot routing applies to raw SQL too"""
+    return connections[router.db_for_read(CountryData)]
+
+
+def fact_columns() -> List[str]:
+    """Columns of the fact table, or an empty list if it has not been built yet"""
+    with _read_connection().cursor() as cursor:
+        cursor.execute(f'PRAGMA table_info({connection.ops.quote_name(FACT_TABLE)})')
+        return [row[1] for row in cursor.fetchall()]
+
+
+def read_fact_rows(start_year: Optional[int], end_year: Optional[int], columns: List[str]) -> List[tuple]:
+    """(country_id, country_name, year, *columns) for every fact row in a year range, from one range scan"""
+    db = _read_connection()
+    quote = db.ops.quote_name
+    selected = ['country_id', 'country_name', 'year'] + columns
+    sql = f'SELECT {", ".join(quote(column) for column in selected)} FROM {quote(FACT_TABLE)} WHERE 1 = 1'
+    params = []
+    if start_year is not None:
+        sql += ' AND year >= %s'
+        params.append(start_year)
+    if end_year is not None:
+        sql += ' AND year <= %s'
+        params.append(end_year)
+    sql += ' ORDER BY year, country_id'
+    with db.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def read_cross_section(year: int, indicator_codes: List[str], region: Optional[str] = None) -> List[Dict]:
+    """Happiness scores and the given indicators for every country in a year, from one range scan.
+
+    Raises UnknownIndicatorError for indicators without a fact column.
+    """
+    available = set(fact_columns())
+    if not available:
+        logger.warning(f"{FACT_TABLE} has not been built yet; run refresh_aggregates")
+        return []
+    missing = [code for code in indicator_codes if indicator_column(code) not in available]
+    if missing:
+        raise UnknownIndicatorError(', '.join(missing))
+
+    db = _read_connection()
+    quote = db.ops.quote_name
+    selected = METADATA_COLUMNS + HAPPINESS_COLUMNS + [indicator_column(code) for code in indicator_codes]
+    sql = f'SELECT {", ".join(quote(column) for column in selected)} FROM {quote(FACT_TABLE)} WHERE year = %s'
+    params = [year]
+    if region:
+        sql += ' AND region = %s'
+        params.append(region)
+    sql += ' ORDER BY year, country_id'
+
+    with db.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    results = []
+    for row in rows:
+        record = dict(zip(METADATA_COLUMNS + HAPPINESS_COLUMNS, row))
+        record['indicators'] = dict(zip(indicator_codes, row[len(METADATA_COLUMNS) + len(HAPPINESS_COLUMNS):]))
+        results.append(record)
+    return results
+
+
+def read_columnar_year(year: int, region: Optional[str] = None, income_level: Optional[str] = None) -> Dict:
+    """Every country's happiness scores and indicator values for a year as parallel arrays.
+
+    ``values[c][i]`` is indicator ``indicators[i]`` for country ``countries[c]``
+    (None where missing) and ``happiness[column][c]`` the country's happiness
+    column, so codes and names appear once instead of once per value.
+    Payloads are cached per dataset version.
+    """
+    key = f"columnar-year:{DatasetVersion.current()}:{year}:{region or ''}:{income_level or ''}"
+    payload = cache.get(key)
+    if payload is not None:
+        return payload
+
+    available = set(fact_columns())
+    indicators = [
+        code for code in Indicator.objects.order_by('id').values_list('id', flat=True)
+        if indicator_column(code) in available
+    ]
+    payload = {
+        'year': year, 'countries': [], 'country_names': [], 'indicators': indicators,
+        'values': [], 'happiness': {column: [] for column in HAPPINESS_COLUMNS},
+    }
+    if not available:
+        logger.warning(f"{FACT_TABLE} has not been built yet; run refresh_aggregates")
+        return payload
+
+    db = _read_connection()
+    quote = db.ops.quote_name
+    selected = ['country_id', 'country_name'] + HAPPINESS_COLUMNS + [indicator_column(code) for code in indicators]
+    sql = f'SELECT {", ".join(quote(column) for column in selected)} FROM {quote(FACT_TABLE)} WHERE year = %s'
+    params = [year]
+    if region:
+        sql += ' AND region = %s'
+        params.append(region)
+    if income_level:
+        sql += ' AND income_level = %s'
+        params.append(income_level)
+    sql += ' ORDER BY year, country_id'
+
+    with db.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    first_indicator = 2 + len(HAPPINESS_COLUMNS)
+    for row in rows:
+        payload['countries'].append(row[0])
+        payload['country_names'].append(row[1])
+        for position, column in enumerate(HAPPINESS_COLUMNS, start=2):
+            payload['happiness'][column].append(row[position])
+        payload['values'].append(list(row[first_indicator:]))
+    cache.set(key, payload, COLUMNAR_CACHE_TIMEOUT)
+    return payload
@@ -0,0 +1,153 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Optional, Dict, NamedTuple
+from urllib.parse import urlencode
+
+logger = logging.getLogger(__name__)
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+    last_modified: str
+    fetched_at: float
+
+
+class ResponseCache:
+    """Persistent, size-bounded cache of HTTP response bodies shared across processes.
+
+    Entries live in a standalone SQLite file keyed by a hash of URL + params, and
+    keep the ETag/Last-Modified validators so stale entries can be revalidated
+    with a conditional request. The least recently used entries are evicted once
+    the stored bodies exceed ``max_bytes``.
+    """
+
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            url TEXT NOT NULL,
+            body BLOB NOT NULL,
+            size INTEGER NOT NULL,
+            etag TEXT NOT NULL DEFAULT '',
+            last_modified TEXT NOT NULL DEFAULT '',
+            fetched_at REAL NOT NULL,
+            last_access REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access);
+    '''
+
+    def __init__(self, path, max_bytes: int = 256 * 1024 * 1024, max_age: int = 3600):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.bytes_served = 0
+        self.bytes_stored = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection().executescript(self.SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def make_key(url: str, params: Dict = None) -> str:
+        """Build the cache key for a URL and its query parameters"""
+        query = urlencode(sorted((str(k), str(v)) for k, v in (params or {}).items()))
+        return hashlib.sha256(f'{url}?{query}'.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """Look up an entry, marking it as recently used"""
+        row = self._connection().execute(
+            'SELECT body, etag, last_modified, fetched_at FROM responses WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        self._connection().execute('UPDATE responses SET last_access = ? WHERE key = ?', (time.time(), key))
+        return CachedResponse(zlib.decompress(row[0]), row[1], row[2], row[3])
+
+    def is_fresh(self, entry: CachedResponse) -> bool:
+        """Whether an entry can be served without revalidating it upstream"""
+        return time.time() - entry.fetched_at < self.max_age
+
+    def set(self, key: str, url: str, body: bytes, etag: str = '', last_modified: str = ''):
+        """Store a response body and its validators, then enforce the size bound"""
+        compressed = zlib.compress(body)
+        now = time.time()
+        self._connection().execute(
+            'INSERT OR REPLACE INTO responses '
+            '(key, url, body, size, etag, last_modified, fetched_at, last_access) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (key, url, compressed, len(compressed), etag or '', last_modified or '', now, now)
+        )
+        with self._lock:
+            self.bytes_stored += len(body)
+        self._evict()
+
+    def mark_revalidated(self, key: str):
+        """Restart the freshness window of an entry after a 304 Not Modified"""
+        now = time.time()
+        self._connection().execute(
+            'UPDATE responses SET fetched_at = ?, last_access = ? WHERE key = ?', (now, now, key)
+        )
+
+    def record(self, outcome: str, served_bytes: int = 0):
+        """Count a lookup outcome: 'hit', 'revalidated' or 'miss'"""
+        with self._lock:
+            if outcome == 'hit':
+                self.hits += 1
+            elif outcome == 'revalidated':
+                self.revalidated += 1
+            else:
+                self.misses += 1
+            self.bytes_served += served_bytes
+
+    def stats(self) -> Dict[str, int]:
+        """Counters for this process plus the current on-disk size"""
+        total_size, entries = self._connection().execute(
+            'SELECT COALESCE(SUM(size), 0), COUNT(*) FROM responses'
+        ).fetchone()
+        return {
+            'hits': self.hits,
+            'revalidated': self.revalidated,
+            'misses': self.misses,
+            'bytes_served': self.bytes_served,
+            'bytes_stored': self.bytes_stored,
+            'entries': entries,
+            'size': total_size,
+        }
+
+    def clear(self):
+        """Remove every cached response"""
+        self._connection().execute('DELETE FROM responses')
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        conn = self._connection()
+        total_size = conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total_size <= self.max_bytes:
+            return
+
+        evicted = []
+        for key, size in conn.execute('SELECT key, size FROM responses ORDER BY last_access'):
+            if total_size <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total_size -= size
+        conn.executemany('DELETE FROM responses WHERE key = ?', evicted)
+        logger.info(f"Evicted {len(evicted)} cached responses to stay under {self.max_bytes} bytes")
@@ -0,0 +1,115 @@
+from django.core.management.base import BaseCommand
+from dashboard.benchmarks import benchmark_api_latency, benchmark_happiness_parse, benchmark_worldbank_ingest
+
+
+class Command(BaseCommand):
+    help = 'Run ingest and API performance benchmarks'
+
+    def add_arguments(self, parser):
+        subparsers = parser.add_subparsers(dest='target', required=True)
+
+        happiness = subparsers.add_parser(
+            'happiness-parse',
+            help='Time happiness workbook parsing on a synthetic multi-sheet workbook',
+        )
+        happiness.add_argument('--rows', type=int, default=100000, help='Total rows across all sheets')
+        happiness.add_argument('--sheets', type=int, default=6, help='Number of sheets')
+        happiness.add_argument(
+            '--workbook',
+            type=str,
+            help='Reuse (or create) the synthetic workbook at this path instead of a temporary file',
+        )
+        happiness.add_argument(
+            '--skip-legacy',
+            action='store_true',
+            help='Only time the vectorized parser',
+        )
+
+        ingest = subparsers.add_parser(
+            'worldbank-ingest',
+            help='Time a full load_worldbank_data run against the offline World Bank stand-in',
+        )
+        ingest.add_argument(
+            '--scale',
+            type=int,
+            nargs='+',
+            default=[1, 10, 100],
+            help='Data sizes to run, as multiples of the real country count',
+        )
+        ingest.add_argument(
+            '--latency',
+            type=float,
+            default=0.2,
+            help='Simulated seconds of latency per API request',
+        )
+        ingest.add_argument('--workers', type=int, help='Concurrent request workers')
+
+        latency = subparsers.add_parser(
+            'api-latency',
+            help='Compare per-request API latency on the ORM and analytic cube paths',
+        )
+        latency.add_argument('--scale', type=int, default=1, help='World Bank data size, as with worldbank-ingest')
+        latency.add_argument('--iterations', type=int, default=200, help='Requests timed per endpoint and path')
+
+    def handle(self, *args, **options):
+        if options['target'] == 'happiness-parse':
+            self.run_happiness_parse(options)
+        elif options['target'] == 'worldbank-ingest':
+            self.run_worldbank_ingest(options)
+        elif options['target'] == 'api-latency':
+            self.run_api_latency(options)
+
+    def run_happiness_parse(self, options):
+        self.stdout.write(
+            f'Parsing a synthetic workbook with {options["rows"]} rows over {options["sheets"]} sheets...'
+        )
+        results = benchmark_happiness_parse(
+            rows=options['rows'],
+            sheets=options['sheets'],
+            workbook_path=options['workbook'],
+            include_legacy=not options['skip_legacy'],
+        )
+
+        self.stdout.write(f'Vectorized: {results["vectorized_seconds"]:.2f}s for {results["records"]} records')
+        self.stdout.write(f'Cached:     {results["cached_seconds"]:.2f}s from the parsed workbook cache')
+        if 'legacy_seconds' in results:
+            self.stdout.write(
+                f'Legacy:     {results["legacy_seconds"]:.2f}s for {results["legacy_records"]} records'
+            )
+            self.stdout.write(self.style.SUCCESS(f'Speedup: {results["speedup"]:.1f}x'))
+
+    def run_worldbank_ingest(self, options):
+        self.stdout.write(
+            f'Loading World Bank data from the offline stand-in at {options["latency"] * 1000:.0f}ms '
+            f'per request, in a scratch database...'
+        )
+        results = benchmark_worldbank_ingest(
+            scales=options['scale'],
+            latency=options['latency'],
+            max_workers=options['workers'],
+        )
+
+        for result in results:
+            if options['verbosity'] >= 2:
+                self.stdout.write(result['output'])
+            self.stdout.write(
+                f'{result["scale"]:>4}x: {result["seconds"]:.2f}s, {result["requests"]} requests, '
+                f'{result["countries"]} countries, {result["rows"]} rows ({result["rows_per_second"]:.0f} rows/s)'
+            )
+
+    def run_api_latency(self, options):
+        self.stdout.write(f'Loading {options["scale"]}x offline data into a scratch database...')
+        results = benchmark_api_latency(scale=options['scale'], iterations=options['iterations'])
+
+        self.stdout.write(f'First request: ORM {results["orm_warmup_ms"]:.1f}ms, cube {results["cube_warmup_ms"]:.1f}ms (includes build)')
+        for endpoint in ('country_indicator', 'regional_indicator', 'regional_happiness'):
+            timings = results[endpoint]
+            self.stdout.write(
+                f'{endpoint:<20} ORM median {timings["orm_median_ms"]:.2f}ms p95 {timings["orm_p95_ms"]:.2f}ms | '
+                f'cube median {timings["cube_median_ms"]:.2f}ms p95 {timings["cube_p95_ms"]:.2f}ms '
+                f'({timings["orm_median_ms"] / timings["cube_median_ms"]:.1f}x)'
+            )
+        if results['mismatches']:
+            self.stdout.write(self.style.ERROR(f'{results["mismatches"]} responses differ between the paths'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Both paths returned identical responses'))
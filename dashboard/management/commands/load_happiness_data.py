@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 from django.db import transaction
 from dashboard.services import populate_happiness_data
+from dashboard.snapshots import SnapshotError, publish_snapshot
 import os
 
 
@@ -14,6 +15,16 @@ class Command(BaseCommand):
             default='/Users/arunbabu/Desktop/Code/Happy Data 3/World_Happiness_Report_2020_2025.xlsx',
             help='Path to the Excel file with happiness data',
         )
+        parser.add_argument(
+            '--no-cache',
+            action='store_true',
+            help='Always re-parse the Excel file instead of using the parsed workbook cache',
+        )
+        parser.add_argument(
+            '--publish',
+            action='store_true',
+            help='Publish a new read-only snapshot for the web workers once the load succeeds',
+        )
 
     def handle(self, *args, **options):
         file_path = options['file_path']
@@ -30,14 +41,23 @@ class Command(BaseCommand):
         
         try:
             with transaction.atomic():
-                created, updated, unmapped = populate_happiness_data(file_path)
+                report = populate_happiness_data(file_path, use_cache=not options['no_cache'])
+                
+                if report.cache_hit:
+                    self.stdout.write('Parsed workbook cache hit: file unchanged, skipped Excel parsing')
+                elif report.cache_hit is False:
+                    self.stdout.write('Parsed workbook cache miss: parsed Excel file and refreshed the cache')
                 
                 self.stdout.write(
                     self.style.SUCCESS(
-                        f'Successfully loaded happiness data: {created} created, {updated} updated'
+                        f'Successfully loaded happiness data: {report.created} created, {report.updated} updated, '
+                        f'{report.unchanged} unchanged'
                     )
                 )
+                if report.ranks_updated:
+                    self.stdout.write(f'Recomputed yearly ranks: {report.ranks_updated} rows changed rank')
                 
+                unmapped = report.unmapped_countries
                 if unmapped:
                     self.stdout.write(
                         self.style.WARNING(
@@ -45,8 +65,22 @@ class Command(BaseCommand):
                             f'{", ".join(sorted(list(unmapped)[:10]))}{"..." if len(unmapped) > 10 else ""}'
                         )
                     )
+                    for name in sorted(unmapped):
+                        suggestions = report.suggestions.get(name)
+                        if suggestions:
+                            self.stdout.write(f'  {name}: did you mean {", ".join(suggestions)}?')
                     
         except Exception as e:
             self.stdout.write(
                 self.style.ERROR(f'Failed to load happiness data: {e}')
-            )
\ No newline at end of file
+            )
+            return
+        
+        if options['publish']:
+            try:
+                version = publish_snapshot()
+                self.stdout.write(self.style.SUCCESS(f'Published snapshot {version}'))
+            except SnapshotError as e:
+                self.stdout.write(
+                    self.style.ERROR(f'Failed to publish snapshot: {e}')
+                )
\ No newline at end of file
@@ -1,6 +1,23 @@
-from django.core.management.base import BaseCommand
+import sys
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
-from dashboard.services import populate_countries, populate_indicators, populate_country_data
+from dashboard.services import populate_countries, populate_indicators, populate_country_data, WRITE_BATCH_SIZE
+from dashboard.snapshots import SnapshotError, publish_snapshot
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+def peak_memory_mb():
+    """Peak resident set size of this process in MB, or None where it cannot be measured"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
 
 
 class Command(BaseCommand):
@@ -22,8 +39,41 @@ class Command(BaseCommand):
             action='store_true',
             help='Load only country indicator data',
         )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Refetch every indicator, ignoring the sync ledger and revalidating cached API responses',
+        )
+        parser.add_argument(
+            '--since',
+            type=date.fromisoformat,
+            help='Refetch indicators whose source was updated on or after this date (YYYY-MM-DD)',
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Continue the last unfinished data load, skipping units it already committed',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=WRITE_BATCH_SIZE,
+            help='Number of data rows written per transaction when loading data',
+        )
+        parser.add_argument(
+            '--publish',
+            action='store_true',
+            help='Publish a new read-only snapshot for the web workers once the load succeeds',
+        )
 
     def handle(self, *args, **options):
+        self.force = options['force']
+        self.since = options['since']
+        self.resume = options['resume']
+        self.batch_size = options['batch_size']
+        self.verbosity = options['verbosity']
+        self.failed = False
+        
         if options['countries_only']:
             self.load_countries()
         elif options['indicators_only']:
@@ -32,18 +82,25 @@ class Command(BaseCommand):
             self.load_country_data()
         else:
             self.load_all()
+        
+        if options['publish']:
+            self.publish()
+        if self.failed:
+            raise CommandError('The load did not complete; see the errors above')
 
     def load_countries(self):
         self.stdout.write('Loading countries from World Bank API...')
         try:
             with transaction.atomic():
-                created, updated = populate_countries()
+                created, updated, unchanged = populate_countries(force=self.force)
                 self.stdout.write(
                     self.style.SUCCESS(
-                        f'Successfully loaded countries: {created} created, {updated} updated'
+                        f'Successfully loaded countries: {created} created, {updated} updated, '
+                        f'{unchanged} unchanged'
                     )
                 )
         except Exception as e:
+            self.failed = True
             self.stdout.write(
                 self.style.ERROR(f'Failed to load countries: {e}')
             )
@@ -52,13 +109,15 @@ class Command(BaseCommand):
         self.stdout.write('Loading indicators from World Bank API...')
         try:
             with transaction.atomic():
-                created, updated = populate_indicators()
+                created, updated, unchanged = populate_indicators(force=self.force)
                 self.stdout.write(
                     self.style.SUCCESS(
-                        f'Successfully loaded indicators: {created} created, {updated} updated'
+                        f'Successfully loaded indicators: {created} created, {updated} updated, '
+                        f'{unchanged} unchanged'
                     )
                 )
         except Exception as e:
+            self.failed = True
             self.stdout.write(
                 self.style.ERROR(f'Failed to load indicators: {e}')
             )
@@ -67,18 +126,93 @@ class Command(BaseCommand):
         self.stdout.write('Loading country indicator data from World Bank API...')
         self.stdout.write('This may take several minutes...')
         try:
-            with transaction.atomic():
-                created, updated = populate_country_data()
+            # Commits happen per chunk inside populate_country_data so a failure keeps earlier work
+            report = populate_country_data(
+                force=self.force, since=self.since, resume=self.resume, batch_size=self.batch_size
+            )
+            summary = f'{report.created} created, {report.updated} updated, {report.unchanged} unchanged'
+            if report.indicators_failed:
+                # The run stays resumable and the partial load must not be published
+                self.failed = True
                 self.stdout.write(
-                    self.style.SUCCESS(
-                        f'Successfully loaded country data: {created} created, {updated} updated'
-                    )
+                    self.style.ERROR(f'Partially loaded country data: {summary}; resume with --resume')
                 )
+            else:
+                self.stdout.write(self.style.SUCCESS(f'Successfully loaded country data: {summary}'))
+            self.stdout.write(
+                f'Indicators: {report.indicators_fetched} fetched, {report.indicators_skipped} unchanged upstream; '
+                f'{report.requests_made} requests made, ~{report.requests_avoided} avoided'
+            )
+            if report.units_resumed:
+                self.stdout.write(f'Resumed run {report.run_id}: {report.units_resumed} units already committed')
+            if report.cache_stats:
+                stats = report.cache_stats
+                self.stdout.write(
+                    f'Response cache: {stats["hits"]} hits, {stats["revalidated"]} revalidated (304), '
+                    f'{stats["misses"]} misses, {stats["bytes_served"]} bytes served from cache; '
+                    f'{stats["entries"]} entries, {stats["size"]} bytes on disk'
+                )
+            self.write_retry_stats(report)
+            self.write_chunk_timings(report.chunk_timings)
+            peak = peak_memory_mb()
+            if peak is not None:
+                self.stdout.write(f'Peak memory: {peak:.0f} MB resident')
         except Exception as e:
+            self.failed = True
             self.stdout.write(
                 self.style.ERROR(f'Failed to load country data: {e}')
             )
 
+    def publish(self):
+        if self.failed:
+            self.stdout.write(self.style.WARNING('Load failed; keeping the current snapshot'))
+            return
+        try:
+            version = publish_snapshot()
+            self.stdout.write(self.style.SUCCESS(f'Published snapshot {version}'))
+        except SnapshotError as e:
+            self.stdout.write(
+                self.style.ERROR(f'Failed to publish snapshot: {e}')
+            )
+
+    def write_retry_stats(self, report):
+        stats = report.retry_stats
+        if not stats:
+            return
+        
+        self.stdout.write(
+            f'Retries: {stats["retries"]} retried requests, {stats["throttled"]} throttled (429), '
+            f'{stats["errors"]} errors, {stats["circuit_opens"]} circuit breaker trips, '
+            f'concurrency lowered to {stats["lowest_concurrency"]} at worst'
+        )
+        if stats['pages_requeued']:
+            self.stdout.write(
+                f'Requeued pages: {stats["pages_requeued"]} retried at the end of the run, '
+                f'{stats["pages_recovered"]} recovered, {stats["pages_failed"]} still failing'
+            )
+        if report.indicators_failed:
+            self.stdout.write(
+                self.style.WARNING(
+                    f'{report.indicators_failed} indicators could not be fetched and will be retried on the next run'
+                )
+            )
+
+    def write_chunk_timings(self, chunk_timings):
+        if not chunk_timings:
+            return
+        
+        seconds = [timing.seconds for timing in chunk_timings]
+        self.stdout.write(
+            f'Write transactions: {len(seconds)} batches, {sum(seconds):.2f}s total, '
+            f'{sum(seconds) / len(seconds) * 1000:.1f}ms mean, {max(seconds) * 1000:.1f}ms longest lock hold'
+        )
+        if self.verbosity >= 2:
+            for number, timing in enumerate(chunk_timings, start=1):
+                self.stdout.write(
+                    f'  Batch {number}: {timing.rows} rows, {timing.countries} countries, '
+                    f'{timing.indicators} indicators, {timing.seconds * 1000:.1f}ms'
+                )
+
     def load_all(self):
         self.stdout.write('Loading all World Bank data...')
         
@@ -87,6 +221,7 @@ class Command(BaseCommand):
         self.load_indicators()
         self.load_country_data()
         
-        self.stdout.write(
-            self.style.SUCCESS('All World Bank data loaded successfully!')
-        )
\ No newline at end of file
+        if not self.failed:
+            self.stdout.write(
+                self.style.SUCCESS('All World Bank data loaded successfully!')
+            )
\ No newline at end of file
@@ -0,0 +1,105 @@
+import time
+from urllib.parse import quote, urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.test import Client
+from dashboard.api_cache import is_process_local, response_cache_config, response_cache_stats
+from dashboard.models import Indicator, HappinessData, RegionalAggregate
+
+
+class Command(BaseCommand):
+    help = 'Fill the API response cache with the most requested responses for the current dataset version'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            action='append',
+            default=[],
+            help='Also warm this API path (may be repeated), e.g. /api/country-data/USA/NY.GDP.PCAP.CD/',
+        )
+        parser.add_argument(
+            '--host',
+            help='Host the site is served on, as sent in the Host header (default: the first of ALLOWED_HOSTS); '
+                 'entries are cached per host',
+        )
+        parser.add_argument(
+            '--secure',
+            action='store_true',
+            help='Warm the entries served over HTTPS',
+        )
+        parser.add_argument(
+            '--stats',
+            action='store_true',
+            help='Only print the per-view hit ratios',
+        )
+
+    def handle(self, *args, **options):
+        config = response_cache_config()
+        if config is None:
+            self.stdout.write(self.style.WARNING('The API response cache is disabled (DASHBOARD_API_RESPONSE_CACHE)'))
+            return
+        if is_process_local(caches[config['CACHE']]):
+            self.stdout.write(self.style.WARNING(
+                f"The API response cache '{config['CACHE']}' is local to each process, so neither warmed "
+                f"entries nor hit counts would reach the web workers; point DASHBOARD_API_RESPONSE_CACHE "
+                f"at a shared backend (file, database, memcached or Redis)"
+            ))
+            return
+
+        if options['stats']:
+            for url_name, stats in response_cache_stats().items():
+                self.stdout.write(
+                    f"{url_name:<32} {stats['hits']:>8} hits {stats['misses']:>8} misses  {stats['hit_ratio']:.1%}"
+                )
+            return
+
+        try:
+            paths = self.common_paths() + options['path']
+            # Requests go through the full middleware stack, so entries land under the keys web workers look up
+            client = Client(HTTP_HOST=options['host'] or (settings.ALLOWED_HOSTS or ['localhost'])[0])
+            started = time.perf_counter()
+            failed = 0
+            for path in paths:
+                response = client.get(path, secure=options['secure'])
+                if response.status_code != 200:
+                    failed += 1
+                    self.stdout.write(self.style.WARNING(f'{path}: HTTP {response.status_code}'))
+
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'Warmed {len(paths) - failed} of {len(paths)} responses in {time.perf_counter() - started:.1f}s'
+                )
+            )
+        except Exception as e:
+            self.stdout.write(
+                self.style.ERROR(f'Failed to prewarm API cache: {e}')
+            )
+
+    def common_paths(self):
+        """The dashboard pages' initial and per-selection requests"""
+        years = list(HappinessData.objects.order_by('year').values_list('year', flat=True).distinct())
+        regions = list(
+            RegionalAggregate.objects.exclude(region='').order_by('region').values_list('region', flat=True).distinct()
+        )
+        indicators = list(Indicator.objects.order_by('id').values_list('id', flat=True))
+
+        paths = ['/api/countries/', '/api/indicators/', '/api/happiness-data/', '/api/regional-happiness/']
+        for year in years:
+            paths += [
+                f'/api/regional-happiness/?year={year}',
+                f'/api/happiness-data/?year={year}',
+                f'/api/cross-section/{year}/columns/',
+                f'/api/correlations/?year={year}',
+            ]
+            paths += [
+                f"/api/correlations/?{urlencode({'indicators': indicator, 'year': year})}" for indicator in indicators
+            ]
+        for region in regions:
+            paths.append(f"/api/countries/by_region/?{urlencode({'region': region})}")
+            paths += [
+                f'/api/regional-indicators/{quote(region, safe="")}/{quote(indicator, safe="")}/{year}/'
+                for indicator in indicators for year in years
+            ]
+        return paths
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from dashboard.snapshots import SnapshotError, publish_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Publish the ingest database as a new read-only snapshot for the web workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Publish even if a guarded table lost more than half its rows since the current snapshot',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('Building and validating snapshot...')
+        try:
+            version = publish_snapshot(force=options['force'])
+            self.stdout.write(self.style.SUCCESS(f'Published snapshot {version}'))
+        except SnapshotError as e:
+            self.stdout.write(
+                self.style.ERROR(f'Failed to publish snapshot: {e}')
+            )
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from dashboard.facts import rebuild_country_year_facts
+from dashboard.models import DatasetVersion
+from dashboard.services import rank_happiness_data, refresh_regional_aggregates
+
+
+class Command(BaseCommand):
+    help = 'Rebuild happiness ranks, regional aggregates and the country-year fact table from the loaded data'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--year',
+            type=int,
+            nargs='+',
+            help='Only rebuild regional aggregates for these years',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                ranks_updated = rank_happiness_data()
+                result = refresh_regional_aggregates(options['year'])
+                fact_rows = rebuild_country_year_facts()
+                if ranks_updated or result.created or result.updated:
+                    DatasetVersion.bump(DatasetVersion.HAPPINESS)
+
+            self.stdout.write(f'Happiness ranks: {ranks_updated} rows changed rank')
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'Regional aggregates: {result.created} created, {result.updated} updated, '
+                    f'{result.unchanged} unchanged'
+                )
+            )
+            self.stdout.write(f'Country-year facts: {fact_rows} rows')
+        except Exception as e:
+            self.stdout.write(
+                self.style.ERROR(f'Failed to refresh aggregates: {e}')
+            )
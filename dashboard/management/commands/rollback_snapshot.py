@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from dashboard.snapshots import SnapshotError, get_snapshot_store
+
+
+class Command(BaseCommand):
+    help = 'Point the web workers back at an earlier published snapshot'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--to',
+            type=int,
+            dest='version',
+            help='Snapshot version to serve (defaults to the one before the current version)',
+        )
+        parser.add_argument(
+            '--list',
+            action='store_true',
+            help='List the snapshots on disk instead of rolling back',
+        )
+
+    def handle(self, *args, **options):
+        store = get_snapshot_store()
+        if store is None:
+            self.stdout.write(
+                self.style.ERROR('Snapshots are disabled; set DASHBOARD_SNAPSHOTS to enable them')
+            )
+            return
+        
+        if options['list']:
+            current = store.current_version()
+            for version in store.versions():
+                marker = ' (current)' if version == current else ''
+                self.stdout.write(f'{version}: {store.path(version)}{marker}')
+            return
+        
+        try:
+            previous = store.current_version()
+            version = store.rollback(options['version'])
+            self.stdout.write(self.style.SUCCESS(f'Now serving snapshot {version} (was {previous})'))
+        except SnapshotError as e:
+            self.stdout.write(
+                self.style.ERROR(f'Failed to roll back: {e}')
+            )
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncLedger',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('source', 'Source'), ('indicator', 'Indicator')], max_length=20)),
+                ('key', models.CharField(max_length=50)),
+                ('last_updated', models.DateField(blank=True, null=True)),
+                ('last_synced_at', models.DateTimeField(blank=True, null=True)),
+                ('record_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['scope', 'key'],
+                'unique_together': {('scope', 'key')},
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0004_dataset_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='country',
+            index=models.Index(fields=['name', 'id'], name='country_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='country',
+            index=models.Index(fields=['region_value', 'name', 'id'], name='country_region_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='happinessdata',
+            index=models.Index(fields=['-ladder_score', 'year', 'id'], name='happiness_ladder_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='happinessdata',
+            index=models.Index(fields=['year', '-ladder_score', 'id'], name='happiness_year_ladder_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='happinessdata',
+            index=models.Index(fields=['region', '-ladder_score', 'year', 'id'], name='happiness_region_ladder_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='happinessdata',
+            index=models.Index(fields=['country', '-ladder_score', 'year', 'id'], name='happiness_country_ladder_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='indicator',
+            index=models.Index(fields=['name', 'id'], name='indicator_name_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:37
+
+from django.db import migrations, models
+from django.db.models.functions import Cast
+
+
+def populate_year(apps, schema_editor):
+    """Parse the year out of existing four-digit dates in a single UPDATE"""
+    CountryData = apps.get_model('dashboard', 'CountryData')
+    CountryData.objects.filter(date__regex=r'^[0-9]{4}$').update(year=Cast('date', models.IntegerField()))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0005_access_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='countrydata',
+            options={'ordering': ['country', 'indicator', 'year']},
+        ),
+        migrations.AddField(
+            model_name='countrydata',
+            name='year',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(populate_year, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='countrydata',
+            index=models.Index(fields=['country', 'indicator', 'year'], name='countrydata_series_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='countrydata',
+            index=models.Index(fields=['indicator', 'year'], name='countrydata_indicator_year_idx'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:38
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import F, FloatField, Window
+from django.db.models.functions import Cast, PercentRank, Rank
+
+
+def rank_existing_rows(apps, schema_editor):
+    """Rank the happiness rows loaded before ranks were materialized"""
+    HappinessData = apps.get_model('dashboard', 'HappinessData')
+    ranked = list(
+        HappinessData.objects.filter(ladder_score__isnull=False).order_by()
+        .annotate(
+            computed_rank=Window(Rank(), partition_by=[F('year')], order_by=Cast('ladder_score', FloatField()).desc()),
+            computed_percent=Window(PercentRank(), partition_by=[F('year')], order_by=Cast('ladder_score', FloatField()).asc()),
+        )
+        .values_list('pk', 'country_name', 'year', 'computed_rank', 'computed_percent')
+    )
+    ranks = {(country_name, year): rank for _, country_name, year, rank, _ in ranked}
+    rows = []
+    for pk, country_name, year, rank, percent in ranked:
+        previous = ranks.get((country_name, year - 1))
+        rows.append(HappinessData(
+            pk=pk, rank=rank, percentile=Decimal(f'{percent * 100:.2f}'),
+            rank_change=None if previous is None else previous - rank,
+        ))
+    HappinessData.objects.bulk_update(rows, ['rank', 'percentile', 'rank_change'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0006_countrydata_year'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='happinessdata',
+            name='percentile',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True),
+        ),
+        migrations.AddField(
+            model_name='happinessdata',
+            name='rank',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='happinessdata',
+            name='rank_change',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(rank_existing_rows, migrations.RunPython.noop),
+    ]
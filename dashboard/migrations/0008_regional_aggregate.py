@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0007_happiness_ranks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegionalAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('region', models.CharField(max_length=100)),
+                ('income_level', models.CharField(blank=True, max_length=100)),
+                ('year', models.IntegerField()),
+                ('metric', models.CharField(max_length=60)),
+                ('country_count', models.IntegerField()),
+                ('count', models.IntegerField()),
+                ('mean', models.FloatField(blank=True, null=True)),
+                ('median', models.FloatField(blank=True, null=True)),
+                ('minimum', models.FloatField(blank=True, null=True)),
+                ('maximum', models.FloatField(blank=True, null=True)),
+                ('stddev', models.FloatField(blank=True, null=True)),
+                ('q1', models.FloatField(blank=True, null=True)),
+                ('q3', models.FloatField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['metric', 'income_level', 'region', 'year'],
+                'indexes': [models.Index(fields=['metric', 'income_level', 'region', 'year'], name='regional_aggregate_read_idx')],
+                'unique_together': {('region', 'income_level', 'year', 'metric')},
+            },
+        ),
+    ]
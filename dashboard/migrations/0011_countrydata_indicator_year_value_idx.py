@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 13:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0010_ingest_run_partial_status'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='countrydata',
+            name='countrydata_indicator_year_idx',
+        ),
+        migrations.AddIndex(
+            model_name='countrydata',
+            index=models.Index(fields=['indicator', 'year', '-value'], name='countrydata_indicator_year_idx'),
+        ),
+    ]
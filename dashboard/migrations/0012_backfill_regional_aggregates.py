@@ -0,0 +1,67 @@
+import math
+
+import pandas as pd
+from django.db import migrations
+
+# Frozen copies of the services constants, as this migration must not change when they do
+REGIONAL_METRICS = [
+    'ladder_score', 'explained_by_log_gdp_per_capita', 'explained_by_social_support',
+    'explained_by_healthy_life_expectancy', 'explained_by_freedom_to_make_life_choices',
+    'explained_by_generosity', 'explained_by_perceptions_of_corruption',
+]
+REGIONAL_AGGREGATE_FIELDS = ['country_count', 'count', 'mean', 'median', 'minimum', 'maximum', 'stddev', 'q1', 'q3']
+UNCLASSIFIED_INCOME_LEVEL = 'Not classified'
+ALL_INCOME_LEVELS = ''
+
+
+def aggregate_existing_rows(apps, schema_editor):
+    """Summarize the happiness rows loaded before regional aggregates were materialized"""
+    HappinessData = apps.get_model('dashboard', 'HappinessData')
+    RegionalAggregate = apps.get_model('dashboard', 'RegionalAggregate')
+
+    keys = ['region', 'income_level', 'year']
+    frame = pd.DataFrame.from_records(
+        list(
+            HappinessData.objects.filter(country__isnull=False).exclude(country__region_value='').order_by()
+            .values_list('country__region_value', 'country__income_level_value', 'year', *REGIONAL_METRICS)
+        ),
+        columns=keys + REGIONAL_METRICS,
+    )
+    if frame.empty:
+        return
+    frame[REGIONAL_METRICS] = frame[REGIONAL_METRICS].astype(float)
+    frame['income_level'] = frame['income_level'].replace('', UNCLASSIFIED_INCOME_LEVEL)
+    frame = pd.concat([frame, frame.assign(income_level=ALL_INCOME_LEVELS)])
+    groups = frame.groupby(keys)
+    sizes = groups.size()
+
+    rows = []
+    for metric in REGIONAL_METRICS:
+        column = groups[metric]
+        summary = pd.DataFrame({
+            'country_count': sizes, 'count': column.count(), 'mean': column.mean(),
+            'median': column.median(), 'minimum': column.min(), 'maximum': column.max(),
+            'stddev': column.std(), 'q1': column.quantile(0.25), 'q3': column.quantile(0.75),
+        })
+        for (region, income_level, year), stats in zip(summary.index, summary.itertuples(index=False)):
+            values = {}
+            for name, value in zip(REGIONAL_AGGREGATE_FIELDS, stats):
+                if name in ('country_count', 'count'):
+                    values[name] = int(value)
+                else:
+                    values[name] = None if math.isnan(value) else round(float(value), 10)
+            rows.append(RegionalAggregate(region=region, income_level=income_level, year=int(year), metric=metric, **values))
+
+    RegionalAggregate.objects.all().delete()
+    RegionalAggregate.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0011_countrydata_indicator_year_value_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(aggregate_existing_rows, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,81 @@
+import re
+
+from django.db import migrations
+
+# Frozen copies of the facts module's schema, as this migration must not change when it does
+FACT_TABLE = 'dashboard_country_year_fact'
+HAPPINESS_COLUMNS = [
+    'ladder_score', 'upper_whisker', 'lower_whisker',
+    'explained_by_log_gdp_per_capita', 'explained_by_social_support',
+    'explained_by_healthy_life_expectancy', 'explained_by_freedom_to_make_life_choices',
+    'explained_by_generosity', 'explained_by_perceptions_of_corruption', 'dystopia_plus_residual',
+]
+
+
+def indicator_column(indicator_code):
+    return 'ind_' + re.sub(r'[^0-9a-z]+', '_', indicator_code.lower()).strip('_')
+
+
+def build_fact_table(apps, schema_editor):
+    """Build the wide country-year fact table from the rows loaded before it existed"""
+    Indicator = apps.get_model('dashboard', 'Indicator')
+    connection = schema_editor.connection
+    quote = connection.ops.quote_name
+
+    columns = {}
+    for code in Indicator.objects.order_by('id').values_list('id', flat=True):
+        column = indicator_column(code)
+        if column not in columns.values():
+            columns[code] = column
+
+    indicator_definitions = ''.join(f', {quote(column)} REAL' for column in columns.values())
+    happiness_definitions = ''.join(f', {quote(column)} REAL' for column in HAPPINESS_COLUMNS)
+    pivot = ''.join(
+        f', MAX(CASE WHEN indicator_id = %s THEN CAST(value AS REAL) END) AS {quote(column)}'
+        for column in columns.values()
+    )
+    happiness_values = ''.join(f', CAST(h.{quote(column)} AS REAL)' for column in HAPPINESS_COLUMNS)
+    indicator_values = ''.join(f', p.{quote(column)}' for column in columns.values())
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {quote(FACT_TABLE)}')
+        cursor.execute(
+            f'CREATE TABLE {quote(FACT_TABLE)} ('
+            f'year INTEGER NOT NULL, country_id TEXT NOT NULL, country_name TEXT NOT NULL, '
+            f'region TEXT NOT NULL, income_level TEXT NOT NULL{happiness_definitions}{indicator_definitions}, '
+            f'PRIMARY KEY (year, country_id)) WITHOUT ROWID'
+        )
+        cursor.execute(
+            f'INSERT INTO {quote(FACT_TABLE)} '
+            f'WITH keys AS ('
+            f'  SELECT country_id, year FROM dashboard_happinessdata WHERE country_id IS NOT NULL'
+            f'  UNION SELECT country_id, year FROM dashboard_countrydata WHERE year IS NOT NULL'
+            f'), pivot AS ('
+            f'  SELECT country_id, year{pivot} FROM dashboard_countrydata'
+            f'  WHERE year IS NOT NULL GROUP BY country_id, year'
+            f') '
+            f'SELECT k.year, k.country_id, c.name, c.region_value, c.income_level_value'
+            f'{happiness_values}{indicator_values} '
+            f'FROM keys k JOIN dashboard_country c ON c.id = k.country_id '
+            f'LEFT JOIN dashboard_happinessdata h ON h.id = ('
+            f'  SELECT MIN(id) FROM dashboard_happinessdata WHERE country_id = k.country_id AND year = k.year'
+            f') '
+            f'LEFT JOIN pivot p ON p.country_id = k.country_id AND p.year = k.year',
+            list(columns),
+        )
+
+
+def drop_fact_table(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {schema_editor.connection.ops.quote_name(FACT_TABLE)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0012_backfill_regional_aggregates'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_fact_table, drop_fact_table),
+    ]
@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
+from django.utils import timezone
 from decimal import Decimal
 
 
@@ -20,6 +22,10 @@ class Country(models.Model):
 
     class Meta:
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['name', 'id'], name='country_name_idx'),
+            models.Index(fields=['region_value', 'name', 'id'], name='country_region_name_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.id})"
@@ -36,6 +42,9 @@ class Indicator(models.Model):
 
     class Meta:
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['name', 'id'], name='indicator_name_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.id})"
@@ -46,6 +55,7 @@ class CountryData(models.Model):
     indicator = models.ForeignKey(Indicator, on_delete=models.CASCADE, related_name='country_data')
     country_iso3_code = models.CharField(max_length=3, blank=True)  # 3-letter ISO code
     date = models.CharField(max_length=4)  # Year as string
+    year = models.IntegerField(null=True, blank=True)  # Year as integer, parsed from date at ingest
     value = models.DecimalField(max_digits=20, decimal_places=4, null=True, blank=True)  # Actual indicator value
     unit = models.CharField(max_length=100, blank=True)  # Measurement unit
     obs_status = models.CharField(max_length=10, blank=True)  # Observation status
@@ -53,15 +63,16 @@ class CountryData(models.Model):
 
     class Meta:
         unique_together = ['country', 'indicator', 'date']
-        ordering = ['country', 'indicator', 'date']
+        ordering = ['country', 'indicator', 'year']
+        indexes = [
+            # A country's series in year order, and one indicator across countries by year
+            models.Index(fields=['country', 'indicator', 'year'], name='countrydata_series_idx'),
+            models.Index(fields=['indicator', 'year', '-value'], name='countrydata_indicator_year_idx'),
+        ]
 
     def __str__(self):
         return f"{self.country.name} - {self.indicator.name} ({self.date}): {self.value}"
 
-    @property
-    def year(self):
-        return int(self.date) if self.date.isdigit() else None
-
 
 class HappinessData(models.Model):
     country_name = models.CharField(max_length=100)  # Country name from CSV (for mapping to World Bank codes)
@@ -78,10 +89,21 @@ class HappinessData(models.Model):
     explained_by_social_support = models.DecimalField(max_digits=8, decimal_places=6, null=True, blank=True)  # Social support factor
     explained_by_healthy_life_expectancy = models.DecimalField(max_digits=8, decimal_places=6, null=True, blank=True)  # Health factor
     region = models.CharField(max_length=100, blank=True)  # World Bank region (mapped from country code)
+    rank = models.IntegerField(null=True, blank=True)  # Position by ladder score within the year, ties share a rank
+    percentile = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)  # Share of the year's countries scoring lower
+    rank_change = models.IntegerField(null=True, blank=True)  # Places gained since the previous year
 
     class Meta:
         unique_together = ['country_name', 'year']
         ordering = ['-ladder_score', 'year', 'country_name']
+        indexes = [
+            # Rankings, optionally narrowed to a year, region or country; the trailing id
+            # makes each row's position unique for keyset pagination
+            models.Index(fields=['-ladder_score', 'year', 'id'], name='happiness_ladder_idx'),
+            models.Index(fields=['year', '-ladder_score', 'id'], name='happiness_year_ladder_idx'),
+            models.Index(fields=['region', '-ladder_score', 'year', 'id'], name='happiness_region_ladder_idx'),
+            models.Index(fields=['country', '-ladder_score', 'year', 'id'], name='happiness_country_ladder_idx'),
+        ]
 
     def __str__(self):
         return f"{self.country_name} ({self.year}): {self.ladder_score}"
@@ -94,11 +116,8 @@ class HappinessData(models.Model):
 
     @property
     def happiness_rank(self):
-        """Get the rank of this country for the given year"""
-        return HappinessData.objects.filter(
-            year=self.year,
-            ladder_score__gt=self.ladder_score
-        ).count() + 1
+        """Get the rank of this country for the given year, as materialized at ingest"""
+        return self.rank
 
     @property
     def contributing_factors(self):
@@ -114,6 +133,127 @@ class HappinessData(models.Model):
         }
 
 
+class RegionalAggregate(models.Model):
+    ALL_INCOME_LEVELS = ''  # income_level of the rows summarizing a region across every income level
+
+    region = models.CharField(max_length=100)  # World Bank region of the countries summarized
+    income_level = models.CharField(max_length=100, blank=True)  # World Bank income level, or ALL_INCOME_LEVELS
+    year = models.IntegerField()  # Happiness report year
+    metric = models.CharField(max_length=60)  # HappinessData field summarized, e.g. ladder_score
+    country_count = models.IntegerField()  # Happiness rows in the group, with or without a value
+    count = models.IntegerField()  # Rows with a value for the metric
+    mean = models.FloatField(null=True, blank=True)
+    median = models.FloatField(null=True, blank=True)
+    minimum = models.FloatField(null=True, blank=True)
+    maximum = models.FloatField(null=True, blank=True)
+    stddev = models.FloatField(null=True, blank=True)  # Sample standard deviation
+    q1 = models.FloatField(null=True, blank=True)  # First quartile
+    q3 = models.FloatField(null=True, blank=True)  # Third quartile
+
+    class Meta:
+        unique_together = ['region', 'income_level', 'year', 'metric']
+        ordering = ['metric', 'income_level', 'region', 'year']
+        indexes = [
+            # One metric for every region, optionally one income level, in region then year order
+            models.Index(fields=['metric', 'income_level', 'region', 'year'], name='regional_aggregate_read_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.region} / {self.income_level or 'all incomes'} ({self.year}) {self.metric}: {self.mean}"
+
+
+class SyncLedger(models.Model):
+    SCOPE_SOURCE = 'source'
+    SCOPE_INDICATOR = 'indicator'
+    SCOPE_CHOICES = [
+        (SCOPE_SOURCE, 'Source'),
+        (SCOPE_INDICATOR, 'Indicator'),
+    ]
+
+    scope = models.CharField(max_length=20, choices=SCOPE_CHOICES)  # What the entry tracks
+    key = models.CharField(max_length=50)  # World Bank source ID or indicator code
+    last_updated = models.DateField(null=True, blank=True)  # "lastupdated" reported by the API
+    last_synced_at = models.DateTimeField(null=True, blank=True)  # Time of our last successful pull
+    record_count = models.IntegerField(default=0)  # Records received on the last pull
+
+    class Meta:
+        unique_together = ['scope', 'key']
+        ordering = ['scope', 'key']
+
+    def __str__(self):
+        return f"{self.scope} {self.key}: {self.last_updated}"
+
+
+class IngestRun(models.Model):
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    STATUS_PARTIAL = 'partial'  # Finished, but some indicators failed; resumable
+    STATUS_CHOICES = [
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_COMPLETED, 'Completed'),
+        (STATUS_FAILED, 'Failed'),
+        (STATUS_PARTIAL, 'Partial'),
+    ]
+
+    started_at = models.DateTimeField(auto_now_add=True)  # When the run began
+    finished_at = models.DateTimeField(null=True, blank=True)  # When the run completed or failed
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_RUNNING)
+
+    class Meta:
+        ordering = ['-started_at']
+
+    def __str__(self):
+        return f"Ingest run {self.pk} ({self.status})"
+
+
+class IngestCheckpoint(models.Model):
+    run = models.ForeignKey(IngestRun, on_delete=models.CASCADE, related_name='checkpoints')
+    country = models.ForeignKey(Country, on_delete=models.CASCADE, related_name='+')
+    indicator = models.ForeignKey(Indicator, on_delete=models.CASCADE, related_name='+')
+    completed_at = models.DateTimeField(auto_now_add=True)  # When the unit's chunk committed
+
+    class Meta:
+        unique_together = ['run', 'country', 'indicator']
+
+    def __str__(self):
+        return f"Run {self.run_id}: {self.country_id} / {self.indicator_id}"
+
+
+class DatasetVersion(models.Model):
+    WORLDBANK = 'worldbank'
+    HAPPINESS = 'happiness'
+
+    name = models.CharField(max_length=50, unique=True)  # Dataset the version counts changes of
+    version = models.PositiveIntegerField(default=0)  # Bumped by every ingest that changes data
+    updated_at = models.DateTimeField(default=timezone.now)  # When the dataset last changed
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+    @classmethod
+    def bump(cls, name):
+        """Record that an ingest changed the named dataset"""
+        with transaction.atomic():
+            cls.objects.get_or_create(name=name)
+            cls.objects.filter(name=name).update(version=F('version') + 1, updated_at=timezone.now())
+
+    @classmethod
+    def current(cls):
+        """Token identifying the current state of every dataset, e.g. happiness.2-worldbank.5"""
+        return cls.state()[0]
+
+    @classmethod
+    def state(cls):
+        """The current() token and when any dataset last changed (None before the first ingest), in one query"""
+        rows = list(cls.objects.values_list('name', 'version', 'updated_at'))
+        token = '-'.join(f"{name}.{version}" for name, version, _ in rows)
+        return token, max((updated_at for _, _, updated_at in rows), default=None)
+
+
 # Country name to World Bank code mapping
 COUNTRY_NAME_TO_CODE_MAPPING = {
     # Major countries
@@ -0,0 +1,171 @@
+import json
+from base64 import b64decode, b64encode
+from typing import List, Optional
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+TRUE_VALUES = ('1', 'true', 'yes')
+SQLITE_INTEGER_MIN, SQLITE_INTEGER_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+class KeysetPagination(BasePagination):
+    """Page through a listing by seeking past the last row served instead of counting and offsetting.
+
+    The queryset's ordering, with the primary key appended when missing,
+    makes every row's position unique, so pages never overlap or skip rows
+    and a page costs one index range read however deep it is. The ``cursor``
+    parameter carries the last row's ordering values; ``page_size`` is capped
+    at ``max_page_size``, and the total is only counted with ``?count=true``.
+    Nullable ordering fields sort the way SQLite does, with NULL below every value.
+    """
+
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.fields = self.get_ordering(queryset)
+        size = self.get_page_size(request)
+        position = self.decode_cursor(request, queryset.model)
+
+        self.count = queryset.count() if self.wants_count(request) else None
+        ordered = queryset.order_by(*(f'-{name}' if descending else name for name, descending in self.fields))
+        if position is None:
+            rows = list(ordered[:size + 1])  # One row past the page tells whether there is a next page
+        else:
+            rows = list(ordered.filter(self.after(queryset.model, position))[:size + 1])
+            name, descending = self.fields[0]
+            if descending and position[0] is not None and len(rows) <= size:
+                # NULLs sort last descending and after() seeks among values only, so the page
+                # that runs out of values continues into the NULLs
+                if queryset.model._meta.get_field(name).null:
+                    rows += list(ordered.filter(**{f'{name}__isnull': True})[:size + 1 - len(rows)])
+
+        page = rows[:size]
+        self.next_position = self.position_of(page[-1]) if len(rows) > size else None
+        return page
+
+    def get_paginated_response(self, data):
+        payload = {'next': self.get_next_link()}
+        if self.count is not None:
+            payload['count'] = self.count
+        payload['results'] = data
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        properties = {
+            'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+            'count': {'type': 'integer'},
+            'results': schema,
+        }
+        return {'type': 'object', 'properties': properties}
+
+    def get_ordering(self, queryset) -> List[tuple]:
+        """(column, descending) pairs the listing is ordered by, ending with the primary key"""
+        pk = queryset.model._meta.pk
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+        fields = []
+        for term in ordering:
+            if not isinstance(term, str) or '__' in term or term.lstrip('-') == '?':
+                raise ValueError(f'Keyset pagination needs plain field orderings, got {term!r}')
+            name = term.lstrip('-')
+            field = pk if name == 'pk' else queryset.model._meta.get_field(name)
+            fields.append((field.attname, term.startswith('-')))
+        if pk.attname not in (name for name, _ in fields):
+            fields.append((pk.attname, False))
+        return fields
+
+    def get_page_size(self, request) -> int:
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(requested, self.max_page_size) if requested > 0 else self.page_size
+
+    def wants_count(self, request) -> bool:
+        return request.query_params.get(self.count_query_param, '').lower() in TRUE_VALUES
+
+    def decode_cursor(self, request, model) -> Optional[list]:
+        """The cursor's position, each value converted and validated as its ordering field would be"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(b64decode(encoded.encode('ascii'), validate=True).decode('utf-8'))
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.fields):
+            raise NotFound(self.invalid_cursor_message)
+
+        values = []
+        for (name, _), value in zip(self.fields, position):
+            field = model._meta.get_field(name)
+            if value is None:
+                if not field.null:
+                    raise NotFound(self.invalid_cursor_message)
+                values.append(None)
+                continue
+            if isinstance(value, (list, dict)):
+                raise NotFound(self.invalid_cursor_message)
+            try:
+                value = field.to_python(value)
+                field.run_validators(value)
+            except (ValidationError, ValueError, TypeError):
+                raise NotFound(self.invalid_cursor_message)
+            if isinstance(value, int) and not SQLITE_INTEGER_MIN <= value <= SQLITE_INTEGER_MAX:
+                raise NotFound(self.invalid_cursor_message)  # SQLite can't bind it, and no row could hold it
+            values.append(value)
+        return values
+
+    def encode_cursor(self, position: list) -> str:
+        return b64encode(json.dumps(position, cls=DjangoJSONEncoder).encode('utf-8')).decode('ascii')
+
+    def position_of(self, instance) -> list:
+        return [getattr(instance, name) for name, _ in self.fields]
+
+    def after(self, model, position: list) -> Q:
+        """Rows that sort after ``position``: ties on every earlier field and past it on the next one.
+
+        The first field's bound is also stated on its own, so the database
+        seeks to it in the ordering index instead of filtering from the start;
+        for a descending nullable field that bound leaves out the trailing NULLs.
+        """
+        condition = Q(pk__in=[])
+        ties = Q()
+        for (name, descending), value in zip(self.fields, position):
+            nullable = model._meta.get_field(name).null
+            if value is None:
+                # NULL sorts first: everything non-null follows it ascending, nothing does descending
+                past = Q(**{f'{name}__isnull': False}) if not descending else Q(pk__in=[])
+                tie = Q(**{f'{name}__isnull': True})
+            else:
+                past = Q(**{f'{name}__lt' if descending else f'{name}__gt': value})
+                if descending and nullable:
+                    past |= Q(**{f'{name}__isnull': True})
+                tie = Q(**{name: value})
+            condition |= ties & past
+            ties &= tie
+
+        name, descending = self.fields[0]
+        first = position[0]
+        if first is not None:
+            condition &= Q(**{f'{name}__lte' if descending else f'{name}__gte': first})
+        return condition
+
+    def get_next_link(self) -> Optional[str]:
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+        return remove_query_param(url, self.count_query_param)  # Later pages don't count again
@@ -0,0 +1,74 @@
+import difflib
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .models import Country, COUNTRY_NAME_TO_CODE_MAPPING
+
+# Trailing qualifiers World Bank and WHR names add after a comma, e.g. "Egypt, Arab Rep."
+NAME_SUFFIXES = {
+    'rep', 'arab rep', 'islamic rep', 'rb', 'the', 'fed sts', 'kingdom of', 'republic of',
+}
+
+
+@lru_cache(maxsize=4096)
+def normalize_country_name(name: str) -> str:
+    """Fold case, accents, asterisks, punctuation and "Rep."-style suffixes of a country name"""
+    text = unicodedata.normalize('NFKD', name)
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    text = text.strip().rstrip('*').strip().lower()
+    if ',' in text:
+        head, tail = text.rsplit(',', 1)
+        if re.sub(r'[^a-z ]+', '', tail).strip() in NAME_SUFFIXES:
+            text = head
+    return re.sub(r'[^a-z0-9]+', ' ', text).strip()
+
+
+class CountryResolver:
+    """In-memory index resolving happiness report country names and codes to Country ids.
+
+    Built once from COUNTRY_NAME_TO_CODE_MAPPING plus every Country row (id,
+    ISO2 code and name), so resolving names needs no per-row queries.
+    """
+
+    def __init__(self, countries: Iterable[Tuple[str, str, str]],
+                 mapping: Dict[str, str] = COUNTRY_NAME_TO_CODE_MAPPING):
+        self.names = {}
+        self.codes = {}
+        self.by_name = {}
+        for country_id, iso2_code, name in countries:
+            self.names[country_id] = name
+            self.codes[country_id.upper()] = country_id
+            if iso2_code:
+                self.codes.setdefault(iso2_code.upper(), country_id)
+            self.by_name[normalize_country_name(name)] = country_id
+
+        # Mapping entries point at ISO2 or World Bank codes; keep those we can place
+        for name, code in mapping.items():
+            country_id = self.codes.get(code.upper())
+            if country_id is not None:
+                self.by_name.setdefault(normalize_country_name(name), country_id)
+
+    @classmethod
+    def build(cls) -> 'CountryResolver':
+        """Build the index from the database in a single query"""
+        return cls(Country.objects.values_list('id', 'iso2_code', 'name'))
+
+    def resolve_code(self, code: Optional[str]) -> Optional[str]:
+        """Resolve a World Bank id or ISO2 code to a Country id"""
+        return self.codes.get(code.upper()) if code else None
+
+    def resolve(self, name: str, code_hint: Optional[str] = None) -> Optional[str]:
+        """Resolve a country name (optionally with a mapped code) to a Country id"""
+        return self.resolve_code(code_hint) or self.by_name.get(normalize_country_name(name))
+
+    def suggest(self, name: str, limit: int = 3) -> List[str]:
+        """Closest known country names for an unresolved name"""
+        matches = difflib.get_close_matches(normalize_country_name(name), self.by_name, n=limit, cutoff=0.7)
+        suggestions = []
+        for match in matches:
+            label = f"{self.names[self.by_name[match]]} ({self.by_name[match]})"
+            if label not in suggestions:
+                suggestions.append(label)
+        return suggestions
@@ -20,7 +20,6 @@ class IndicatorSerializer(serializers.ModelSerializer):
 class CountryDataSerializer(serializers.ModelSerializer):
     country_name = serializers.CharField(source='country.name', read_only=True)
     indicator_name = serializers.CharField(source='indicator.name', read_only=True)
-    year = serializers.SerializerMethodField()
 
     class Meta:
         model = CountryData
@@ -28,18 +27,16 @@ class CountryDataSerializer(serializers.ModelSerializer):
             'country', 'country_name', 'indicator', 'indicator_name', 
             'date', 'year', 'value', 'unit'
         ]
-    
-    def get_year(self, obj):
-        return int(obj.date) if obj.date.isdigit() else None
 
 
 class HappinessDataSerializer(serializers.ModelSerializer):
-    country_code = serializers.CharField(source='country.id', read_only=True)
+    country_code = serializers.CharField(source='country_id', read_only=True)
 
     class Meta:
         model = HappinessData
         fields = [
             'country_name', 'country_code', 'year', 'ladder_score', 
+            'rank', 'percentile', 'rank_change',
             'upper_whisker', 'lower_whisker', 'region',
             'explained_by_freedom_to_make_life_choices',
             'explained_by_generosity',
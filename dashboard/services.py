@@ -1,39 +1,161 @@
 import requests
+import openpyxl
 import pandas as pd
+import hashlib
+import json
 import logging
+import math
+import os
+import pickle
+import queue
+import re
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+from datetime import date
 from decimal import Decimal, InvalidOperation
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Iterable, Iterator, NamedTuple, Tuple
+from requests.adapters import HTTPAdapter
 from django.core.cache import cache
 from django.conf import settings
-from .models import Country, Indicator, CountryData, HappinessData, COUNTRY_NAME_TO_CODE_MAPPING
+from django.db import connection, models, reset_queries, transaction
+from django.db.models import F, FloatField, Window
+from django.db.models.functions import Cast, PercentRank, Rank
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from .client_policy import RequestPolicy
+from .facts import rebuild_country_year_facts
+from .http_cache import ResponseCache
+from .worldbank_stub import WorldBankStubAdapter
+from .resolution import CountryResolver
+from .models import (
+    Country, Indicator, CountryData, HappinessData, RegionalAggregate, SyncLedger, IngestRun, IngestCheckpoint,
+    DatasetVersion, COUNTRY_NAME_TO_CODE_MAPPING
+)
 
 logger = logging.getLogger(__name__)
 
+_response_caches = {}
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Return the process-wide persistent response cache configured in settings"""
+    config = getattr(settings, 'WORLDBANK_RESPONSE_CACHE', None) or {}
+    path = config.get('PATH')
+    if not path:
+        return None
+    if path not in _response_caches:
+        _response_caches[path] = ResponseCache(
+            path,
+            max_bytes=config.get('MAX_BYTES', 256 * 1024 * 1024),
+            max_age=config.get('MAX_AGE', WorldBankAPIService.CACHE_TIMEOUT),
+        )
+    return _response_caches[path]
+
+
+class PageResult(NamedTuple):
+    index: int  # Position of the request in the request specs
+    page: int
+    metadata: Dict
+    records: List[Dict]
+    complete: bool  # Every page of the request has now been delivered
+
+
+class BulkPage(NamedTuple):
+    indicator_codes: List[str]
+    rows: Iterator[Dict]  # CountryData rows, produced lazily from the page's records
+    last_updated: Optional[date]
+    complete: bool
+
 
 class WorldBankAPIService:
     """Service for interacting with World Bank APIs"""
     
     BASE_URL = "https://api.worldbank.org/v2"
     CACHE_TIMEOUT = 3600  # 1 hour
+    PER_PAGE = 1000
+    BULK_PER_PAGE = 10000  # Records per page for country/all requests
+    MAX_WORKERS = 8
+    MAX_INDICATORS_PER_REQUEST = 60  # API limit for the A;B;C indicator form
+    DEFAULT_SOURCE_ID = '2'  # World Development Indicators
     
-    def __init__(self):
+    def __init__(self, max_workers: int = None, response_cache: Optional[ResponseCache] = None,
+                 revalidate: bool = False):
+        self.max_workers = max_workers or getattr(settings, 'WORLDBANK_MAX_WORKERS', self.MAX_WORKERS)
+        self.response_cache = response_cache if response_cache is not None else get_response_cache()
+        self.revalidate = revalidate  # Check even fresh cached responses upstream, e.g. for forced reloads
+        self.policy = RequestPolicy.from_settings(
+            getattr(settings, 'WORLDBANK_CLIENT_POLICY', None), max_concurrency=self.max_workers
+        )
+        self.requests_made = 0
+        self.pages_requeued = 0
+        self.pages_recovered = 0
+        self.pages_failed = 0
+        self._counter_lock = threading.Lock()
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'HappyData-Dashboard/1.0'
         })
+        # Size the connection pool so every worker can keep its connection alive
+        adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+        stub_config = getattr(settings, 'WORLDBANK_OFFLINE_STUB', None)
+        if stub_config:
+            # Serve synthetic responses locally instead of calling the real API
+            adapter = WorldBankStubAdapter(**{key.lower(): value for key, value in stub_config.items()})
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
 
     def _make_request(self, url: str, params: Dict = None) -> Optional[Dict]:
         """Make a request to World Bank API with error handling"""
         try:
-            params = params or {}
-            params.update({'format': 'json', 'per_page': 1000})
+            params = dict(params or {})
+            params.setdefault('format', 'json')
+            params.setdefault('per_page', self.PER_PAGE)
+            
+            cache_key = cached = None
+            headers = {}
+            if self.response_cache is not None:
+                cache_key = self.response_cache.make_key(url, params)
+                cached = self.response_cache.get(cache_key)
+                if cached is not None:
+                    if self.response_cache.is_fresh(cached) and not self.revalidate:
+                        self.response_cache.record('hit', len(cached.body))
+                        return json.loads(cached.body)
+                    # Stale entry or forced reload: ask the API whether it changed
+                    if cached.etag:
+                        headers['If-None-Match'] = cached.etag
+                    if cached.last_modified:
+                        headers['If-Modified-Since'] = cached.last_modified
+            if self.revalidate:
+                headers['Cache-Control'] = 'no-cache'
+            
+            def send():
+                logger.info(f"Making request to: {url}")
+                with self._counter_lock:
+                    self.requests_made += 1
+                return self.session.get(url, params=params, timeout=30, headers=headers)
+            
+            # Retries transient errors with backoff; raises once they are exhausted
+            response = self.policy.execute(send)
             
-            logger.info(f"Making request to: {url}")
-            response = self.session.get(url, params=params, timeout=30)
+            if response.status_code == 304 and cached is not None:
+                self.response_cache.mark_revalidated(cache_key)
+                self.response_cache.record('revalidated', len(cached.body))
+                return json.loads(cached.body)
             response.raise_for_status()
             
             data = response.json()
             if len(data) >= 2:
+                if self.response_cache is not None:
+                    self.response_cache.record('miss')
+                    self.response_cache.set(
+                        cache_key, url, response.content,
+                        etag=response.headers.get('ETag', ''),
+                        last_modified=response.headers.get('Last-Modified', ''),
+                    )
                 return data
             return None
             
@@ -44,17 +166,26 @@ class WorldBankAPIService:
             logger.error(f"JSON parsing failed: {e}")
             return None
 
+    def retry_stats(self) -> Dict[str, int]:
+        """Request policy counters plus the outcome of end-of-run page retries"""
+        return {
+            **self.policy.stats(),
+            'pages_requeued': self.pages_requeued,
+            'pages_recovered': self.pages_recovered,
+            'pages_failed': self.pages_failed,
+        }
+
     def fetch_countries(self) -> List[Dict]:
         """Fetch all countries from World Bank API"""
         cache_key = 'wb_countries'
-        cached_data = cache.get(cache_key)
-        if cached_data:
+        cached_data = None if self.revalidate else cache.get(cache_key)
+        if cached_data is not None:
             return cached_data
 
         url = f"{self.BASE_URL}/country"
-        response_data = self._make_request(url)
+        response_data = self._fetch_all_pages([(url, {})])[0]
         
-        if not response_data:
+        if response_data is None:
             return []
 
         countries = []
@@ -104,8 +235,8 @@ class WorldBankAPIService:
         ]
 
         cache_key = 'wb_indicators'
-        cached_data = cache.get(cache_key)
-        if cached_data:
+        cached_data = None if self.revalidate else cache.get(cache_key)
+        if cached_data is not None:
             return cached_data
 
         indicators = []
@@ -133,42 +264,187 @@ class WorldBankAPIService:
         cache.set(cache_key, indicators, self.CACHE_TIMEOUT)
         return indicators
 
-    def fetch_country_indicator_data(self, country_code: str, indicator_code: str, 
-                                   start_year: int = 2020, end_year: int = 2025) -> List[Dict]:
-        """Fetch indicator data for a specific country"""
-        cache_key = f'wb_data_{country_code}_{indicator_code}_{start_year}_{end_year}'
-        cached_data = cache.get(cache_key)
-        if cached_data:
-            return cached_data
+    def fetch_source_updates(self) -> Dict[str, date]:
+        """Fetch the lastupdated date of every World Bank data source in one request"""
+        response_data = self._fetch_all_pages([(f"{self.BASE_URL}/sources", {})])[0]
+        if response_data is None:
+            return {}
 
-        url = f"{self.BASE_URL}/country/{country_code}/indicator/{indicator_code}"
-        params = {'date': f'{start_year}:{end_year}'}
-        response_data = self._make_request(url, params)
-        
-        if not response_data:
-            return []
+        return {
+            str(source['id']): parse_date(source['lastupdated'])
+            for source in response_data[1]
+            if source.get('lastupdated')
+        }
+
+    def iter_bulk_indicator_data(self, indicator_codes: Iterable[str], start_year: int = 2020,
+                                 end_year: int = 2025, source_ids: Dict[str, str] = None,
+                                 max_pending: int = None) -> Iterator['BulkPage']:
+        """Stream indicator data for all countries using the country/all and A;B;C API forms.
+
+        Yields one BulkPage per API page as it arrives, with its records already
+        converted to CountryData rows, so no more than ``max_pending`` pages are
+        held in memory at once (see iter_pages).
+        """
+        request_specs = []
+        for source_id, chunk in self._plan_bulk_requests(indicator_codes, source_ids):
+            url = f"{self.BASE_URL}/country/all/indicator/{';'.join(chunk)}"
+            params = {'date': f'{start_year}:{end_year}', 'per_page': self.BULK_PER_PAGE}
+            if len(chunk) > 1:
+                params['source'] = source_id  # Required by the multi-indicator form
+            request_specs.append((chunk, url, params))
+
+        pages = self.iter_pages([(url, params) for _, url, params in request_specs], max_pending=max_pending)
+        for page in pages:
+            yield BulkPage(
+                indicator_codes=request_specs[page.index][0],
+                rows=self._iter_country_data_rows(page.records),
+                last_updated=parse_date(page.metadata.get('lastupdated') or ''),
+                complete=page.complete,
+            )
+
+    def estimate_bulk_requests(self, indicator_codes: Iterable[str], source_ids: Dict[str, str] = None,
+                               record_counts: Dict[str, int] = None) -> int:
+        """Estimate how many requests iter_bulk_indicator_data needs from known record counts"""
+        record_counts = record_counts or {}
+        return sum(
+            max(1, math.ceil(sum(record_counts.get(code, 0) for code in chunk) / self.BULK_PER_PAGE))
+            for _, chunk in self._plan_bulk_requests(indicator_codes, source_ids)
+        )
 
-        data_points = []
-        for record in response_data[1]:  # Skip metadata
-            if record['value'] is not None:
+    def _plan_bulk_requests(self, indicator_codes: Iterable[str],
+                            source_ids: Dict[str, str] = None) -> List[Tuple[str, List[str]]]:
+        """Group indicators by source into chunks that fit one multi-indicator request"""
+        source_ids = source_ids or {}
+        by_source = defaultdict(list)
+        for indicator_code in indicator_codes:
+            by_source[source_ids.get(indicator_code) or self.DEFAULT_SOURCE_ID].append(indicator_code)
+
+        return [
+            (source_id, codes[start:start + self.MAX_INDICATORS_PER_REQUEST])
+            for source_id, codes in sorted(by_source.items())
+            for start in range(0, len(codes), self.MAX_INDICATORS_PER_REQUEST)
+        ]
+
+    def _fetch_all_pages(self, request_specs: List[Tuple[str, Dict]]) -> List[Optional[Tuple[Dict, List[Dict]]]]:
+        """Fetch every page of each (url, params) request and combine them.
+
+        Returns the first page's metadata and the combined records per request,
+        or None where any page could not be fetched.
+        """
+        results = [None] * len(request_specs)
+        complete = set()
+        for page in self.iter_pages(request_specs):
+            if page.page == 1:
+                results[page.index] = (page.metadata, list(page.records))
+            else:
+                results[page.index][1].extend(page.records)
+            if page.complete:
+                complete.add(page.index)
+
+        # A partial result would look like a complete sync, so drop it entirely
+        for index, result in enumerate(results):
+            if result is not None and index not in complete:
+                logger.error(f"Missing pages of {request_specs[index][0]}; discarding the request")
+                results[index] = None
+        return results
+
+    def iter_pages(self, request_specs: List[Tuple[str, Dict]], max_pending: int = None) -> Iterator['PageResult']:
+        """Yield the pages of each (url, params) request as the worker pool fetches them.
+
+        First pages are fetched concurrently to learn the ``pages`` count from the
+        metadata, and each request's remaining pages are queued as soon as its
+        first page arrives. Fetched pages wait in a queue of ``max_pending``
+        entries; while the consumer is busy the queue fills and the workers stall,
+        so memory stays bounded however many pages are pulled. Pages that still
+        fail after the request policy's retries are requeued once at the end,
+        after the circuit breaker lets requests through again. The last page of a
+        request whose pages all arrived is marked ``complete``.
+        """
+        if not request_specs:
+            return
+
+        delivered = queue.Queue(maxsize=max_pending or self.max_workers * 2)
+        stopped = threading.Event()
+
+        def fetch(index, page):
+            url, params = request_specs[index]
+            try:
+                response_data = self._make_request(url, {**params, 'page': page} if page > 1 else params)
+            except Exception as e:
+                logger.error(f"Fetching page {page} of {url} failed: {e}")
+                response_data = None
+            while not stopped.is_set():
                 try:
-                    data_point = {
-                        'country_id': record['country']['id'],
-                        'country_iso3_code': record.get('countryiso3code', ''),
-                        'indicator_id': record['indicator']['id'],
-                        'date': record['date'],
-                        'value': self._safe_decimal(record['value']),
-                        'unit': record.get('unit', ''),
-                        'obs_status': record.get('obs_status', ''),
-                        'decimal_places': record.get('decimal', 0)
-                    }
-                    data_points.append(data_point)
-                except Exception as e:
-                    logger.error(f"Error processing data point: {e}")
+                    delivered.put((index, page, response_data), timeout=0.1)
+                    return
+                except queue.Full:
                     continue
 
-        cache.set(cache_key, data_points, self.CACHE_TIMEOUT // 2)  # Shorter cache for data
-        return data_points
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        outstanding = 0
+
+        def submit(index, page):
+            nonlocal outstanding
+            outstanding += 1
+            executor.submit(fetch, index, page)
+
+        remaining = {}  # Pages still to arrive per request, known once its first page has
+        failed = []
+        requeued = None
+        try:
+            for index in range(len(request_specs)):
+                submit(index, 1)
+            while outstanding:
+                index, page, response_data = delivered.get()
+                outstanding -= 1
+                if not response_data:
+                    failed.append((index, page))
+                else:
+                    if page == 1:
+                        remaining[index] = int(response_data[0].get('pages') or 1)
+                        for follow_up in range(2, remaining[index] + 1):
+                            submit(index, follow_up)
+                    remaining[index] -= 1
+                    yield PageResult(index, page, response_data[0], response_data[1] or [], remaining[index] == 0)
+                    del response_data
+
+                if not outstanding and failed and requeued is None:
+                    logger.warning(f"Requeueing {len(failed)} failed pages for a retry at the end of the run")
+                    self.policy.wait_for_circuit()
+                    requeued, failed = failed, []
+                    for index, page in requeued:
+                        submit(index, page)
+        finally:
+            stopped.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+
+        if requeued:
+            with self._counter_lock:
+                self.pages_requeued += len(requeued)
+                self.pages_recovered += len(set(requeued) - set(failed))
+                self.pages_failed += len(failed)
+        for index, page in failed:
+            logger.error(f"Giving up on page {page} of {request_specs[index][0]}")
+
+    def _iter_country_data_rows(self, records: List[Dict]) -> Iterator[Dict]:
+        """Convert raw indicator records to CountryData rows, dropping empty values"""
+        for record in records:
+            if record['value'] is None:
+                continue
+            try:
+                yield {
+                    'country_id': record['countryiso3code'],
+                    'indicator_id': record['indicator']['id'],
+                    'date': record['date'],
+                    'year': self._safe_year(record['date']),
+                    'country_iso3_code': record['countryiso3code'],
+                    'value': self._safe_decimal(record['value']),
+                    'unit': record.get('unit', ''),
+                    'obs_status': record.get('obs_status', ''),
+                    'decimal_places': record.get('decimal', 0),
+                }
+            except (KeyError, TypeError) as e:
+                logger.error(f"Error processing data point: {e}")
 
     def _safe_decimal(self, value) -> Optional[Decimal]:
         """Safely convert value to Decimal"""
@@ -179,270 +455,767 @@ class WorldBankAPIService:
         except (InvalidOperation, ValueError):
             return None
 
+    def _safe_year(self, value) -> Optional[int]:
+        """Year of a World Bank date such as '2023', or None for other periods"""
+        value = str(value or '')
+        return int(value) if len(value) == 4 and value.isdigit() else None
+
 
 class HappinessDataService:
     """Service for processing World Happiness Report Excel data"""
     
-    def __init__(self, excel_file_path: str):
+    # Excel column -> record field
+    COLUMN_MAP = {
+        'Country name': 'country_name',
+        'Year': 'year',
+        'Ladder score': 'ladder_score',
+        'upperwhisker': 'upper_whisker',
+        'lowerwhisker': 'lower_whisker',
+        'Explained by: Freedom to make life choices': 'explained_by_freedom_to_make_life_choices',
+        'Explained by: Generosity': 'explained_by_generosity',
+        'Explained by: Perceptions of corruption': 'explained_by_perceptions_of_corruption',
+        'Dystopia + residual': 'dystopia_plus_residual',
+        'Explained by: Log GDP per capita': 'explained_by_log_gdp_per_capita',
+        'Explained by: Social support': 'explained_by_social_support',
+        'Explained by: Healthy life expectancy': 'explained_by_healthy_life_expectancy',
+    }
+    REQUIRED_COLUMNS = ['Country name', 'Ladder score']
+    # Numeric fields and the decimal places HappinessData stores them with
+    DECIMAL_FIELDS = {
+        'ladder_score': 4,
+        'upper_whisker': 6,
+        'lower_whisker': 6,
+        'explained_by_freedom_to_make_life_choices': 6,
+        'explained_by_generosity': 6,
+        'explained_by_perceptions_of_corruption': 6,
+        'dystopia_plus_residual': 6,
+        'explained_by_log_gdp_per_capita': 6,
+        'explained_by_social_support': 6,
+        'explained_by_healthy_life_expectancy': 6,
+    }
+    BATCH_SIZE = 5000
+    CACHE_SUFFIX = '.parsed.pkl'
+    CACHE_FORMAT_VERSION = 1  # Bump when normalization rules change
+    
+    def __init__(self, excel_file_path: str, use_cache: bool = True):
         self.excel_file_path = excel_file_path
+        self.use_cache = use_cache
+        self.cache_path = f"{excel_file_path}{self.CACHE_SUFFIX}"
+        self.cache_hit = None  # Set once frames have been produced with the cache enabled
 
     def process_happiness_excel_file(self) -> List[Dict]:
         """Load and process World Happiness Report Excel file"""
+        all_data = []
+        for batch in self.iter_record_batches():
+            all_data.extend(batch)
+        
+        logger.info(f"Processed {len(all_data)} happiness data records")
+        return all_data
+
+    def iter_record_batches(self, batch_size: int = BATCH_SIZE) -> Iterable[List[Dict]]:
+        """Yield processed records in batches, parsing each sheet exactly once"""
+        for frame in self.iter_frames(batch_size):
+            yield self._frame_to_records(frame)
+
+    def iter_frames(self, batch_size: int = BATCH_SIZE) -> Iterable[pd.DataFrame]:
+        """Yield normalized DataFrames of at most batch_size rows.
+
+        With the cache enabled, a columnar copy of the normalized data is kept next
+        to the workbook keyed by the file's SHA-256, and the workbook is only
+        re-parsed when its hash changes.
+        """
+        if not self.use_cache:
+            for frame in self._parse_frames(batch_size):
+                yield self._map_country_codes(frame)
+            return
+        
+        file_hash = self._file_hash()
+        cached = self._load_cache(file_hash)
+        self.cache_hit = cached is not None
+        if cached is not None:
+            logger.info(f"Using parsed workbook cache {self.cache_path}")
+            for start in range(0, len(cached), batch_size):
+                yield self._map_country_codes(cached.iloc[start:start + batch_size])
+            return
+        
+        parsed = []
+        for frame in self._parse_frames(batch_size):
+            parsed.append(frame)
+            yield self._map_country_codes(frame)
+        self._write_cache(file_hash, pd.concat(parsed, ignore_index=True) if parsed else self._empty_frame())
+
+    def _parse_frames(self, batch_size: int) -> Iterable[pd.DataFrame]:
+        """Stream the workbook sheet by sheet, parsing each sheet exactly once"""
         try:
             logger.info(f"Loading happiness data from: {self.excel_file_path}")
-            
-            # Try reading the Excel file (could be single sheet or multiple sheets)
-            excel_file = pd.ExcelFile(self.excel_file_path)
-            logger.info(f"Excel sheets found: {excel_file.sheet_names}")
-            
-            all_data = []
-            
-            # If there's only one sheet, assume it contains all years
-            if len(excel_file.sheet_names) == 1:
-                df = pd.read_excel(self.excel_file_path, sheet_name=0)
-                all_data = self._process_dataframe(df)
-            else:
-                # Multiple sheets, process each one
-                for sheet_name in excel_file.sheet_names:
-                    try:
-                        df = pd.read_excel(self.excel_file_path, sheet_name=sheet_name)
-                        sheet_data = self._process_dataframe(df, sheet_name)
-                        all_data.extend(sheet_data)
-                    except Exception as e:
-                        logger.error(f"Error processing sheet {sheet_name}: {e}")
-                        continue
-            
-            logger.info(f"Processed {len(all_data)} happiness data records")
-            return all_data
-            
+            workbook = openpyxl.load_workbook(self.excel_file_path, read_only=True, data_only=True)
         except Exception as e:
             logger.error(f"Error reading Excel file: {e}")
-            return []
-
-    def _process_dataframe(self, df: pd.DataFrame, sheet_name: str = None) -> List[Dict]:
-        """Process a single DataFrame from Excel"""
-        data_records = []
+            return
         
+        try:
+            logger.info(f"Excel sheets found: {workbook.sheetnames}")
+            # A single sheet is assumed to hold every year
+            single_sheet = len(workbook.sheetnames) == 1
+            for worksheet in workbook.worksheets:
+                sheet_name = worksheet.title
+                try:
+                    rows = worksheet.iter_rows(values_only=True)
+                    header = next(rows, None)
+                    if header is None:
+                        continue
+                    columns = ['' if value is None else str(value) for value in header]
+                    while True:
+                        chunk = list(islice(rows, batch_size))
+                        if not chunk:
+                            break
+                        df = pd.DataFrame.from_records(chunk, columns=columns)
+                        frame = self._process_dataframe(df, None if single_sheet else sheet_name)
+                        if len(frame):
+                            yield frame
+                except Exception as e:
+                    logger.error(f"Error processing sheet {sheet_name}: {e}")
+                    continue
+        finally:
+            workbook.close()
+
+    def _process_dataframe(self, df: pd.DataFrame, sheet_name: str = None) -> pd.DataFrame:
+        """Normalize a single sheet into typed record columns using whole-column operations"""
         # Standardize column names
-        df.columns = df.columns.str.strip()
+        df.columns = df.columns.astype(str).str.strip()
         
         # Check if 'Year' column exists, if not try to infer from sheet name
-        if 'Year' not in df.columns and sheet_name:
+        if 'Year' not in df.columns:
             # Try to extract year from sheet name (e.g., "2020", "Data2021", etc.)
-            import re
-            year_match = re.search(r'(\d{4})', sheet_name)
-            if year_match:
-                df['Year'] = int(year_match.group(1))
-            else:
+            year_match = re.search(r'(\d{4})', sheet_name or '')
+            if not year_match:
                 logger.warning(f"Could not determine year for sheet: {sheet_name}")
-                return []
+                return self._empty_frame()
+            df['Year'] = int(year_match.group(1))
         
-        # Filter for years 2020-2025
-        if 'Year' in df.columns:
-            df = df[df['Year'].between(2020, 2025)]
+        missing = [column for column in self.REQUIRED_COLUMNS if column not in df.columns]
+        if missing:
+            logger.warning(f"Sheet {sheet_name or 0} is missing columns: {', '.join(missing)}")
+            return self._empty_frame()
         
-        for _, row in df.iterrows():
-            try:
-                country_name = str(row.get('Country name', '')).strip()
-                if not country_name or country_name.lower() in ['nan', 'none']:
-                    continue
-                
-                # Clean country name (remove asterisks and extra spaces)
-                country_name = country_name.rstrip('*').strip()
-                
-                # Map country name to World Bank code
-                wb_country_code = COUNTRY_NAME_TO_CODE_MAPPING.get(country_name)
-                
-                data_record = {
-                    'country_name': country_name,
-                    'wb_country_code': wb_country_code,
-                    'year': int(row.get('Year', 0)),
-                    'ladder_score': self._safe_decimal(row.get('Ladder score')),
-                    'upper_whisker': self._safe_decimal(row.get('upperwhisker')),
-                    'lower_whisker': self._safe_decimal(row.get('lowerwhisker')),
-                    'explained_by_freedom_to_make_life_choices': self._safe_decimal(
-                        row.get('Explained by: Freedom to make life choices')
-                    ),
-                    'explained_by_generosity': self._safe_decimal(
-                        row.get('Explained by: Generosity')
-                    ),
-                    'explained_by_perceptions_of_corruption': self._safe_decimal(
-                        row.get('Explained by: Perceptions of corruption')
-                    ),
-                    'dystopia_plus_residual': self._safe_decimal(
-                        row.get('Dystopia + residual')
-                    ),
-                    'explained_by_log_gdp_per_capita': self._safe_decimal(
-                        row.get('Explained by: Log GDP per capita')
-                    ),
-                    'explained_by_social_support': self._safe_decimal(
-                        row.get('Explained by: Social support')
-                    ),
-                    'explained_by_healthy_life_expectancy': self._safe_decimal(
-                        row.get('Explained by: Healthy life expectancy')
-                    ),
-                }
-                
-                # Skip if essential data is missing
-                if not data_record['ladder_score'] or data_record['year'] < 2020:
-                    continue
-                
-                data_records.append(data_record)
-                
-            except Exception as e:
-                logger.error(f"Error processing row: {e}")
-                continue
+        frame = df.reindex(columns=list(self.COLUMN_MAP)).rename(columns=self.COLUMN_MAP)
+        
+        raw_names = frame['country_name'].astype('string').str.strip()
+        # Clean country name (remove asterisks and extra spaces)
+        names = raw_names.str.rstrip('*').str.strip()
+        years = pd.to_numeric(frame['year'], errors='coerce')
         
-        return data_records
+        # Zero marks missing data in the happiness report
+        for field_name, places in self.DECIMAL_FIELDS.items():
+            values = pd.to_numeric(frame[field_name], errors='coerce').round(places)
+            frame[field_name] = values.mask(values == 0)
+        
+        keep = (
+            names.notna() & (names != '') & ~raw_names.str.lower().isin(['nan', 'none'])
+            & years.between(2020, 2025)
+            & frame['ladder_score'].notna()
+        ).fillna(False).astype(bool)
+        
+        frame = frame[keep].copy()
+        frame['country_name'] = names[keep].astype(object)
+        frame['year'] = years[keep].astype(int)
+        return frame
 
-    def _safe_decimal(self, value) -> Optional[Decimal]:
-        """Safely convert value to Decimal, handling zeros as None for missing data"""
-        if pd.isna(value) or value is None or value == '':
-            return None
+    @staticmethod
+    def _map_country_codes(frame: pd.DataFrame) -> pd.DataFrame:
+        """Map country names to World Bank codes (kept out of the cache so mapping changes apply)"""
+        return frame.assign(wb_country_code=frame['country_name'].map(COUNTRY_NAME_TO_CODE_MAPPING))
+
+    def _empty_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(columns=list(self.COLUMN_MAP.values()))
+
+    def _file_hash(self) -> str:
+        """SHA-256 of the workbook contents"""
+        digest = hashlib.sha256()
+        with open(self.excel_file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _load_cache(self, file_hash: str) -> Optional[pd.DataFrame]:
+        """Rebuild the normalized frame from the cache if it matches the workbook"""
         try:
-            decimal_value = Decimal(str(value))
-            # Convert 0.000000 to None (indicates missing data in happiness report)
-            if decimal_value == Decimal('0.000000'):
-                return None
-            return decimal_value
-        except (InvalidOperation, ValueError):
+            with open(self.cache_path, 'rb') as f:
+                payload = pickle.load(f)
+        except FileNotFoundError:
             return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable parsed workbook cache {self.cache_path}: {e}")
+            return None
+        
+        if payload.get('version') != self.CACHE_FORMAT_VERSION or payload.get('sha256') != file_hash:
+            logger.info("Parsed workbook cache is stale, re-parsing")
+            return None
+        return pd.DataFrame(payload['columns'], columns=payload['order'])
 
+    def _write_cache(self, file_hash: str, frame: pd.DataFrame):
+        """Store the normalized frame as typed column arrays, replacing the cache atomically"""
+        payload = {
+            'version': self.CACHE_FORMAT_VERSION,
+            'sha256': file_hash,
+            'order': list(frame.columns),
+            'columns': {name: frame[name].to_numpy() for name in frame.columns},
+        }
+        temp_path = f"{self.cache_path}.tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self.cache_path)
+            logger.info(f"Wrote parsed workbook cache {self.cache_path}")
+        except OSError as e:
+            logger.warning(f"Could not write parsed workbook cache {self.cache_path}: {e}")
 
-def populate_countries():
-    """Populate Country model with World Bank data"""
-    wb_service = WorldBankAPIService()
-    countries_data = wb_service.fetch_countries()
+    @staticmethod
+    def _frame_to_records(frame: pd.DataFrame) -> List[Dict]:
+        """Convert a normalized frame to record dicts with None for missing values"""
+        return frame.astype(object).where(frame.notna(), None).to_dict('records')
+
+
+class UpsertResult(NamedTuple):
+    created: int
+    updated: int
+    unchanged: int
+
+
+BULK_BATCH_SIZE = 500
+KEY_LOOKUP_CHUNK_SIZE = 500  # Stay well below SQLite's bound-parameter limit
+
+
+def _content_hash(fields: List[models.Field], values: Iterable[Any]) -> bytes:
+    """Hash field values in their database-prepared form so equal content compares equal"""
+    prepared = tuple(
+        field.get_db_prep_save(value, connection)
+        for field, value in zip(fields, values)
+    )
+    return hashlib.blake2b(repr(prepared).encode('utf-8'), digest_size=16).digest()
+
+
+def bulk_upsert(model, rows: Iterable[Dict], key_fields: List[str], update_fields: List[str],
+                batch_size: int = BULK_BATCH_SIZE) -> UpsertResult:
+    """Insert or update rows in chunked set-based writes.
+
+    Existing rows are prefetched once by key, and a content hash of each incoming
+    row is compared against the stored one so unchanged rows are never written.
+    Rows are dicts keyed by field attname (e.g. ``country_id``).
+    """
+    incoming = {}
+    for row in rows:
+        incoming[tuple(row[field] for field in key_fields)] = row
+    if not incoming:
+        return UpsertResult(0, 0, 0)
+
+    hash_fields = [model._meta.get_field(name) for name in update_fields]
     
-    created_count = 0
-    updated_count = 0
+    # Prefetch existing keys and content, narrowed by the first key field and by
+    # any other key field with few distinct incoming values
+    narrowing = {}
+    for position, name in enumerate(key_fields[1:], start=1):
+        values = {key[position] for key in incoming}
+        if len(values) <= KEY_LOOKUP_CHUNK_SIZE:
+            narrowing[f'{name}__in'] = sorted(values)
     
-    for country_data in countries_data:
-        country, created = Country.objects.update_or_create(
-            id=country_data['id'],
-            defaults=country_data
-        )
-        if created:
-            created_count += 1
+    existing = {}
+    lead_values = sorted({key[0] for key in incoming})
+    for start in range(0, len(lead_values), KEY_LOOKUP_CHUNK_SIZE):
+        lookup = {f'{key_fields[0]}__in': lead_values[start:start + KEY_LOOKUP_CHUNK_SIZE], **narrowing}
+        for values in model.objects.filter(**lookup).order_by().values_list('pk', *key_fields, *update_fields):
+            key = values[1:len(key_fields) + 1]
+            existing[key] = (values[0], _content_hash(hash_fields, values[len(key_fields) + 1:]))
+
+    to_create = []
+    to_update = []
+    unchanged_count = 0
+    for key, row in incoming.items():
+        current = existing.get(key)
+        if current is None:
+            to_create.append(model(**row))
+        elif current[1] == _content_hash(hash_fields, (row[name] for name in update_fields)):
+            unchanged_count += 1
         else:
-            updated_count += 1
+            to_update.append(model(pk=current[0], **row))
+
+    if connection.features.supports_update_conflicts_with_target:
+        model.objects.bulk_create(
+            to_create + to_update,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=key_fields,
+            update_fields=update_fields,
+        )
+    else:
+        model.objects.bulk_create(to_create, batch_size=batch_size)
+        model.objects.bulk_update(to_update, update_fields, batch_size=batch_size)
+
+    return UpsertResult(len(to_create), len(to_update), unchanged_count)
+
+
+COUNTRY_FIELDS = [
+    'iso2_code', 'name', 'capital_city', 'longitude', 'latitude', 'region_id', 'region_value',
+    'admin_region_id', 'admin_region_value', 'income_level_id', 'income_level_value',
+    'lending_type_id', 'lending_type_value',
+]
+INDICATOR_FIELDS = ['name', 'unit', 'source_id', 'source_value', 'source_note', 'source_organization']
+COUNTRY_DATA_FIELDS = ['year', 'country_iso3_code', 'value', 'unit', 'obs_status', 'decimal_places']
+HAPPINESS_DATA_FIELDS = [
+    'country_id', 'ladder_score', 'upper_whisker', 'lower_whisker',
+    'explained_by_freedom_to_make_life_choices', 'explained_by_generosity',
+    'explained_by_perceptions_of_corruption', 'dystopia_plus_residual',
+    'explained_by_log_gdp_per_capita', 'explained_by_social_support',
+    'explained_by_healthy_life_expectancy', 'region',
+]
+
+
+def populate_countries(force: bool = False):
+    """Populate Country model with World Bank data, revalidating cached responses with ``force``"""
+    wb_service = WorldBankAPIService(revalidate=force)
+    countries_data = wb_service.fetch_countries()
     
-    logger.info(f"Countries: {created_count} created, {updated_count} updated")
-    return created_count, updated_count
+    result = bulk_upsert(Country, countries_data, ['id'], COUNTRY_FIELDS)
+    if result.created or result.updated:
+        # Regions and income levels may have moved, which regroups the happiness summaries
+        refresh_regional_aggregates()
+        rebuild_country_year_facts()
+        DatasetVersion.bump(DatasetVersion.WORLDBANK)
+    
+    logger.info(f"Countries: {result.created} created, {result.updated} updated, {result.unchanged} unchanged")
+    return result
 
 
-def populate_indicators():
-    """Populate Indicator model with World Bank data"""
-    wb_service = WorldBankAPIService()
+def populate_indicators(force: bool = False):
+    """Populate Indicator model with World Bank data, revalidating cached responses with ``force``"""
+    wb_service = WorldBankAPIService(revalidate=force)
     indicators_data = wb_service.fetch_indicators()
     
-    created_count = 0
-    updated_count = 0
+    result = bulk_upsert(Indicator, indicators_data, ['id'], INDICATOR_FIELDS)
+    if result.created:
+        # New indicators get their own column in the wide fact table
+        rebuild_country_year_facts()
+    if result.created or result.updated:
+        DatasetVersion.bump(DatasetVersion.WORLDBANK)
     
-    for indicator_data in indicators_data:
-        indicator, created = Indicator.objects.update_or_create(
-            id=indicator_data['id'],
-            defaults=indicator_data
-        )
-        if created:
-            created_count += 1
-        else:
-            updated_count += 1
+    logger.info(f"Indicators: {result.created} created, {result.updated} updated, {result.unchanged} unchanged")
+    return result
+
+
+class ChunkTiming(NamedTuple):
+    indicators: int
+    countries: int
+    rows: int
+    seconds: float  # Time spent inside the batch's write transaction
+
+
+@dataclass
+class HappinessLoadReport:
+    """Outcome of a happiness data load, as reported by load_happiness_data"""
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    unmapped_countries: set = field(default_factory=set)
+    suggestions: Dict[str, List[str]] = field(default_factory=dict)  # Best candidates per unmapped name
+    cache_hit: Optional[bool] = None  # None when the parsed workbook cache was disabled
+    ranks_updated: int = 0  # Rows whose materialized rank, percentile or rank change moved
+
+
+@dataclass
+class SyncReport:
+    """Outcome of a country data sync, as reported by load_worldbank_data"""
+    run_id: Optional[int] = None
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    indicators_fetched: int = 0
+    indicators_skipped: int = 0
+    indicators_failed: int = 0
+    units_resumed: int = 0
+    requests_made: int = 0
+    requests_avoided: int = 0
+    cache_stats: Dict[str, int] = field(default_factory=dict)
+    retry_stats: Dict[str, int] = field(default_factory=dict)
+    chunk_timings: List[ChunkTiming] = field(default_factory=list)
+
+
+WRITE_BATCH_SIZE = 5000  # CountryData rows per write transaction
+PENDING_PAGES = 4  # Fetched pages allowed to wait for the writer before fetching pauses
+
+
+def _indicators_to_refetch(indicators: Dict[str, str], source_updates: Dict[str, date],
+                           ledger: Dict[str, SyncLedger], force: bool = False,
+                           since: Optional[date] = None) -> List[str]:
+    """Pick the indicators whose source has changed since our last successful pull"""
+    if force:
+        return list(indicators)
+
+    refetch = []
+    for indicator_code, source_id in indicators.items():
+        source_updated = source_updates.get(source_id or WorldBankAPIService.DEFAULT_SOURCE_ID)
+        entry = ledger.get(indicator_code)
+        if source_updated is None:
+            refetch.append(indicator_code)  # Unknown upstream state, play it safe
+        elif since is not None:
+            if source_updated >= since:
+                refetch.append(indicator_code)
+        elif entry is None or entry.last_updated is None or source_updated > entry.last_updated:
+            refetch.append(indicator_code)
+    return refetch
+
+
+def _record_sync(scope: str, key: str, last_updated: Optional[date], record_count: int = 0):
+    """Record a successful pull in the sync ledger"""
+    SyncLedger.objects.update_or_create(
+        scope=scope,
+        key=key,
+        defaults={
+            'last_updated': last_updated,
+            'last_synced_at': timezone.now(),
+            'record_count': record_count,
+        }
+    )
+
+
+def _start_ingest_run(resume: bool) -> Tuple[IngestRun, set]:
+    """Open a new ingest run, or reopen the latest unfinished one with its completed units"""
+    if resume:
+        run = IngestRun.objects.exclude(status=IngestRun.STATUS_COMPLETED).order_by('-started_at').first()
+        if run is not None:
+            IngestRun.objects.filter(pk=run.pk).update(status=IngestRun.STATUS_RUNNING, finished_at=None)
+            completed = set(run.checkpoints.values_list('country_id', 'indicator_id'))
+            logger.info(f"Resuming ingest run {run.pk} with {len(completed)} completed units")
+            return run, completed
+        logger.info("No unfinished ingest run to resume, starting a new one")
+    return IngestRun.objects.create(), set()
+
+
+class CountryDataWriter:
+    """Accumulates streamed CountryData rows and writes them in fixed-size transactions"""
     
-    logger.info(f"Indicators: {created_count} created, {updated_count} updated")
-    return created_count, updated_count
+    def __init__(self, report: SyncReport, batch_size: int = WRITE_BATCH_SIZE):
+        self.report = report
+        self.batch_size = batch_size
+        self.batch = []
+    
+    def add(self, row: Dict):
+        self.batch.append(row)
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+    
+    def flush(self):
+        """Write and commit the buffered rows"""
+        if not self.batch:
+            return
+        
+        started = time.perf_counter()
+        with transaction.atomic():
+            result = bulk_upsert(CountryData, self.batch, ['country_id', 'indicator_id', 'date'], COUNTRY_DATA_FIELDS)
+        timing = ChunkTiming(
+            indicators=len({row['indicator_id'] for row in self.batch}),
+            countries=len({row['country_id'] for row in self.batch}),
+            rows=len(self.batch),
+            seconds=time.perf_counter() - started,
+        )
+        self.report.created += result.created
+        self.report.updated += result.updated
+        self.report.unchanged += result.unchanged
+        self.report.chunk_timings.append(timing)
+        logger.debug(f"Committed a batch of {timing.rows} rows in {timing.seconds:.3f}s")
+        self.batch = []
+        reset_queries()  # With DEBUG on, the query log would otherwise keep every INSERT
+
+
+def _checkpoint_units(run: IngestRun, country_codes: List[str], indicator_codes: List[str], completed_units: set):
+    """Checkpoint every (country, indicator) unit of a fully written request"""
+    checkpoints = (
+        IngestCheckpoint(run=run, country_id=country_code, indicator_id=indicator_code)
+        for indicator_code in indicator_codes
+        for country_code in country_codes
+        if (country_code, indicator_code) not in completed_units
+    )
+    # Built a batch at a time so large pulls never hold every checkpoint object at once
+    while True:
+        batch = list(islice(checkpoints, BULK_BATCH_SIZE))
+        if not batch:
+            break
+        IngestCheckpoint.objects.bulk_create(batch, ignore_conflicts=True)
 
 
-def populate_country_data():
-    """Populate CountryData model with indicator data for all countries"""
-    wb_service = WorldBankAPIService()
+def populate_country_data(force: bool = False, since: Optional[date] = None, resume: bool = False,
+                          batch_size: int = WRITE_BATCH_SIZE) -> SyncReport:
+    """Populate CountryData model with indicator data, refetching only changed indicators.
+
+    Data is streamed: each page is converted to rows as it arrives and rows are
+    committed in transactions of ``batch_size``, while the fetch workers pause
+    whenever the writer falls behind, so memory use does not grow with the size
+    of the pull. Once all pages of a request are written, its (country, indicator)
+    units are checkpointed so a crashed run can be picked up with ``resume=True``.
+    With ``force``, cached responses are revalidated upstream rather than reused.
+    """
+    wb_service = WorldBankAPIService(revalidate=force)
+    
+    country_codes = sorted(Country.objects.values_list('id', flat=True))
+    known_countries = set(country_codes)
+    indicators = dict(Indicator.objects.values_list('id', 'source_id'))
+    
+    source_updates = wb_service.fetch_source_updates()
+    ledger = {entry.key: entry for entry in SyncLedger.objects.filter(scope=SyncLedger.SCOPE_INDICATOR)}
+    refetch = _indicators_to_refetch(indicators, source_updates, ledger, force=force, since=since)
     
-    countries = Country.objects.all()
-    indicators = Indicator.objects.all()
+    run, completed_units = _start_ingest_run(resume)
+    report = SyncReport(run_id=run.pk)
     
-    created_count = 0
-    updated_count = 0
+    # Indicators fully written by the resumed run need no refetch at all
+    pending = [
+        code for code in refetch
+        if any((country_code, code) not in completed_units for country_code in country_codes)
+    ]
+    report.indicators_fetched = len(pending)
+    report.indicators_skipped = len(indicators) - len(refetch)
+    report.units_resumed = sum(1 for _, code in completed_units if code in refetch)
+    if len(pending) < len(indicators):
+        record_counts = {code: entry.record_count for code, entry in ledger.items()}
+        report.requests_avoided = wb_service.estimate_bulk_requests(indicators, indicators, record_counts)
+        if pending:
+            report.requests_avoided -= wb_service.estimate_bulk_requests(pending, indicators, record_counts)
+        logger.info(f"Skipping {len(indicators) - len(pending)} indicators that are unchanged or already loaded")
     
-    for country in countries:
-        for indicator in indicators:
-            data_points = wb_service.fetch_country_indicator_data(
-                country.id, indicator.id, 2020, 2025
+    try:
+        writer = CountryDataWriter(report, batch_size=batch_size)
+        record_counts = defaultdict(int)
+        last_updated = {}
+        pages = []
+        if pending:
+            # One bulk fetch for all countries, streamed page by page
+            pages = wb_service.iter_bulk_indicator_data(
+                pending, 2020, 2025, source_ids=indicators, max_pending=PENDING_PAGES
             )
+        
+        for page in pages:
+            for row in page.rows:
+                record_counts[row['indicator_id']] += 1
+                # Aggregates, unknown codes and units the resumed run already wrote are skipped
+                if row['country_id'] in known_countries and (row['country_id'], row['indicator_id']) not in completed_units:
+                    writer.add(row)
+            if page.complete:
+                # Rows must be committed before their units are checkpointed
+                writer.flush()
+                _checkpoint_units(run, country_codes, page.indicator_codes, completed_units)
+                for indicator_code in page.indicator_codes:
+                    last_updated[indicator_code] = page.last_updated
+        writer.flush()
+        
+        synced_sources = set()
+        for indicator_code in refetch:
+            if indicator_code in pending:
+                continue
+            # Written in full by the resumed run before it stopped, so only its sync was never recorded
+            source_id = indicators[indicator_code] or WorldBankAPIService.DEFAULT_SOURCE_ID
+            synced_sources.add(source_id)
+            entry = ledger.get(indicator_code)
+            _record_sync(
+                SyncLedger.SCOPE_INDICATOR, indicator_code, source_updates.get(source_id),
+                record_count=entry.record_count if entry else 0,
+            )
+        for indicator_code in pending:
+            if indicator_code not in last_updated:
+                logger.error(f"No complete data received for {indicator_code}; it will be retried on the next run")
+                report.indicators_failed += 1
+                continue
             
-            for data_point in data_points:
-                if data_point['value'] is not None:
-                    country_data, created = CountryData.objects.update_or_create(
-                        country=country,
-                        indicator=indicator,
-                        date=data_point['date'],
-                        defaults={
-                            'country_iso3_code': data_point['country_iso3_code'],
-                            'value': data_point['value'],
-                            'unit': data_point['unit'],
-                            'obs_status': data_point['obs_status'],
-                            'decimal_places': data_point['decimal_places'],
-                        }
-                    )
-                    if created:
-                        created_count += 1
+            source_id = indicators[indicator_code] or WorldBankAPIService.DEFAULT_SOURCE_ID
+            synced_sources.add(source_id)
+            _record_sync(
+                SyncLedger.SCOPE_INDICATOR, indicator_code,
+                last_updated[indicator_code] or source_updates.get(source_id),
+                record_count=record_counts[indicator_code],
+            )
+        for source_id in synced_sources:
+            _record_sync(SyncLedger.SCOPE_SOURCE, source_id, source_updates.get(source_id))
+    except Exception:
+        IngestRun.objects.filter(pk=run.pk).update(status=IngestRun.STATUS_FAILED, finished_at=timezone.now())
+        raise
+    
+    if report.indicators_failed:
+        # Keep the checkpoints so --resume refetches only the failed indicators
+        IngestRun.objects.filter(pk=run.pk).update(status=IngestRun.STATUS_PARTIAL, finished_at=timezone.now())
+        logger.warning(f"Ingest run {run.pk} is partial: {report.indicators_failed} indicators failed")
+    else:
+        # Checkpoints only matter while a run can still be resumed
+        with transaction.atomic():
+            run.checkpoints.all().delete()
+            IngestRun.objects.filter(pk=run.pk).update(status=IngestRun.STATUS_COMPLETED, finished_at=timezone.now())
+    if report.created or report.updated:
+        rebuild_country_year_facts()
+        DatasetVersion.bump(DatasetVersion.WORLDBANK)
+    
+    report.requests_made = wb_service.requests_made
+    report.retry_stats = wb_service.retry_stats()
+    if wb_service.response_cache is not None:
+        report.cache_stats = wb_service.response_cache.stats()
+    logger.info(
+        f"Country Data: {report.created} created, {report.updated} updated, {report.unchanged} unchanged; "
+        f"{report.indicators_skipped} indicators skipped, ~{report.requests_avoided} requests avoided"
+    )
+    return report
+
+
+HAPPINESS_RANK_FIELDS = ['rank', 'percentile', 'rank_change']
+
+
+def rank_happiness_data() -> int:
+    """Materialize per-year rank, percentile and rank change on HappinessData.
+
+    Every year is ranked by one windowed query; rank change compares against
+    the same country's rank the year before. Only rows whose stored values
+    differ are written. Returns the number of rows updated.
+    """
+    # Windows order by the score as a float: Django mis-renders a decimal ORDER BY inside OVER on SQLite
+    ranked = list(
+        HappinessData.objects.filter(ladder_score__isnull=False).order_by()
+        .annotate(
+            computed_rank=Window(Rank(), partition_by=[F('year')], order_by=Cast('ladder_score', FloatField()).desc()),
+            computed_percent=Window(PercentRank(), partition_by=[F('year')], order_by=Cast('ladder_score', FloatField()).asc()),
+        )
+        .values_list('pk', 'country_name', 'year', 'computed_rank', 'computed_percent', *HAPPINESS_RANK_FIELDS)
+    )
+    ranks = {(country_name, year): rank for _, country_name, year, rank, _, _, _, _ in ranked}
+    
+    changed = []
+    for pk, country_name, year, rank, percent, *current in ranked:
+        previous = ranks.get((country_name, year - 1))
+        values = [rank, Decimal(f'{percent * 100:.2f}'), None if previous is None else previous - rank]
+        if values != current:
+            changed.append(HappinessData(pk=pk, **dict(zip(HAPPINESS_RANK_FIELDS, values))))
+    HappinessData.objects.bulk_update(changed, HAPPINESS_RANK_FIELDS, batch_size=BULK_BATCH_SIZE)
+    
+    # Rows that lost their score drop out of the ranking
+    cleared = HappinessData.objects.filter(ladder_score__isnull=True, rank__isnull=False).update(
+        **{name: None for name in HAPPINESS_RANK_FIELDS}
+    )
+    return len(changed) + cleared
+
+
+REGIONAL_METRICS = [
+    'ladder_score', 'explained_by_log_gdp_per_capita', 'explained_by_social_support',
+    'explained_by_healthy_life_expectancy', 'explained_by_freedom_to_make_life_choices',
+    'explained_by_generosity', 'explained_by_perceptions_of_corruption',
+]
+REGIONAL_AGGREGATE_FIELDS = ['country_count', 'count', 'mean', 'median', 'minimum', 'maximum', 'stddev', 'q1', 'q3']
+UNCLASSIFIED_INCOME_LEVEL = 'Not classified'
+
+
+def refresh_regional_aggregates(years: Optional[Iterable[int]] = None) -> UpsertResult:
+    """Recompute RegionalAggregate rows for the given years, or for every year.
+
+    Happiness rows are grouped by their country's World Bank region, income
+    level and year, plus a rollup per region and year over all income levels.
+    Unchanged groups are not rewritten and groups that no longer have rows are
+    deleted.
+    """
+    happiness = HappinessData.objects.filter(country__isnull=False).exclude(country__region_value='')
+    existing = RegionalAggregate.objects.all()
+    if years is not None:
+        years = sorted(set(years))
+        happiness = happiness.filter(year__in=years)
+        existing = existing.filter(year__in=years)
+    
+    keys = ['region', 'income_level', 'year']
+    frame = pd.DataFrame.from_records(
+        list(happiness.order_by().values_list(
+            'country__region_value', 'country__income_level_value', 'year', *REGIONAL_METRICS
+        )),
+        columns=keys + REGIONAL_METRICS,
+    )
+    rows = []
+    if not frame.empty:
+        frame[REGIONAL_METRICS] = frame[REGIONAL_METRICS].astype(float)
+        frame['income_level'] = frame['income_level'].replace('', UNCLASSIFIED_INCOME_LEVEL)
+        frame = pd.concat([frame, frame.assign(income_level=RegionalAggregate.ALL_INCOME_LEVELS)])
+        groups = frame.groupby(keys)
+        sizes = groups.size()
+        
+        for metric in REGIONAL_METRICS:
+            column = groups[metric]
+            summary = pd.DataFrame({
+                'country_count': sizes, 'count': column.count(), 'mean': column.mean(),
+                'median': column.median(), 'minimum': column.min(), 'maximum': column.max(),
+                'stddev': column.std(), 'q1': column.quantile(0.25), 'q3': column.quantile(0.75),
+            })
+            for (region, income_level, year), stats in zip(summary.index, summary.itertuples(index=False)):
+                row = {'region': region, 'income_level': income_level, 'year': int(year), 'metric': metric}
+                for name, value in zip(REGIONAL_AGGREGATE_FIELDS, stats):
+                    if name in ('country_count', 'count'):
+                        row[name] = int(value)
                     else:
-                        updated_count += 1
+                        # Rounded so summation order cannot make an unchanged group look changed
+                        row[name] = None if math.isnan(value) else round(float(value), 10)
+                rows.append(row)
+    
+    result = bulk_upsert(RegionalAggregate, rows, ['region', 'income_level', 'year', 'metric'], REGIONAL_AGGREGATE_FIELDS)
     
-    logger.info(f"Country Data: {created_count} created, {updated_count} updated")
-    return created_count, updated_count
+    current = {(row['region'], row['income_level'], row['year'], row['metric']) for row in rows}
+    stale = [
+        pk for pk, *key in existing.values_list('pk', 'region', 'income_level', 'year', 'metric')
+        if tuple(key) not in current
+    ]
+    for start in range(0, len(stale), KEY_LOOKUP_CHUNK_SIZE):
+        RegionalAggregate.objects.filter(pk__in=stale[start:start + KEY_LOOKUP_CHUNK_SIZE]).delete()
+    
+    logger.info(
+        f"Regional aggregates: {result.created} created, {result.updated} updated, {result.unchanged} unchanged, "
+        f"{len(stale)} removed"
+    )
+    return result
 
 
-def populate_happiness_data(excel_file_path: str):
+def populate_happiness_data(excel_file_path: str, use_cache: bool = True) -> HappinessLoadReport:
     """Populate HappinessData model with Excel data"""
-    happiness_service = HappinessDataService(excel_file_path)
-    happiness_records = happiness_service.process_happiness_excel_file()
+    happiness_service = HappinessDataService(excel_file_path, use_cache=use_cache)
     
-    created_count = 0
-    updated_count = 0
-    unmapped_countries = set()
+    resolver = CountryResolver.build()
+    country_regions = dict(Country.objects.values_list('id', 'region_value'))
+    resolved = {}
+    years = set()
+    report = HappinessLoadReport()
     
-    for record in happiness_records:
-        try:
-            # Get the mapped country if available
-            mapped_country = None
-            if record['wb_country_code']:
-                try:
-                    mapped_country = Country.objects.get(id=record['wb_country_code'])
-                except Country.DoesNotExist:
-                    unmapped_countries.add(record['country_name'])
-            else:
-                unmapped_countries.add(record['country_name'])
+    for records in happiness_service.iter_record_batches():
+        rows = []
+        for record in records:
+            # Resolve each distinct name once against the preloaded index
+            name = record['country_name']
+            if name not in resolved:
+                resolved[name] = resolver.resolve(name, record['wb_country_code'])
+            country_id = resolved[name]
+            if country_id is None:
+                report.unmapped_countries.add(name)
             
-            happiness_data, created = HappinessData.objects.update_or_create(
-                country_name=record['country_name'],
-                year=record['year'],
-                defaults={
-                    'country': mapped_country,
-                    'ladder_score': record['ladder_score'],
-                    'upper_whisker': record['upper_whisker'],
-                    'lower_whisker': record['lower_whisker'],
-                    'explained_by_freedom_to_make_life_choices': record['explained_by_freedom_to_make_life_choices'],
-                    'explained_by_generosity': record['explained_by_generosity'],
-                    'explained_by_perceptions_of_corruption': record['explained_by_perceptions_of_corruption'],
-                    'dystopia_plus_residual': record['dystopia_plus_residual'],
-                    'explained_by_log_gdp_per_capita': record['explained_by_log_gdp_per_capita'],
-                    'explained_by_social_support': record['explained_by_social_support'],
-                    'explained_by_healthy_life_expectancy': record['explained_by_healthy_life_expectancy'],
-                    'region': mapped_country.region_value if mapped_country else '',
-                }
-            )
-            
-            if created:
-                created_count += 1
-            else:
-                updated_count += 1
-                
-        except Exception as e:
-            logger.error(f"Error processing happiness record for {record['country_name']}: {e}")
-            continue
+            row = {
+                'country_name': record['country_name'],
+                'year': record['year'],
+                'country_id': country_id,
+                'region': country_regions.get(country_id, '') if country_id else '',
+            }
+            row.update({field: record[field] for field in HAPPINESS_DATA_FIELDS if field in record})
+            rows.append(row)
+            years.add(record['year'])
+        
+        result = bulk_upsert(HappinessData, rows, ['country_name', 'year'], HAPPINESS_DATA_FIELDS)
+        report.created += result.created
+        report.updated += result.updated
+        report.unchanged += result.unchanged
     
-    if unmapped_countries:
-        logger.warning(f"Unmapped countries: {', '.join(sorted(unmapped_countries))}")
+    report.cache_hit = happiness_service.cache_hit
+    report.ranks_updated = rank_happiness_data()
+    if report.created or report.updated:
+        refresh_regional_aggregates(years)
+        rebuild_country_year_facts()
+    if report.created or report.updated or report.ranks_updated:
+        DatasetVersion.bump(DatasetVersion.HAPPINESS)
+    if report.unmapped_countries:
+        report.suggestions = {name: resolver.suggest(name) for name in report.unmapped_countries}
+        logger.warning(f"Unmapped countries: {', '.join(sorted(report.unmapped_countries))}")
     
-    logger.info(f"Happiness Data: {created_count} created, {updated_count} updated")
-    return created_count, updated_count, unmapped_countries
\ No newline at end of file
+    logger.info(f"Happiness Data: {report.created} created, {report.updated} updated, {report.unchanged} unchanged")
+    return report
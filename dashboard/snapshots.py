@@ -0,0 +1,285 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_ALIAS = 'snapshot'
+# Tables whose row count may not collapse between two published snapshots
+GUARDED_TABLES = ['dashboard_country', 'dashboard_indicator', 'dashboard_countrydata', 'dashboard_happinessdata']
+
+_serving = ContextVar('serving_snapshot', default=False)
+
+
+class SnapshotError(Exception):
+    """Raised when a snapshot cannot be published or rolled back"""
+
+
+class SnapshotStore:
+    """Versioned, immutable copies of the ingest database for the serving tier.
+
+    Each published version is a compacted copy of the writer database at
+    ``snapshot-<version>.sqlite3`` that is never modified once written. The
+    ``CURRENT`` pointer file names the version web workers should read, and is
+    replaced atomically so readers see either the old or the new version.
+    """
+
+    POINTER = 'CURRENT'
+    FILE_PATTERN = re.compile(r'^snapshot-(\d+)\.sqlite3$')
+
+    def __init__(self, directory, keep: int = 3, mmap_size: int = 256 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.keep = keep
+        self.mmap_size = mmap_size
+        self._pointer_stat = None
+        self._pointer_version = None
+        self._lock = threading.Lock()
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def path(self, version: int) -> Path:
+        return self.directory / f'snapshot-{version:06d}.sqlite3'
+
+    def versions(self) -> List[int]:
+        """Published versions still on disk, oldest first"""
+        found = (self.FILE_PATTERN.match(entry.name) for entry in self.directory.iterdir())
+        return sorted(int(match.group(1)) for match in found if match)
+
+    def current_version(self) -> Optional[int]:
+        """Version named by the pointer file, re-read only when the file has been replaced"""
+        pointer = self.directory / self.POINTER
+        try:
+            stat = pointer.stat()
+        except FileNotFoundError:
+            return None
+        key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if key != self._pointer_stat:
+                self._pointer_version = int(pointer.read_text().strip())
+                self._pointer_stat = key
+            return self._pointer_version
+
+    def publish(self, source_path, force: bool = False) -> int:
+        """Copy the database at ``source_path`` into a new snapshot, validate it and point readers at it"""
+        existing = self.versions()
+        version = existing[-1] + 1 if existing else 1
+        target = self.path(version)
+        building = target.with_name(target.name + '.building')
+        if building.exists():
+            building.unlink()
+
+        # VACUUM INTO writes a consistent, compacted copy without blocking the writer for long
+        source = sqlite3.connect(str(source_path))
+        try:
+            source.execute('VACUUM INTO ?', (str(building),))
+        finally:
+            source.close()
+
+        try:
+            counts = self.validate(building)
+            current = self.current_version()
+            if current is not None and not force:
+                self._check_shrinkage(self.counts(self.path(current)), counts)
+        except SnapshotError:
+            building.unlink()
+            raise
+
+        _fsync(building)
+        os.replace(building, target)
+        self._point_to(version)
+        logger.info(f"Published snapshot {version} ({target.stat().st_size} bytes): {counts}")
+        self.collect_garbage()
+        return version
+
+    def rollback(self, version: int = None) -> int:
+        """Point readers back at ``version``, or at the newest version older than the current one"""
+        available = self.versions()
+        current = self.current_version()
+        if version is None:
+            older = [candidate for candidate in available if current is None or candidate < current]
+            if not older:
+                raise SnapshotError('No earlier snapshot to roll back to')
+            version = older[-1]
+        elif version not in available:
+            raise SnapshotError(f'Snapshot {version} does not exist; available: {available}')
+        self._point_to(version)
+        logger.info(f"Rolled back from snapshot {current} to {version}")
+        return version
+
+    def collect_garbage(self) -> List[int]:
+        """Delete all but the ``keep`` newest snapshots, never the current one"""
+        current = self.current_version()
+        versions = self.versions()
+        removed = [version for version in versions[:-self.keep or None] if version != current]
+        for version in removed:
+            # Workers still reading an old file keep their open handle until they switch
+            self.path(version).unlink()
+        if removed:
+            logger.info(f"Removed old snapshots: {removed}")
+        return removed
+
+    def validate(self, path) -> Dict[str, int]:
+        """Check a candidate snapshot and return row counts of the guarded tables"""
+        db = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+        try:
+            result = db.execute('PRAGMA integrity_check').fetchone()[0]
+            if result != 'ok':
+                raise SnapshotError(f'Integrity check failed: {result}')
+
+            tables = {row[0] for row in db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            expected = {model._meta.db_table for model in apps.get_app_config('dashboard').get_models()}
+            missing = sorted(expected - tables)
+            if missing:
+                raise SnapshotError(f'Missing tables (run migrate first): {", ".join(missing)}')
+
+            # A load that stopped part-way leaves its run open or failed; resume it before publishing
+            latest = db.execute('SELECT id, status FROM dashboard_ingestrun ORDER BY started_at DESC LIMIT 1').fetchone()
+            if latest is not None and latest[1] != 'completed':
+                raise SnapshotError(f'Latest data load (run {latest[0]}) is {latest[1]}; resume it before publishing')
+        finally:
+            db.close()
+        return self.counts(path)
+
+    def counts(self, path) -> Dict[str, int]:
+        db = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+        try:
+            return {table: db.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0] for table in GUARDED_TABLES}
+        finally:
+            db.close()
+
+    def _check_shrinkage(self, previous: Dict[str, int], candidate: Dict[str, int]):
+        """Refuse a snapshot that lost more than half the rows of any guarded table"""
+        for table in GUARDED_TABLES:
+            if candidate.get(table, 0) * 2 < previous.get(table, 0):
+                raise SnapshotError(
+                    f'{table} shrank from {previous[table]} to {candidate.get(table, 0)} rows; '
+                    f'publish with force to accept it'
+                )
+
+    def _point_to(self, version: int):
+        pointer = self.directory / self.POINTER
+        staged = pointer.with_name(self.POINTER + '.tmp')
+        with open(staged, 'w') as handle:
+            handle.write(f'{version}\n')
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(staged, pointer)
+        _fsync_directory(self.directory)
+
+
+def _fsync(path):
+    with open(path, 'rb') as handle:
+        os.fsync(handle.fileno())
+
+
+def _fsync_directory(path):
+    try:
+        descriptor = os.open(path, os.O_RDONLY)
+    except OSError:  # Directories cannot be opened on Windows
+        return
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+
+_stores = {}
+
+
+def get_snapshot_store() -> Optional[SnapshotStore]:
+    """Return the store configured by DASHBOARD_SNAPSHOTS, or None when snapshots are disabled"""
+    config = getattr(settings, 'DASHBOARD_SNAPSHOTS', None)
+    if not config:
+        return None
+    directory = str(config['DIR'])
+    if directory not in _stores:
+        _stores[directory] = SnapshotStore(
+            directory, keep=config.get('KEEP', 3), mmap_size=config.get('MMAP_SIZE', 256 * 1024 * 1024)
+        )
+    return _stores[directory]
+
+
+def publish_snapshot(force: bool = False) -> int:
+    """Publish the writer database as the next snapshot version"""
+    store = get_snapshot_store()
+    if store is None:
+        raise SnapshotError('Snapshots are disabled; set DASHBOARD_SNAPSHOTS to enable them')
+    return store.publish(connections['default'].settings_dict['NAME'], force=force)
+
+
+def use_snapshot(path):
+    """Point this thread's snapshot connection at ``path``, reopening it only if the version changed"""
+    wrapper = connections[SNAPSHOT_ALIAS]
+    # immutable=1 lets SQLite skip locking and change detection, safe because snapshots are never modified
+    name = f'file:{Path(path).as_posix()}?mode=ro&immutable=1'
+    if wrapper.settings_dict['NAME'] != name:
+        wrapper.close()
+        wrapper.settings_dict = {**wrapper.settings_dict, 'NAME': name}
+
+
+@receiver(connection_created)
+def configure_snapshot_connection(sender, connection, **kwargs):
+    if connection.alias != SNAPSHOT_ALIAS:
+        return
+    store = get_snapshot_store()
+    if store is not None and store.mmap_size:
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA mmap_size = {int(store.mmap_size)}')
+
+
+class SnapshotMiddleware:
+    """Serve each request's dashboard reads from the current snapshot.
+
+    The pointer is checked once per request, so a newly published or rolled
+    back version is picked up between requests and never in the middle of one.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        store = get_snapshot_store()
+        version = store.current_version() if store is not None else None
+        if version is None:
+            return self.get_response(request)
+
+        use_snapshot(store.path(version))
+        token = _serving.set(True)
+        try:
+            return self.get_response(request)
+        finally:
+            _serving.reset(token)
+
+
+class SnapshotRouter:
+    """Route dashboard reads to the snapshot connection while a request is being served.
+
+    Writes, migrations and everything run by management commands stay on the
+    default (writer) database.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _serving.get() and model._meta.app_label == 'dashboard':
+            return SNAPSHOT_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == SNAPSHOT_ALIAS:
+            return False
+        return None
@@ -1,3 +1,1693 @@
-from django.test import TestCase
+import json
+import math
+import os
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from base64 import b64encode
+from datetime import date
+from decimal import Decimal
+from importlib import import_module
+from io import StringIO
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+from urllib.parse import quote
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+import requests
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import DatabaseError, connection, connections
+from django.db.models import Avg, Count, Max, Min
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from .analytics import happiness_correlations
+from .api_cache import response_cache_stats
+from .benchmarks import legacy_parse_happiness_workbook, make_synthetic_happiness_workbook
+from .client_policy import (
+    AdaptiveConcurrencyLimiter, CircuitBreaker, CircuitOpenError, RequestPolicy, TokenBucket,
+)
+from .facts import FACT_TABLE, rebuild_country_year_facts
+from .http_cache import ResponseCache
+from .models import (
+    Country, Indicator, CountryData, HappinessData, RegionalAggregate, DatasetVersion, IngestRun, IngestCheckpoint,
+    SyncLedger,
+)
+from .pagination import KeysetPagination
+from .resolution import CountryResolver, normalize_country_name
+from .serializers import HappinessDataSerializer
+from .services import (
+    _checkpoint_units, bulk_upsert, get_response_cache, populate_countries, populate_country_data,
+    populate_indicators, rank_happiness_data, refresh_regional_aggregates,
+    COUNTRY_DATA_FIELDS, REGIONAL_AGGREGATE_FIELDS, REGIONAL_METRICS, CountryDataWriter, HappinessDataService,
+    SyncReport, UpsertResult, WorldBankAPIService,
+)
+from .snapshots import SNAPSHOT_ALIAS, SnapshotError, SnapshotStore, get_snapshot_store
+from .worldbank_stub import WorldBankStubAdapter
+
+REGIONS = ['East Asia & Pacific', 'Europe & Central Asia', 'Latin America & Caribbean', 'Sub-Saharan Africa']
+INCOME_LEVELS = ['High income', 'Upper middle income', 'Lower middle income', 'Low income', '']
+YEARS = range(2020, 2026)
+
+
+def create_scaled_dataset(countries: int = 400, indicators: int = 12):
+    """Create enough rows that SQLite's planner would rather scan than seek without an index"""
+    Country.objects.bulk_create([
+        Country(
+            id=f'C{index:03d}', iso2_code='', name=f'Country {index:03d}', region_value=REGIONS[index % len(REGIONS)],
+            income_level_value=INCOME_LEVELS[index % len(INCOME_LEVELS)],
+        )
+        for index in range(countries)
+    ])
+    Indicator.objects.bulk_create([
+        Indicator(id=f'IND.{index}', name=f'Indicator {index}') for index in range(indicators)
+    ])
+    CountryData.objects.bulk_create([
+        CountryData(
+            country_id=f'C{country:03d}', indicator_id=f'IND.{indicator}', date=str(year), year=year,
+            value=Decimal(country * 7 + indicator * 3 + year % 10),
+        )
+        for country in range(countries) for indicator in range(indicators) for year in YEARS
+    ], batch_size=2000)
+    HappinessData.objects.bulk_create([
+        HappinessData(
+            country_name=f'Country {country:03d}', country_id=f'C{country:03d}', year=year,
+            region=REGIONS[country % len(REGIONS)], ladder_score=Decimal(f'{2 + (country * 37 + year) % 600 / 100:.4f}'),
+            explained_by_generosity=Decimal(f'{(country * 13 + year) % 50 / 100:.6f}'),
+        )
+        for country in range(countries) for year in YEARS
+    ], batch_size=2000)
+    refresh_regional_aggregates()
+    rebuild_country_year_facts()
+    # Give the planner real statistics, as a long-lived database would have
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+_test_caches = None
+
+
+def setUpModule():
+    """Keep the shared API response cache of test runs out of the project's .cache directory"""
+    global _test_caches
+    directory = tempfile.TemporaryDirectory()
+    _test_caches = override_settings(CACHES={
+        **settings.CACHES,
+        'api_responses': {**settings.CACHES['api_responses'], 'LOCATION': directory.name},
+    })
+    _test_caches.enable()
+    _test_caches.directory = directory
+
+
+def tearDownModule():
+    _test_caches.disable()
+    _test_caches.directory.cleanup()
+
+
+class APITestCase(TestCase):
+    """Starts every test with empty caches; cached responses are keyed by dataset version, which tests rarely bump"""
+
+    def setUp(self):
+        for backend in caches.all():
+            backend.clear()
+
+
+class BulkUpsertTests(TestCase):
+    """The set-based upsert behind every ingest write path"""
+
+    @classmethod
+    def setUpTestData(cls):
+        Country.objects.create(id='AAA', name='Aland')
+        Indicator.objects.create(id='IND.1', name='Indicator 1')
+
+    def row(self, date, value, **fields):
+        return {
+            'country_id': 'AAA', 'indicator_id': 'IND.1', 'date': date, 'year': int(date),
+            'country_iso3_code': 'AAA', 'value': value, 'unit': '', 'obs_status': '', 'decimal_places': 1,
+            **fields,
+        }
+
+    def upsert(self, rows):
+        return bulk_upsert(CountryData, rows, ['country_id', 'indicator_id', 'date'], COUNTRY_DATA_FIELDS)
+
+    def values(self):
+        return dict(CountryData.objects.values_list('date', 'value'))
+
+    def test_created_updated_and_unchanged_counts(self):
+        self.assertEqual(self.upsert([self.row('2020', Decimal('1.5')), self.row('2021', None)]), UpsertResult(2, 0, 0))
+        result = self.upsert([
+            self.row('2020', Decimal('1.5')),  # Same content
+            self.row('2021', Decimal('2.5')),  # Changed
+            self.row('2022', Decimal('3.5')),  # New
+        ])
+        self.assertEqual(result, UpsertResult(1, 1, 1))
+        self.assertEqual(self.values(), {'2020': Decimal('1.5'), '2021': Decimal('2.5'), '2022': Decimal('3.5')})
+        self.assertEqual(CountryData.objects.count(), 3)
+        self.assertEqual(self.upsert([]), UpsertResult(0, 0, 0))
+
+    def test_duplicate_keys_in_a_batch_keep_the_last_row(self):
+        result = self.upsert([self.row('2020', Decimal('1.0')), self.row('2020', Decimal('2.0'))])
+        self.assertEqual(result, UpsertResult(1, 0, 0))
+        self.assertEqual(self.values(), {'2020': Decimal('2.0')})
+
+        result = self.upsert([self.row('2020', Decimal('3.0')), self.row('2020', Decimal('2.0'))])
+        self.assertEqual(result, UpsertResult(0, 0, 1))
+        self.assertEqual(self.values(), {'2020': Decimal('2.0')})
+
+    def test_unchanged_rows_are_not_written(self):
+        self.upsert([self.row(str(year), Decimal(year)) for year in YEARS])
+        # Equal content in another Python form hashes the same once prepared for the database
+        with CaptureQueriesContext(connection) as captured:
+            result = self.upsert([self.row(str(year), Decimal(f'{year}.000')) for year in YEARS])
+        self.assertEqual(result, UpsertResult(0, 0, len(YEARS)))
+        self.assertEqual([query['sql'].split()[0] for query in captured.captured_queries], ['SELECT'])
+
+        result = self.upsert([self.row('2020', Decimal(2020), obs_status='E')])
+        self.assertEqual(result, UpsertResult(0, 1, 0))
+        self.assertEqual(CountryData.objects.get(date='2020').obs_status, 'E')
+
+
+class FakeClock:
+    """Stands in for the time module so tests control timestamps"""
+
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+    monotonic = time
+    sleep = advance
+
+
+class ResponseCacheTests(TestCase):
+    """The World Bank client's persistent response cache"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / 'responses.sqlite3'
+
+    def test_compression_round_trip(self):
+        response_cache = ResponseCache(self.path)
+        body = b'{"value": 1.5}' * 1000
+        response_cache.set('key', 'https://example.test/', body, etag='"v1"', last_modified='Tue, 01 Jul 2025 00:00:00 GMT')
+        cached = response_cache.get('key')
+        self.assertEqual(cached.body, body)
+        self.assertEqual((cached.etag, cached.last_modified), ('"v1"', 'Tue, 01 Jul 2025 00:00:00 GMT'))
+        self.assertLess(response_cache.stats()['size'], len(body) / 10)
+        self.assertIsNone(response_cache.get('missing'))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        clock = FakeClock()
+        with patch('dashboard.http_cache.time', clock):
+            body = os.urandom(1000)  # Incompressible, so each entry stores about 1 KB
+            response_cache = ResponseCache(self.path, max_bytes=2500)
+            for key in ('a', 'b'):
+                response_cache.set(key, key, body)
+                clock.advance(1)
+            response_cache.get('a')
+            clock.advance(1)
+            response_cache.set('c', 'c', body)
+
+            self.assertIsNotNone(response_cache.get('a'))
+            self.assertIsNone(response_cache.get('b'))
+            self.assertIsNotNone(response_cache.get('c'))
+            self.assertEqual(response_cache.stats()['entries'], 2)
+
+    @override_settings(WORLDBANK_OFFLINE_STUB={'SCALE': 1})
+    def test_stale_and_forced_requests_revalidate_with_etag(self):
+        clock = FakeClock()
+        url = f'{WorldBankAPIService.BASE_URL}/country'
+        with patch('dashboard.http_cache.time', clock):
+            response_cache = ResponseCache(self.path, max_age=60)
+            service = WorldBankAPIService(response_cache=response_cache)
+            first = service._make_request(url)
+            self.assertEqual(service._make_request(url), first)  # Fresh: served without a request
+            self.assertEqual(service.requests_made, 1)
+
+            clock.advance(61)
+            self.assertEqual(service._make_request(url), first)  # Stale: 304 Not Modified reuses the body
+            self.assertEqual(service.requests_made, 2)
+            self.assertEqual(service._make_request(url), first)  # The 304 restarted the freshness window
+            self.assertEqual(service.requests_made, 2)
+
+            forced = WorldBankAPIService(response_cache=response_cache, revalidate=True)
+            self.assertEqual(forced._make_request(url), first)  # Fresh, but checked upstream all the same
+            self.assertEqual(forced.requests_made, 1)
+        self.assertEqual(
+            {key: response_cache.stats()[key] for key in ('hits', 'revalidated', 'misses')},
+            {'hits': 2, 'revalidated': 2, 'misses': 1},
+        )
+
+
+class FailingSend:
+    """A send callable raising the given exceptions in turn, then answering 200"""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+
+    def __call__(self):
+        if self.errors:
+            raise self.errors.pop(0)
+        response = requests.Response()
+        response.status_code = 200
+        return response
+
+
+class RecoveringStub(WorldBankStubAdapter):
+    """The offline stand-in answering 503 to its first ``failures`` requests, then recovering"""
+
+    def __init__(self, failures: int, **options):
+        super().__init__(**options)
+        self.failures = failures
+        self._failures_lock = threading.Lock()
+
+    def send(self, request, **kwargs):
+        with self._failures_lock:
+            failing = self.failures > 0
+            self.failures -= failing
+        if failing:
+            time.sleep(self.latency)
+            return self._response(request, 503, b'Service Unavailable', '')
+        return super().send(request, **kwargs)
+
+
+class ClientPolicyTests(TestCase):
+    """Rate limiting, circuit breaking and AIMD concurrency, on an injected clock"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = patch('dashboard.client_policy.time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_token_bucket_waits_for_tokens(self):
+        bucket = TokenBucket(rate=2, capacity=2)
+        started = self.clock.now
+        for _ in range(2):
+            bucket.acquire()
+        self.assertEqual(self.clock.now, started)  # The burst is free
+        bucket.acquire()
+        self.assertAlmostEqual(self.clock.now - started, 0.5)
+        self.clock.advance(10)
+        for _ in range(2):
+            bucket.acquire()
+        self.assertAlmostEqual(self.clock.now - started, 10.5)  # Refills up to capacity only
+
+    def test_circuit_breaker_opens_and_recovers(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+        breaker.record_failure()
+        breaker.before_call()
+        breaker.record_failure()
+        self.assertEqual((breaker.state, breaker.opens), (CircuitBreaker.OPEN, 1))
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+        self.assertEqual(breaker.seconds_until_trial(), 30)
+
+        self.clock.advance(30)
+        breaker.before_call()  # The half-open trial
+        breaker.TRIAL_WAIT = 0  # Others wait on it; don't wait here
+        with self.assertRaisesMessage(CircuitOpenError, 'the trial request did not finish'):
+            breaker.before_call()
+        breaker.record_failure()
+        self.assertEqual((breaker.state, breaker.opens), (CircuitBreaker.OPEN, 2))
+
+        self.clock.advance(30)
+        breaker.before_call()
+        breaker.record_success()
+        self.assertEqual((breaker.state, breaker.failures), (CircuitBreaker.CLOSED, 0))
+        breaker.before_call()
+
+    def test_failed_trial_with_any_request_error_reopens_the_circuit(self):
+        policy = RequestPolicy(max_attempts=1, failure_threshold=1, reset_timeout=30)
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            policy.execute(FailingSend(requests.exceptions.ConnectionError('down')))
+        self.clock.advance(30)
+        with self.assertRaises(requests.exceptions.InvalidURL):
+            policy.execute(FailingSend(requests.exceptions.InvalidURL('bad')))
+        self.assertEqual(policy.breaker.state, CircuitBreaker.OPEN)
+
+        self.clock.advance(30)
+        self.assertEqual(policy.execute(FailingSend()).status_code, 200)
+        self.assertEqual(policy.breaker.state, CircuitBreaker.CLOSED)
+
+    @override_settings(
+        WORLDBANK_RESPONSE_CACHE=None,
+        WORLDBANK_CLIENT_POLICY={'RATE': 1000, 'BURST': 1000, 'MAX_ATTEMPTS': 1, 'FAILURE_THRESHOLD': 1},
+    )
+    def test_requeued_pages_recover_once_the_upstream_does(self):
+        service = WorldBankAPIService(max_workers=8)
+        # Every worker's first request fails, opening the circuit for the rest of the first pass
+        service.session.mount('https://', RecoveringStub(failures=8, latency=0.05))
+        specs = [(f'{WorldBankAPIService.BASE_URL}/indicator/IND.{index}', {}) for index in range(20)]
+
+        results = service._fetch_all_pages(specs)
+        self.assertEqual([result[1][0]['id'] for result in results], [f'IND.{index}' for index in range(20)])
+        stats = service.retry_stats()
+        # The half-open trial goes first and the other requeued pages follow once it succeeds
+        self.assertEqual((stats['pages_requeued'], stats['pages_recovered'], stats['pages_failed']), (20, 20, 0))
+        self.assertEqual(service.policy.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_retries_back_off(self):
+        policy = RequestPolicy(max_attempts=3, backoff_base=1, failure_threshold=10)
+        started = self.clock.now
+        with patch('dashboard.client_policy.random.uniform', lambda low, high: high):
+            response = policy.execute(FailingSend(requests.exceptions.Timeout(), requests.exceptions.Timeout()))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(policy.retries, 2)
+        self.assertEqual(self.clock.now - started, 3)  # 1s, then 2s
+        self.assertEqual(policy.backoff_delay(1, retry_after=7), 7)
+
+    def test_concurrency_limit_is_aimd(self):
+        limiter = AdaptiveConcurrencyLimiter(max_limit=8, min_limit=1, latency_target=5)
+        limiter.record(0.1, ok=False)
+        self.assertEqual(limiter.limit, 4)
+        limiter.record(6.0, ok=True)  # Too slow counts as congestion
+        self.assertEqual(limiter.limit, 2)
+        limiter.record(0.1, ok=True)
+        self.assertEqual(limiter.limit, 2.5)
+        for _ in range(10):
+            limiter.record(0.1, ok=False)
+        self.assertEqual((limiter.limit, limiter.lowest_limit), (1, 1))
+        for _ in range(100):
+            limiter.record(0.1, ok=True)
+        self.assertEqual(limiter.limit, 8)
+
+        with limiter.slot():
+            self.assertEqual(limiter.in_flight, 1)
+        self.assertEqual(limiter.in_flight, 0)
+
+
+OFFLINE_POLICY = {'RATE': 1000, 'BURST': 1000, 'MAX_ATTEMPTS': 1, 'BACKOFF_BASE': 0, 'FAILURE_THRESHOLD': 1000}
+
+
+class WorldBankStubTests(TestCase):
+    """The offline stand-in answers like the World Bank v2 API"""
+
+    def get(self, path, adapter=None, headers=None, **params):
+        session = requests.Session()
+        session.mount('https://', adapter or WorldBankStubAdapter())
+        return session.get(
+            f'https://api.worldbank.org/v2/{path}', params={'format': 'json', **params}, headers=headers,
+        )
+
+    def test_countries_are_paginated_with_aggregates(self):
+        metadata, countries = self.get('country', per_page=100).json()
+        self.assertEqual((metadata['page'], metadata['pages'], metadata['total']), (1, 3, 266))
+        pages = [countries] + [self.get('country', per_page=100, page=page).json()[1] for page in (2, 3)]
+        countries = [country for page in pages for country in page]
+        self.assertEqual(len({country['id'] for country in countries}), 266)
+        self.assertEqual(sum(country['region']['value'] == 'Aggregates' for country in countries), 49)
+        self.assertIsNone(self.get('country', per_page=100, page=4).json()[1])
+
+        metadata, _ = self.get('country', adapter=WorldBankStubAdapter(scale=2)).json()
+        self.assertEqual(metadata['total'], 49 + 2 * 217)
+
+    def test_indicator_records_are_deterministic(self):
+        def records(path, seed=0, **params):
+            return self.get(path, adapter=WorldBankStubAdapter(seed=seed), per_page=2000, **params).json()
+
+        metadata, data = records('country/all/indicator/NY.GDP.PCAP.CD')
+        self.assertEqual(metadata['total'], 266 * len(YEARS))
+        self.assertEqual([record['date'] for record in data[:2]], ['2025', '2024'])  # Newest first
+        self.assertEqual(records('country/all/indicator/NY.GDP.PCAP.CD')[1], data)
+        self.assertNotEqual(records('country/all/indicator/NY.GDP.PCAP.CD', seed=1)[1], data)
+        missing = sum(record['value'] is None for record in data) / len(data)
+        self.assertAlmostEqual(missing, 0.1, delta=0.03)
+
+        # Countries are matched by id or ISO2 code
+        country = WorldBankStubAdapter().countries[60]
+        _, data = records(f'country/{country["iso2Code"]}/indicator/SP.DYN.LE00.IN', date='2021:2022')
+        self.assertEqual([(record['countryiso3code'], record['date']) for record in data],
+                         [(country['id'], '2022'), (country['id'], '2021')])
+
+        # Several indicators need their source, as upstream
+        response = records('country/all/indicator/NY.GDP.PCAP.CD;SP.DYN.LE00.IN')
+        self.assertEqual(response[0]['message'][0]['value'], 'source is required')
+        metadata, data = records('country/all/indicator/NY.GDP.PCAP.CD;SP.DYN.LE00.IN', source='2')
+        self.assertEqual((metadata['total'], metadata['sourceid'], metadata['lastupdated']), (2 * 266 * 6, '2', '2025-07-01'))
+        self.assertEqual({record['indicator']['id'] for record in data}, {'NY.GDP.PCAP.CD', 'SP.DYN.LE00.IN'})
+
+        self.assertIn('message', self.get('topic').json()[0])
+
+    def test_conditional_requests_are_not_modified(self):
+        response = self.get('sources')
+        etag = response.headers['ETag']
+        response = self.get('sources', headers={'If-None-Match': etag})
+        self.assertEqual((response.status_code, response.content), (304, b''))
+
+        adapter = WorldBankStubAdapter(last_updated='2025-09-01')
+        response = self.get('sources', adapter=adapter, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[1][0]['lastupdated'], '2025-09-01')
+
+    def test_failures_and_request_count(self):
+        WorldBankStubAdapter.reset_count()
+        self.assertEqual(self.get('country', adapter=WorldBankStubAdapter(error_rate=1)).status_code, 503)
+        response = self.get('country', adapter=WorldBankStubAdapter(throttle_rate=1))
+        self.assertEqual((response.status_code, response.headers['Retry-After']), (429, '1'))
+        self.assertEqual(self.get('country').status_code, 200)
+        self.assertEqual(WorldBankStubAdapter.request_count, 3)
+
+    @override_settings(
+        WORLDBANK_OFFLINE_STUB={'SCALE': 1, 'LAST_UPDATED': '2025-09-01'}, WORLDBANK_RESPONSE_CACHE=None,
+        WORLDBANK_CLIENT_POLICY=OFFLINE_POLICY,
+    )
+    def test_settings_mount_the_stub(self):
+        service = WorldBankAPIService(revalidate=True)
+        adapter = service.session.get_adapter('https://api.worldbank.org/v2/country')
+        self.assertIsInstance(adapter, WorldBankStubAdapter)
+        self.assertEqual(adapter.last_updated, '2025-09-01')
+        self.assertEqual(len(service.fetch_countries()), 217)  # Aggregates are dropped
+
+
+@override_settings(WORLDBANK_RESPONSE_CACHE=None, WORLDBANK_CLIENT_POLICY=OFFLINE_POLICY)
+class IngestRunTests(TestCase):
+    """Failed indicators leave the run resumable instead of completed"""
+
+    @classmethod
+    def setUpTestData(cls):
+        stub = WorldBankStubAdapter()
+        Country.objects.bulk_create([Country(id=country['id'], name=country['name']) for country in stub.countries[:3]])
+        Indicator.objects.create(id='NY.GDP.PCAP.CD', name='GDP per capita')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_failed_indicators_keep_the_run_resumable(self):
+        with self.settings(WORLDBANK_OFFLINE_STUB={'ERROR_RATE': 1.0}):
+            report = populate_country_data(force=True)
+            with self.assertRaises(CommandError):
+                call_command('load_worldbank_data', '--data-only', '--force', stdout=StringIO())
+        self.assertEqual(report.indicators_failed, 1)
+        self.assertEqual(IngestRun.objects.get(pk=report.run_id).status, IngestRun.STATUS_PARTIAL)
+        self.assertFalse(SyncLedger.objects.filter(scope=SyncLedger.SCOPE_INDICATOR).exists())
+
+        with self.settings(WORLDBANK_OFFLINE_STUB={'SCALE': 1}):
+            report = populate_country_data(resume=True)
+        self.assertEqual(report.indicators_failed, 0)
+        run = IngestRun.objects.get(pk=report.run_id)
+        self.assertEqual(run.status, IngestRun.STATUS_COMPLETED)
+        self.assertFalse(run.checkpoints.exists())
+        self.assertEqual(CountryData.objects.values('country_id').distinct().count(), 3)
+
+    def test_forced_metadata_loads_revalidate_cached_responses(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        response_cache = {'PATH': Path(directory.name) / 'responses.sqlite3'}
+        with self.settings(WORLDBANK_OFFLINE_STUB={'SCALE': 1}, WORLDBANK_RESPONSE_CACHE=response_cache):
+            populate_countries()
+            populate_indicators()
+            WorldBankStubAdapter.reset_count()
+            populate_countries()
+            populate_indicators()
+            self.assertEqual(WorldBankStubAdapter.request_count, 0)
+
+            populate_countries(force=True)
+            populate_indicators(force=True)
+            self.assertEqual(WorldBankStubAdapter.request_count, 11)  # One country page and ten indicators
+            self.assertEqual(get_response_cache().stats()['revalidated'], 11)
+
+
+@override_settings(
+    WORLDBANK_OFFLINE_STUB={'SCALE': 1}, WORLDBANK_RESPONSE_CACHE=None, WORLDBANK_CLIENT_POLICY=OFFLINE_POLICY,
+)
+class BulkIndicatorFetchTests(TestCase):
+    """Indicator data for every country comes from paginated country/all requests"""
+
+    def test_requests_are_planned_per_source_and_chunk(self):
+        service = WorldBankAPIService()
+        codes = [f'IND.{index}' for index in range(130)] + ['GOV.1', 'GOV.2']
+        sources = {'GOV.1': '3', 'GOV.2': '3'}  # The rest default to World Development Indicators
+        plan = service._plan_bulk_requests(codes, sources)
+        self.assertEqual([(source, len(chunk)) for source, chunk in plan], [('2', 60), ('2', 60), ('2', 10), ('3', 2)])
+        self.assertEqual([code for _, chunk in plan for code in chunk], codes)
+
+        # One request per chunk, plus the pages that known record counts spill onto
+        self.assertEqual(service.estimate_bulk_requests(codes, sources), 4)
+        counts = {'IND.0': service.BULK_PER_PAGE, 'IND.1': 1, 'GOV.1': 5}
+        self.assertEqual(service.estimate_bulk_requests(codes, sources, counts), 5)
+
+    def test_pages_cover_every_country_and_indicator(self):
+        service = WorldBankAPIService()
+        service.BULK_PER_PAGE = 500
+        codes = ['NY.GDP.PCAP.CD', 'SP.DYN.LE00.IN']
+        pages = list(service.iter_bulk_indicator_data(codes))
+        rows = [row for page in pages for row in page.rows]
+
+        stub = WorldBankStubAdapter()
+        self.assertEqual(len(pages), math.ceil(len(codes) * len(stub.countries) * len(YEARS) / 500))
+        self.assertEqual(service.requests_made, len(pages))
+        self.assertEqual([page.complete for page in pages].count(True), 1)
+        self.assertTrue(all(page.indicator_codes == codes for page in pages))
+        self.assertEqual({page.last_updated for page in pages}, {date(2025, 7, 1)})
+
+        # Rows are keyed by the ISO3 code, and empty values are dropped
+        expected = {
+            (country['id'], code, str(year)): Decimal(str(record['value']))
+            for code in codes for country in stub.countries for year in YEARS
+            for record in [stub._record(code, country, year)] if record['value'] is not None
+        }
+        self.assertEqual({(row['country_id'], row['indicator_id'], row['date']): row['value'] for row in rows}, expected)
+        self.assertEqual(len(rows), len(expected))
+
+
+@override_settings(
+    WORLDBANK_OFFLINE_STUB={'SCALE': 1}, WORLDBANK_RESPONSE_CACHE=None, WORLDBANK_CLIENT_POLICY=OFFLINE_POLICY,
+)
+class SyncLedgerTests(TestCase):
+    """Indicators are only refetched when their World Bank source reports an update"""
+
+    @classmethod
+    def setUpTestData(cls):
+        stub = WorldBankStubAdapter()
+        Country.objects.bulk_create([Country(id=country['id'], name=country['name']) for country in stub.countries[49:52]])
+        Indicator.objects.create(id='NY.GDP.PCAP.CD', name='GDP per capita', source_id='2')  # Updated 2025-07-01
+        Indicator.objects.create(id='GOV.WGI.VA', name='Voice and accountability', source_id='3')  # Updated 2024-10-01
+
+    def setUp(self):
+        cache.clear()
+
+    def fetched(self, **options):
+        report = populate_country_data(**options)
+        self.assertEqual(report.indicators_fetched + report.indicators_skipped, 2)
+        return report
+
+    def test_unchanged_sources_are_skipped(self):
+        self.assertEqual(self.fetched().indicators_fetched, 2)
+        ledger = dict(SyncLedger.objects.filter(scope=SyncLedger.SCOPE_INDICATOR).values_list('key', 'last_updated'))
+        self.assertEqual(ledger, {'NY.GDP.PCAP.CD': date(2025, 7, 1), 'GOV.WGI.VA': date(2025, 7, 1)})
+        # Every record served, aggregates included, which sizes later request estimates
+        self.assertGreater(SyncLedger.objects.get(scope=SyncLedger.SCOPE_INDICATOR, key='NY.GDP.PCAP.CD').record_count, 1000)
+
+        report = self.fetched()
+        self.assertEqual((report.indicators_fetched, report.indicators_skipped), (0, 2))
+        self.assertEqual(report.requests_made, 1)  # Only the source list
+        self.assertEqual(report.requests_avoided, 2)
+
+        with self.settings(WORLDBANK_OFFLINE_STUB={'SCALE': 1, 'LAST_UPDATED': '2025-09-01'}):
+            report = self.fetched()
+        self.assertEqual((report.indicators_fetched, report.indicators_skipped), (1, 1))
+        self.assertEqual(
+            SyncLedger.objects.get(scope=SyncLedger.SCOPE_INDICATOR, key='NY.GDP.PCAP.CD').last_updated, date(2025, 9, 1)
+        )
+        self.assertEqual(self.fetched(force=True).indicators_fetched, 2)
+
+    def test_since_refetches_sources_updated_on_or_after_it(self):
+        self.fetched()
+        self.assertEqual(self.fetched(since=date(2025, 7, 1)).indicators_fetched, 1)
+        self.assertEqual(self.fetched(since=date(2025, 7, 2)).indicators_fetched, 0)
+        self.assertEqual(self.fetched(since=date(2024, 1, 1)).indicators_fetched, 2)
+
+        output = StringIO()
+        call_command('load_worldbank_data', '--data-only', '--since', '2025-01-01', stdout=output)
+        self.assertIn('Indicators: 1 fetched, 1 unchanged upstream', output.getvalue())
+
+
+@override_settings(
+    WORLDBANK_OFFLINE_STUB={'SCALE': 1}, WORLDBANK_RESPONSE_CACHE=None, WORLDBANK_CLIENT_POLICY=OFFLINE_POLICY,
+)
+class StreamingIngestTests(TestCase):
+    """Country data is written in bounded batches and a crashed load resumes where it stopped"""
+
+    @classmethod
+    def setUpTestData(cls):
+        stub = WorldBankStubAdapter()
+        Country.objects.bulk_create([Country(id=country['id'], name=country['name']) for country in stub.countries[49:54]])
+        # Different sources, so each indicator is its own request
+        Indicator.objects.create(id='NY.GDP.PCAP.CD', name='GDP per capita', source_id='2')
+        Indicator.objects.create(id='GOV.WGI.VA', name='Voice and accountability', source_id='3')
+
+    def setUp(self):
+        cache.clear()
+
+    def stored(self):
+        return set(CountryData.objects.values_list('country_id', 'indicator_id', 'date', 'value'))
+
+    def test_writer_commits_fixed_size_batches(self):
+        report = SyncReport()
+        writer = CountryDataWriter(report, batch_size=10)
+        countries = list(Country.objects.values_list('id', flat=True))
+        for index in range(25):
+            writer.add({
+                'country_id': countries[index % 5], 'indicator_id': 'NY.GDP.PCAP.CD', 'date': str(2000 + index),
+                'year': 2000 + index, 'country_iso3_code': countries[index % 5], 'value': Decimal(index),
+                'unit': '', 'obs_status': '', 'decimal_places': 0,
+            })
+        self.assertEqual([timing.rows for timing in report.chunk_timings], [10, 10])
+        writer.flush()
+        writer.flush()  # Nothing left to write
+        self.assertEqual([timing.rows for timing in report.chunk_timings], [10, 10, 5])
+        self.assertEqual([timing.countries for timing in report.chunk_timings], [5, 5, 5])
+        self.assertEqual(report.created, 25)
+        self.assertEqual(CountryData.objects.count(), 25)
+
+    def test_load_streams_in_batches_of_at_most_batch_size(self):
+        report = populate_country_data(batch_size=7)
+        self.assertEqual(report.created, CountryData.objects.count())
+        self.assertTrue(all(timing.rows <= 7 for timing in report.chunk_timings))
+        self.assertEqual(sum(timing.rows for timing in report.chunk_timings), report.created)
+        self.assertGreater(len(report.chunk_timings), report.created // 7)
+
+    def test_crashed_load_resumes_from_checkpoints(self):
+        def crash_after_first_request(*args):
+            if IngestCheckpoint.objects.exists():
+                raise RuntimeError('Worker killed')
+            _checkpoint_units(*args)
+
+        with patch('dashboard.services._checkpoint_units', side_effect=crash_after_first_request):
+            with self.assertRaises(RuntimeError):
+                populate_country_data()
+        run = IngestRun.objects.get()
+        self.assertEqual(run.status, IngestRun.STATUS_FAILED)
+        checkpointed = set(run.checkpoints.values_list('indicator_id', flat=True))
+        self.assertEqual(len(checkpointed), 1)
+        self.assertEqual(run.checkpoints.count(), 5)
+        self.assertFalse(SyncLedger.objects.filter(scope=SyncLedger.SCOPE_INDICATOR).exists())
+
+        output = StringIO()
+        call_command('load_worldbank_data', '--data-only', '--resume', stdout=output)
+        self.assertIn(f'Resumed run {run.pk}: 5 units already committed', output.getvalue())
+        self.assertIn('Indicators: 1 fetched', output.getvalue())
+        run.refresh_from_db()
+        self.assertEqual(run.status, IngestRun.STATUS_COMPLETED)
+        self.assertFalse(run.checkpoints.exists())
+        self.assertEqual(SyncLedger.objects.filter(scope=SyncLedger.SCOPE_INDICATOR).count(), 2)
+        self.assertEqual(populate_country_data().indicators_fetched, 0)
+
+        # The resumed load holds exactly what a single full load would
+        resumed = self.stored()
+        CountryData.objects.all().delete()
+        populate_country_data(force=True)
+        self.assertEqual(resumed, self.stored())
+        self.assertEqual({indicator for _, indicator, _, _ in resumed}, {'NY.GDP.PCAP.CD', 'GOV.WGI.VA'})
+
+
+class CountryResolverTests(TestCase):
+    """Happiness report names and codes resolved to World Bank country ids"""
+
+    @classmethod
+    def setUpTestData(cls):
+        Country.objects.bulk_create([
+            Country(id='CZE', iso2_code='CZ', name='Czechia'),
+            Country(id='EGY', iso2_code='EG', name='Egypt, Arab Rep.'),
+            Country(id='CIV', iso2_code='CI', name="Cote d'Ivoire"),
+            Country(id='TUR', iso2_code='TR', name='Turkiye'),
+            Country(id='XKX', iso2_code='XK', name='Kosovo'),
+        ])
+
+    def test_codes_resolve_through_ids_and_iso2(self):
+        resolver = CountryResolver.build()
+        self.assertEqual(resolver.resolve_code('CZE'), 'CZE')
+        self.assertEqual(resolver.resolve_code('cz'), 'CZE')
+        self.assertEqual(resolver.resolve_code('XK'), 'XKX')
+        self.assertIsNone(resolver.resolve_code('ZZ'))
+        self.assertIsNone(resolver.resolve_code(''))
+
+    def test_names_resolve_through_mapping_and_normalization(self):
+        resolver = CountryResolver.build()
+        self.assertEqual(resolver.resolve('Czech Republic'), 'CZE')  # Mapped to the ISO2 code CZ
+        self.assertEqual(resolver.resolve('Türkiye'), 'TUR')
+        self.assertEqual(normalize_country_name('Egypt, Arab Rep.'), 'egypt')
+        self.assertEqual(resolver.resolve('Egypt'), 'EGY')
+        self.assertEqual(resolver.resolve("Côte d’Ivoire*"), 'CIV')
+        self.assertEqual(resolver.resolve('Unknown Land', code_hint='EG'), 'EGY')
+        self.assertIsNone(resolver.resolve('Atlantis'))
+        self.assertEqual(resolver.suggest('Kosovoo'), ['Kosovo (XKX)'])
+
+
+class HappinessParserTests(TestCase):
+    """The vectorized workbook parser produces what the row-by-row parser stored"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def assertParsersAgree(self, path):
+        records = HappinessDataService(str(path), use_cache=False).process_happiness_excel_file()
+        legacy_records = legacy_parse_happiness_workbook(str(path))
+        self.assertTrue(records)
+        self.assertEqual(self.stored(records), self.stored(legacy_records))
+        return records
+
+    @staticmethod
+    def stored(records):
+        """Records as HappinessData columns hold them: decimals at the field's places, zero as missing"""
+        rows = []
+        for record in records:
+            row = [record['country_name'], record['wb_country_code'], record['year']]
+            for field_name, places in HappinessDataService.DECIMAL_FIELDS.items():
+                value = record[field_name]
+                if value is not None:
+                    value = Decimal(str(value)).quantize(Decimal(1).scaleb(-places))
+                row.append(value or None)
+            rows.append(row)
+        return rows
+
+    def test_synthetic_workbook_matches_legacy_parser(self):
+        path = self.directory / 'synthetic.xlsx'
+        make_synthetic_happiness_workbook(str(path), rows=600, sheets=7, seed=3)
+        records = self.assertParsersAgree(path)
+        self.assertTrue(all(isinstance(record['ladder_score'], float) for record in records))
+        self.assertTrue(any(record['explained_by_generosity'] is None for record in records))
+
+    def test_irregular_sheets_match_legacy_parser(self):
+        path = self.directory / 'irregular.xlsx'
+        with pd.ExcelWriter(path, engine='openpyxl') as writer:
+            # The year comes from the sheet name when there is no Year column
+            pd.DataFrame({
+                'Country name': ['Finland*', '  Denmark ', None, 'nan', 'Iceland', 'Atlantis', 'Norway'],
+                'Ladder score': [7.8412345, 7.6, 6.1, 6.2, 0, 5.5, None],
+                'upperwhisker': [7.9123456789, 7.7, 6.2, 6.3, 7.1, 5.6, 7.2],
+                'Explained by: Generosity': [0.1234567, 0, 0.2, 0.2, 0.3, None, 0.1],
+            }).to_excel(writer, sheet_name='Data2021', index=False)
+            pd.DataFrame({
+                'Country name': ['Finland', 'Denmark', 'Sweden', 'Sweden'],
+                'Year': [2019, 2020, 2025, 2026],
+                'Ladder score': [7.7, 7.5, 7.3, 7.4],
+            }).to_excel(writer, sheet_name='History', index=False)
+            pd.DataFrame({'Country name': ['Finland'], 'Ladder score': [7.0]}).to_excel(
+                writer, sheet_name='Notes', index=False,
+            )
+        records = self.assertParsersAgree(path)
+        self.assertEqual(
+            [(record['country_name'], record['wb_country_code'], record['year']) for record in records],
+            [('Finland', 'FI', 2021), ('Denmark', 'DK', 2021), ('Atlantis', None, 2021),
+             ('Denmark', 'DK', 2020), ('Sweden', 'SE', 2025)],
+        )
+        self.assertEqual(records[0]['ladder_score'], 7.8412)
+        self.assertEqual(records[0]['upper_whisker'], 7.912346)
+        self.assertIsNone(records[1]['explained_by_generosity'])
+
+
+class HappinessWorkbookCacheTests(TestCase):
+    """The normalized workbook is cached next to it and reused until the file or format changes"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = str(Path(directory.name) / 'happiness.xlsx')
+        make_synthetic_happiness_workbook(self.path, rows=300, sheets=3)
+
+    def parse(self, **options):
+        service = HappinessDataService(self.path, **options)
+        return service, service.process_happiness_excel_file()
+
+    def duplicates(self):
+        """Rows that repeat a (country, year) pair, which the load keeps once"""
+        records = self.parse(use_cache=False)[1]
+        return len(records) - len({(record['country_name'], record['year']) for record in records})
+
+    def test_unchanged_workbook_is_served_from_cache(self):
+        _, expected = self.parse(use_cache=False)
+        self.assertFalse(os.path.exists(self.path + HappinessDataService.CACHE_SUFFIX))
+
+        service, records = self.parse()
+        self.assertIs(service.cache_hit, False)
+        self.assertTrue(os.path.exists(service.cache_path))
+        self.assertEqual(records, expected)
+
+        service, records = self.parse()
+        self.assertIs(service.cache_hit, True)
+        self.assertEqual(records, expected)
+
+        # Country codes are mapped after loading, so mapping changes apply to cached rows
+        name = expected[0]['country_name']
+        with patch.dict('dashboard.services.COUNTRY_NAME_TO_CODE_MAPPING', {name: 'XX'}):
+            service, records = self.parse()
+        self.assertIs(service.cache_hit, True)
+        self.assertEqual(records[0]['wb_country_code'], 'XX')
+
+    def test_changed_workbook_or_format_invalidates_cache(self):
+        self.parse()
+        make_synthetic_happiness_workbook(self.path, rows=300, sheets=3, seed=1)
+        service, records = self.parse()
+        self.assertIs(service.cache_hit, False)
+        self.assertEqual(records, self.parse(use_cache=False)[1])
+        self.assertIs(self.parse()[0].cache_hit, True)
+
+        with patch.object(HappinessDataService, 'CACHE_FORMAT_VERSION', HappinessDataService.CACHE_FORMAT_VERSION + 1):
+            self.assertIs(self.parse()[0].cache_hit, False)
+            self.assertIs(self.parse()[0].cache_hit, True)
+
+        with open(self.path + HappinessDataService.CACHE_SUFFIX, 'wb') as f:
+            f.write(b'not a pickle')
+        service, records = self.parse()
+        self.assertIs(service.cache_hit, False)
+        self.assertEqual(len(records), 300)
+
+    def test_load_command_reports_cache_use(self):
+        output = StringIO()
+        call_command('load_happiness_data', '--file-path', self.path, stdout=output)
+        self.assertIn('Parsed workbook cache miss', output.getvalue())
+        self.assertEqual(HappinessData.objects.count(), 300 - self.duplicates())
+
+        output = StringIO()
+        call_command('load_happiness_data', '--file-path', self.path, stdout=output)
+        self.assertIn('Parsed workbook cache hit', output.getvalue())
+        self.assertIn('0 created, 0 updated', output.getvalue())
+
+        output = StringIO()
+        call_command('load_happiness_data', '--file-path', self.path, '--no-cache', stdout=output)
+        self.assertNotIn('Parsed workbook cache', output.getvalue())
+
+
+class HappinessDataRouteTests(APITestCase):
+    """Numeric ids reach the happiness-data detail route and country codes the per-country route"""
+
+    def test_detail_and_country_routes(self):
+        Country.objects.create(id='FIN', name='Finland')
+        row = HappinessData.objects.create(country_name='Finland', country_id='FIN', year=2024, ladder_score=Decimal('7.7'))
+        HappinessData.objects.create(country_name='Finland', year=2023, ladder_score=Decimal('7.8'))  # Matched by name
+
+        response = self.client.get(f'/api/happiness-data/{row.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['year'], 2024)
+
+        response = self.client.get('/api/happiness-data/FIN/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([entry['year'] for entry in response.json()], [2023, 2024])
+        self.assertEqual(self.client.get('/api/happiness-data/XXX/').status_code, 404)
+
+
+@override_settings(DASHBOARD_API_RESPONSE_CACHE=None)
+class AnalyticCubeTests(APITestCase):
+    """The in-memory cube answers exactly as the ORM path does"""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_scaled_dataset(countries=12, indicators=2)
+        # Rows stored without a value are still part of the series
+        CountryData.objects.filter(country_id='C005', indicator_id='IND.1', year__in=[2021, 2023]).update(value=None)
+
+    def setUp(self):
+        super().setUp()
+        patcher = patch('dashboard.analytics._cube', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_cube_matches_orm(self):
+        urls = [
+            '/api/country-data/C005/IND.1/',
+            '/api/country-data/C006/IND.0/',
+            f'/api/regional-indicators/{quote(REGIONS[1])}/IND.1/2023/',
+            f'/api/regional-indicators/{quote(REGIONS[1])}/IND.0/2022/',
+            '/api/regional-happiness/?year=2023',
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                orm = self.client.get(url).json()
+                with self.settings(DASHBOARD_ANALYTIC_CUBE=True):
+                    self.assertEqual(self.client.get(url).json(), orm)
+
+        series = self.client.get('/api/country-data/C005/IND.1/').json()
+        self.assertEqual([row['year'] for row in series if row['value'] is None], [2021, 2023])
+        self.assertEqual(len(series), len(YEARS))
+
+
+@override_settings(DASHBOARD_API_RESPONSE_CACHE=None)
+class SnapshotTests(TransactionTestCase):
+    """Publishing, validating, rolling back and serving read-only snapshots"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        self.store = SnapshotStore(self.directory / 'snapshots', keep=3)
+        self.exports = 0
+        Country.objects.bulk_create([Country(id=f'C{index:03d}', name=f'Country {index:03d}') for index in range(10)])
+
+    def export(self) -> Path:
+        """The test database copied to a file, standing in for db.sqlite3"""
+        self.exports += 1
+        path = self.directory / f'source-{self.exports}.sqlite3'
+        with connection.cursor() as cursor:
+            cursor.execute('VACUUM INTO %s', [str(path)])
+        return path
+
+    def leftovers(self):
+        return [entry.name for entry in self.store.directory.iterdir() if entry.name.endswith(('.building', '.tmp'))]
+
+    def test_publish_points_readers_at_a_validated_copy(self):
+        self.assertIsNone(self.store.current_version())
+        self.assertEqual(self.store.publish(self.export()), 1)
+        self.assertEqual(self.store.publish(self.export()), 2)
+        self.assertEqual(self.store.current_version(), 2)
+        self.assertEqual(self.store.versions(), [1, 2])
+        self.assertEqual(self.leftovers(), [])
+        self.assertEqual(self.store.counts(self.store.path(2))['dashboard_country'], 10)
+
+    def test_shrinking_tables_are_refused_unless_forced(self):
+        self.store.publish(self.export())
+        Country.objects.exclude(id__in=['C000', 'C001']).delete()
+        with self.assertRaisesMessage(SnapshotError, 'dashboard_country shrank from 10 to 2 rows'):
+            self.store.publish(self.export())
+        self.assertEqual((self.store.versions(), self.store.current_version(), self.leftovers()), ([1], 1, []))
+
+        self.assertEqual(self.store.publish(self.export(), force=True), 2)
+
+    def test_invalid_candidates_are_refused(self):
+        IngestRun.objects.create(status=IngestRun.STATUS_PARTIAL)
+        with self.assertRaisesMessage(SnapshotError, 'is partial; resume it before publishing'):
+            self.store.publish(self.export())
+        IngestRun.objects.all().delete()
+
+        source = self.export()
+        db = sqlite3.connect(str(source))
+        db.execute('DROP TABLE dashboard_regionalaggregate')
+        db.commit()
+        db.close()
+        with self.assertRaisesMessage(SnapshotError, 'Missing tables (run migrate first): dashboard_regionalaggregate'):
+            self.store.publish(source)
+        self.assertEqual((self.store.versions(), self.store.current_version(), self.leftovers()), ([], None, []))
+
+    def test_rollback(self):
+        for _ in range(3):
+            self.store.publish(self.export())
+        self.assertEqual(self.store.rollback(), 2)
+        self.assertEqual(self.store.rollback(), 1)
+        with self.assertRaisesMessage(SnapshotError, 'No earlier snapshot'):
+            self.store.rollback()
+        self.assertEqual(self.store.rollback(3), 3)
+        with self.assertRaisesMessage(SnapshotError, 'Snapshot 7 does not exist'):
+            self.store.rollback(7)
+        self.assertEqual(self.store.current_version(), 3)
+
+    def test_garbage_collection_keeps_recent_and_current_versions(self):
+        store = SnapshotStore(self.store.directory, keep=2)
+        for _ in range(3):
+            store.publish(self.export())
+        self.assertEqual(store.versions(), [2, 3])
+
+        store.rollback(2)
+        self.assertEqual(SnapshotStore(self.store.directory, keep=1).collect_garbage(), [])  # 2 is current
+        self.assertEqual(store.versions(), [2, 3])
+        store.publish(self.export())
+        self.assertEqual(store.versions(), [3, 4])
+
+    def test_requests_read_the_current_snapshot(self):
+        connections.settings[SNAPSHOT_ALIAS] = {**connections['default'].settings_dict, 'NAME': ''}
+        self.addCleanup(connections.settings.pop, SNAPSHOT_ALIAS)
+        self.addCleanup(lambda: connections[SNAPSHOT_ALIAS].close())
+
+        def country_ids():
+            return [row['id'] for row in self.client.get('/api/countries/?page_size=1000').json()['results']]
+
+        with self.settings(DASHBOARD_SNAPSHOTS={'DIR': self.store.directory, 'MMAP_SIZE': 1024 * 1024}):
+            self.assertEqual(len(country_ids()), 10)  # Nothing published yet: the writer database
+            get_snapshot_store().publish(self.export())
+            Country.objects.create(id='NEW', name='Unpublished')
+            self.assertNotIn('NEW', country_ids())
+            self.assertEqual(Country.objects.count(), 11)  # Outside requests, reads stay on the writer
+
+            get_snapshot_store().publish(self.export())
+            self.assertIn('NEW', country_ids())
+            get_snapshot_store().rollback()
+            self.assertNotIn('NEW', country_ids())
+
+            snapshot = connections[SNAPSHOT_ALIAS]
+            self.assertTrue(snapshot.settings_dict['NAME'].endswith('snapshot-000001.sqlite3?mode=ro&immutable=1'))
+            with snapshot.cursor() as cursor:
+                cursor.execute('PRAGMA mmap_size')
+                self.assertEqual(cursor.fetchone()[0], 1024 * 1024)
+                with self.assertRaises(DatabaseError):
+                    cursor.execute("INSERT INTO dashboard_country (id, name) VALUES ('X', 'X')")
+
+
+class QueryPlanTests(APITestCase):
+    """Every query behind the API endpoints must be served by an index.
+
+    Each endpoint is requested against a scaled dataset, and every SELECT it
+    runs is checked with EXPLAIN QUERY PLAN for full table scans and for
+    temporary B-trees built to sort the result.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        create_scaled_dataset()
+
+    def query_plans(self, url):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+
+        plans = []
+        with connection.cursor() as cursor:
+            for query in captured.captured_queries:
+                if not query['sql'].startswith('SELECT'):
+                    continue
+                cursor.execute(f"EXPLAIN QUERY PLAN {query['sql']}")
+                plans.append((query['sql'], [row[-1] for row in cursor.fetchall()]))
+        return plans
+
+    def assertIndexed(self, url, allowed=()):
+        """Fail on table scans and temp B-trees, except for plan steps listed in ``allowed``"""
+        for sql, plan in self.query_plans(url):
+            for step in plan:
+                if step in allowed:
+                    continue
+                if step.startswith('SCAN') and 'INDEX' not in step:
+                    self.fail(f'{url} scans a whole table ({step}):\n{sql}\n' + '\n'.join(plan))
+                if 'TEMP B-TREE' in step:
+                    self.fail(f'{url} sorts in a temp B-tree ({step}):\n{sql}\n' + '\n'.join(plan))
+
+    def test_country_endpoints(self):
+        self.assertIndexed('/api/countries/')
+        self.assertIndexed('/api/countries/by_region/?region=Sub-Saharan%20Africa')
+        self.assertIndexed('/api/countries/C007/')
+
+    def test_indicator_endpoints(self):
+        self.assertIndexed('/api/indicators/')
+
+    def test_happiness_data_list(self):
+        self.assertIndexed('/api/happiness-data/')
+        self.assertIndexed('/api/happiness-data/?year=2023')
+        self.assertIndexed('/api/happiness-data/?region=Europe%20%26%20Central%20Asia')
+        self.assertIndexed('/api/happiness-data/?country=C012')
+
+    def test_later_pages(self):
+        # Each page seeks past the previous page's last row instead of counting and skipping rows
+        for url in (
+            '/api/countries/?page_size=50',
+            '/api/indicators/?page_size=5',
+            '/api/happiness-data/?page_size=50',
+            '/api/happiness-data/?year=2023&page_size=50',
+            '/api/happiness-data/?region=Europe%20%26%20Central%20Asia&page_size=50',
+        ):
+            next_page = self.client.get(url).json()['next']
+            sql, plan = self.query_plans(next_page)[-1]
+            self.assertFalse(any(step.startswith('SCAN') for step in plan), f'{next_page}:\n{sql}\n{plan}')
+            self.assertIndexed(next_page)
+
+    def test_country_happiness_data(self):
+        # Linked rows and name-matched rows come from two index lookups merged by the OR,
+        # so their handful of yearly rows is sorted afterwards
+        self.assertIndexed('/api/happiness-data/C012/', allowed=('USE TEMP B-TREE FOR ORDER BY',))
+
+    def test_country_indicator_data(self):
+        self.assertIndexed('/api/country-data/C012/IND.4/')
+
+    def test_country_indicator_batch(self):
+        self.assertIndexed('/api/country-data/?countries=C001,C012,C200&indicators=IND.1,IND.4&start_year=2021')
+        # A region's indicator-year rows are seeks on (indicator, year), then sorted into series order
+        self.assertIndexed(
+            '/api/country-data/?region=Sub-Saharan%20Africa&indicators=IND.4&start_year=2023&end_year=2023',
+            allowed=('USE TEMP B-TREE FOR ORDER BY',),
+        )
+
+    def test_regional_indicator_data(self):
+        # One indicator-year is walked in value order on (indicator, year, -value); the region is a per-row check
+        self.assertIndexed('/api/regional-indicators/Sub-Saharan%20Africa/IND.4/2023/')
+
+    def test_regional_happiness(self):
+        self.assertIndexed('/api/regional-happiness/')
+        self.assertIndexed('/api/regional-happiness/?year=2023')
+        self.assertIndexed('/api/regional-happiness/?income_level=Low%20income')
+
+    def test_cross_section(self):
+        self.assertIndexed('/api/cross-section/2023/?indicators=IND.1,IND.4')
+        self.assertIndexed('/api/cross-section/2023/?indicators=IND.4&region=Sub-Saharan%20Africa')
+        cache.clear()
+        self.assertIndexed('/api/cross-section/2023/columns/?income_level=Low%20income')
+
+
+class HappinessRankTests(TestCase):
+    """Ranks are materialized per year at ingest rather than counted per row"""
+
+    @classmethod
+    def setUpTestData(cls):
+        scores = {
+            2023: {'Aland': '7.5', 'Borduria': '6.0', 'Carpania': '6.0', 'Dorland': '4.0'},
+            2024: {'Aland': '5.0', 'Borduria': '7.0', 'Carpania': '6.5', 'Dorland': None},
+        }
+        HappinessData.objects.bulk_create([
+            HappinessData(country_name=name, year=year, ladder_score=None if score is None else Decimal(score))
+            for year, countries in scores.items() for name, score in countries.items()
+        ])
+        cls.updated = rank_happiness_data()
+
+    def ranking(self, year):
+        return {
+            row.country_name: (row.rank, row.percentile, row.rank_change)
+            for row in HappinessData.objects.filter(year=year)
+        }
+
+    def test_ranks_percentiles_and_changes(self):
+        self.assertEqual(self.ranking(2023), {
+            'Aland': (1, Decimal('100.00'), None),
+            'Borduria': (2, Decimal('33.33'), None),
+            'Carpania': (2, Decimal('33.33'), None),
+            'Dorland': (4, Decimal('0.00'), None),
+        })
+        self.assertEqual(self.ranking(2024), {
+            'Aland': (3, Decimal('0.00'), -2),
+            'Borduria': (1, Decimal('100.00'), 1),
+            'Carpania': (2, Decimal('50.00'), 0),
+            'Dorland': (None, None, None),
+        })
+
+    def test_reranking_only_writes_changes(self):
+        self.assertEqual(self.updated, 7)
+        self.assertEqual(rank_happiness_data(), 0)
+
+        HappinessData.objects.filter(country_name='Dorland', year=2023).update(ladder_score=Decimal('8.0'))
+        HappinessData.objects.filter(country_name='Aland', year=2024).update(ladder_score=None)
+        # Every 2023 rank moves, Aland drops out of 2024 and the other 2024 rank changes follow 2023
+        self.assertEqual(rank_happiness_data(), 7)
+        self.assertEqual(HappinessData.objects.get(country_name='Dorland', year=2023).rank, 1)
+        self.assertIsNone(HappinessData.objects.get(country_name='Aland', year=2024).rank)
+
+    def test_ranked_list_is_one_query(self):
+        with self.assertNumQueries(1):
+            data = HappinessDataSerializer(HappinessData.objects.filter(year=2023), many=True).data
+        self.assertEqual([row['rank'] for row in data], [1, 2, 2, 4])
+        self.assertEqual(HappinessData.objects.get(country_name='Aland', year=2023).happiness_rank, 1)
+
+
+class RegionalAggregateTests(APITestCase):
+    """The materialized regional summaries must match aggregating the live rows"""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_scaled_dataset(countries=60, indicators=1)
+        # Gaps in one factor, so value counts and row counts differ
+        HappinessData.objects.filter(year=2022, country__id__endswith='7').update(explained_by_generosity=None)
+        refresh_regional_aggregates()
+
+    def live_groups(self, by_income_level):
+        """Live aggregation over HappinessData joined to Country, keyed like RegionalAggregate"""
+        keys = ['country__region_value', 'year'] + (['country__income_level_value'] if by_income_level else [])
+        groups = {}
+        for row in HappinessData.objects.filter(country__isnull=False).values(*keys).annotate(rows=Count('id')):
+            if by_income_level:
+                income_level = row['country__income_level_value'] or 'Not classified'
+            else:
+                income_level = RegionalAggregate.ALL_INCOME_LEVELS
+            key = (row['country__region_value'], income_level, row['year'])
+            groups[key] = row['rows']
+        return groups
+
+    def assertMatchesLiveRows(self, aggregate):
+        rows = HappinessData.objects.filter(country__region_value=aggregate.region, year=aggregate.year)
+        if aggregate.income_level != RegionalAggregate.ALL_INCOME_LEVELS:
+            income_level = '' if aggregate.income_level == 'Not classified' else aggregate.income_level
+            rows = rows.filter(country__income_level_value=income_level)
+        values = sorted(float(value) for value in rows.values_list(aggregate.metric, flat=True) if value is not None)
+        live = rows.aggregate(
+            rows=Count('id'), count=Count(aggregate.metric), mean=Avg(aggregate.metric), minimum=Min(aggregate.metric),
+            maximum=Max(aggregate.metric),
+        )
+        self.assertEqual(aggregate.country_count, live['rows'])
+        self.assertEqual(aggregate.count, live['count'])
+        if not values:
+            for name in ('mean', 'median', 'minimum', 'maximum', 'stddev', 'q1', 'q3'):
+                self.assertIsNone(getattr(aggregate, name))
+            return
+        for name in ('mean', 'minimum', 'maximum'):
+            self.assertAlmostEqual(getattr(aggregate, name), float(live[name]), places=6, msg=f'{aggregate} {name}')
+        if len(values) > 1:
+            self.assertAlmostEqual(aggregate.stddev, statistics.stdev(values), places=6)
+        else:
+            self.assertIsNone(aggregate.stddev)
+        quartiles = statistics.quantiles(values, n=4, method='inclusive')
+        self.assertAlmostEqual(aggregate.median, statistics.median(values), places=6)
+        self.assertAlmostEqual(aggregate.q1, quartiles[0], places=6)
+        self.assertAlmostEqual(aggregate.q3, quartiles[2], places=6)
+
+    def test_groups_match_live_aggregation(self):
+        expected = {**self.live_groups(by_income_level=True), **self.live_groups(by_income_level=False)}
+        for metric in REGIONAL_METRICS:
+            stored = {
+                (row.region, row.income_level, row.year): row.country_count
+                for row in RegionalAggregate.objects.filter(metric=metric)
+            }
+            self.assertEqual(stored, expected)
+
+    def test_statistics_match_live_aggregation(self):
+        aggregates = RegionalAggregate.objects.filter(
+            metric__in=['ladder_score', 'explained_by_generosity'], year__in=[2022, 2023]
+        )
+        self.assertTrue(aggregates)
+        for aggregate in aggregates:
+            self.assertMatchesLiveRows(aggregate)
+
+    def test_endpoint_matches_live_aggregation(self):
+        live = (
+            HappinessData.objects.filter(country__isnull=False).exclude(country__region_value='')
+            .values('country__region_value', 'year').annotate(avg=Avg('ladder_score'), rows=Count('id'))
+            .order_by('country__region_value', 'year')
+        )
+        with self.assertNumQueries(2):  # Dataset version for the ETag, then the aggregates
+            response = self.client.get('/api/regional-happiness/')
+        data = response.json()
+        self.assertEqual(
+            [(row['region'], row['year'], row['country_count']) for row in data],
+            [(row['country__region_value'], row['year'], row['rows']) for row in live],
+        )
+        for row, expected in zip(data, live):
+            self.assertAlmostEqual(row['avg_ladder_score'], float(expected['avg']), places=6)
+
+    def test_refresh_rewrites_only_changed_groups(self):
+        self.assertEqual(refresh_regional_aggregates().updated, 0)
+
+        HappinessData.objects.filter(country_id='C004', year=2023).update(ladder_score=Decimal('9.5'))
+        result = refresh_regional_aggregates([2023])
+        # C004's region and income level group plus the region's all-income rollup
+        self.assertEqual(result.updated, 2)
+        self.assertFalse(result.created)
+        self.assertMatchesLiveRows(RegionalAggregate.objects.get(
+            region=REGIONS[0], income_level=RegionalAggregate.ALL_INCOME_LEVELS, year=2023, metric='ladder_score'
+        ))
+
+    def test_regrouped_countries_drop_stale_groups(self):
+        Country.objects.filter(income_level_value='Low income').update(income_level_value='Lower middle income')
+        refresh_regional_aggregates()
+        self.assertFalse(RegionalAggregate.objects.filter(income_level='Low income').exists())
+        self.assertEqual(
+            {**self.live_groups(by_income_level=True), **self.live_groups(by_income_level=False)},
+            {
+                (row.region, row.income_level, row.year): row.country_count
+                for row in RegionalAggregate.objects.filter(metric='ladder_score')
+            },
+        )
+
+    def test_migration_backfill_matches_refresh(self):
+        fields = ['region', 'income_level', 'year', 'metric', *REGIONAL_AGGREGATE_FIELDS]
+        refreshed = sorted(RegionalAggregate.objects.values_list(*fields))
+        RegionalAggregate.objects.all().delete()
+        backfill = import_module('dashboard.migrations.0012_backfill_regional_aggregates')
+        backfill.aggregate_existing_rows(django_apps, None)
+        self.assertEqual(sorted(RegionalAggregate.objects.values_list(*fields)), refreshed)
+
+
+class CountryYearFactTests(APITestCase):
+    """The wide fact table answers a cross-section in one query, matching the normalized tables"""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_scaled_dataset(countries=40, indicators=4)
+
+    def test_cross_section_matches_normalized_rows(self):
+        with CaptureQueriesContext(connection) as captured:
+            rows = self.client.get('/api/cross-section/2023/?indicators=IND.1,IND.3').json()
+        self.assertEqual(len(captured.captured_queries), 3)  # Dataset version for the ETag, column lookup and one range scan
+
+        self.assertEqual(len(rows), 40)
+        for row in rows:
+            happiness = HappinessData.objects.get(country_id=row['country_id'], year=2023)
+            self.assertAlmostEqual(row['ladder_score'], float(happiness.ladder_score))
+            for code in ('IND.1', 'IND.3'):
+                value = CountryData.objects.get(country_id=row['country_id'], indicator_id=code, year=2023).value
+                self.assertAlmostEqual(row['indicators'][code], float(value))
+
+    def test_migration_backfill_matches_rebuild(self):
+        def table():
+            with connection.cursor() as cursor:
+                cursor.execute(f'SELECT * FROM {FACT_TABLE} ORDER BY year, country_id')
+                return [column[0] for column in cursor.description], cursor.fetchall()
+
+        rebuilt = table()
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE {FACT_TABLE}')
+        backfill = import_module('dashboard.migrations.0013_backfill_country_year_facts')
+        backfill.build_fact_table(django_apps, SimpleNamespace(connection=connection))  # Only its connection is used
+        self.assertEqual(table(), rebuilt)
+
+    def test_columnar_year_matches_cross_section(self):
+        cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get('/api/cross-section/2023/columns/', {'region': REGIONS[2]})
+        columns = response.json()
+        self.assertLessEqual(len(captured.captured_queries), 5)  # ETag and cache key versions, columns, indicators, one range scan
+
+        rows = self.client.get('/api/cross-section/2023/', {'indicators': ','.join(columns['indicators']), 'region': REGIONS[2]}).json()
+        self.assertEqual(columns['countries'], [row['country_id'] for row in rows])
+        self.assertEqual(columns['happiness']['ladder_score'], [row['ladder_score'] for row in rows])
+        self.assertEqual(columns['values'], [list(row['indicators'].values()) for row in rows])
+
+        # A fraction of the row-per-record payload carrying the same values
+        records = sum(
+            len(self.client.get(f'/api/regional-indicators/{REGIONS[2]}/{code}/2023/').content)
+            for code in columns['indicators']
+        )
+        self.assertLess(len(response.content) * 2, records)
+
+    def test_unknown_indicator(self):
+        response = self.client.get('/api/cross-section/2023/?indicators=NOT.LOADED')
+        self.assertEqual(response.status_code, 404)
+
+    def test_rebuild_adds_new_indicators(self):
+        Indicator.objects.create(id='NEW.IND', name='New indicator')
+        CountryData.objects.create(country_id='C007', indicator_id='NEW.IND', date='2023', year=2023, value=Decimal('42'))
+        rebuild_country_year_facts()
+        rows = self.client.get('/api/cross-section/2023/?indicators=NEW.IND').json()
+        values = {row['country_id']: row['indicators']['NEW.IND'] for row in rows}
+        self.assertEqual(values.pop('C007'), 42.0)
+        self.assertEqual(set(values.values()), {None})
+
+
+class CountryIndicatorBatchTests(APITestCase):
+    """Many country and indicator series come back from one query"""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_scaled_dataset(countries=40, indicators=4)
+
+    def test_series_match_per_pair_endpoint(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get('/api/country-data/?countries=C001,C002&indicators=IND.0,IND.3')
+        self.assertEqual(len(captured.captured_queries), 2)  # Dataset version for the ETag, then the series
+
+        batch = response.json()
+        self.assertEqual(batch['countries'], {'C001': 'Country 001', 'C002': 'Country 002'})
+        for country in ('C001', 'C002'):
+            for indicator in ('IND.0', 'IND.3'):
+                single = self.client.get(f'/api/country-data/{country}/{indicator}/').json()
+                self.assertEqual(batch['series'][country][indicator], {
+                    'years': [point['year'] for point in single],
+                    'values': [float(point['value']) for point in single],
+                })
+
+    def test_region_income_level_and_year_filters(self):
+        batch = self.client.get('/api/country-data/', {
+            'region': REGIONS[1], 'income_level': INCOME_LEVELS[0], 'indicators': 'IND.2',
+            'start_year': 2022, 'end_year': 2023,
+        }).json()
+        expected = set(Country.objects.filter(
+            region_value=REGIONS[1], income_level_value=INCOME_LEVELS[0]
+        ).values_list('id', flat=True))
+        self.assertEqual(set(batch['series']), expected)
+        for series in batch['series'].values():
+            self.assertEqual(series['IND.2']['years'], [2022, 2023])
+
+    def test_indicators_are_required(self):
+        self.assertEqual(self.client.get('/api/country-data/?countries=C001').status_code, 400)
+        self.assertEqual(self.client.get('/api/country-data/?indicators=IND.1&start_year=soon').status_code, 400)
+
+
+class HappinessCorrelationTests(APITestCase):
+    """Correlation statistics are computed server-side and cached per dataset version"""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_scaled_dataset(countries=40, indicators=4)
+        # Leave some gaps so each indicator is compared over its own complete pairs
+        CountryData.objects.filter(indicator_id='IND.2', country__id__endswith='3').delete()
+        rebuild_country_year_facts()
+
+    def reference(self, indicator, years):
+        pairs = [
+            (float(row.value), float(HappinessData.objects.get(country_id=row.country_id, year=row.year).ladder_score))
+            for row in CountryData.objects.filter(indicator_id=indicator, year__in=years)
+        ]
+        return np.array(pairs)
+
+    def test_statistics_match_reference_implementations(self):
+        response = self.client.get('/api/correlations/', {'indicators': 'IND.1,IND.2', 'start_year': 2022, 'end_year': 2024})
+        results = {result['indicator']: result for result in response.json()['results']}
+
+        for indicator in ('IND.1', 'IND.2'):
+            pairs = self.reference(indicator, [2022, 2023, 2024])
+            result = results[indicator]
+            slope, intercept = np.polyfit(pairs[:, 0], pairs[:, 1], 1)
+            pearson = np.corrcoef(pairs[:, 0], pairs[:, 1])[0, 1]
+            spearman = np.corrcoef(pd.Series(pairs[:, 0]).rank(), pd.Series(pairs[:, 1]).rank())[0, 1]
+            self.assertEqual(result['n'], len(pairs))
+            self.assertEqual(len(result['points']), len(pairs))
+            self.assertAlmostEqual(result['pearson'], pearson)
+            self.assertAlmostEqual(result['spearman'], spearman)
+            self.assertAlmostEqual(result['slope'], slope)
+            self.assertAlmostEqual(result['intercept'], intercept)
+            self.assertAlmostEqual(result['r_squared'], pearson ** 2)
+
+    def test_all_indicators_by_default(self):
+        results = self.client.get('/api/correlations/', {'year': 2023}).json()['results']
+        self.assertEqual([result['indicator'] for result in results], ['IND.0', 'IND.1', 'IND.2', 'IND.3'])
+        self.assertEqual(results[0]['n'], 40)
+        self.assertEqual(results[2]['n'], 36)
+
+    def test_cached_per_dataset_version(self):
+        DatasetVersion.bump(DatasetVersion.WORLDBANK)
+        first = happiness_correlations(['IND.1'], 2023, 2023)
+        with self.assertNumQueries(1):  # Only the dataset version for the cache key
+            self.assertEqual(happiness_correlations(['IND.1'], 2023, 2023), first)
+
+        CountryData.objects.filter(indicator_id='IND.1', year=2023, country_id='C001').delete()
+        rebuild_country_year_facts()
+        DatasetVersion.bump(DatasetVersion.WORLDBANK)
+        self.assertEqual(happiness_correlations(['IND.1'], 2023, 2023)['results'][0]['n'], 39)
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get('/api/correlations/?indicators=NOT.LOADED').status_code, 404)
+        self.assertEqual(self.client.get('/api/correlations/?metric=population').status_code, 400)
+        self.assertEqual(self.client.get('/api/correlations/?year=recent').status_code, 400)
+
+
+class ConditionalGetTests(APITestCase):
+    """API responses carry dataset-version validators and conditional requests skip the view"""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_scaled_dataset(countries=20, indicators=2)
+        DatasetVersion.bump(DatasetVersion.HAPPINESS)
+
+    def test_validators_and_not_modified(self):
+        response = self.client.get('/api/regional-happiness/?year=2023')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'public, no-cache')
+        self.assertIn('Last-Modified', response)
+
+        with self.assertNumQueries(1):  # Only the dataset version
+            cached = self.client.get('/api/regional-happiness/?year=2023', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached['ETag'], response['ETag'])
+        self.assertEqual(cached.content, b'')
+
+        modified_since = self.client.get('/api/regional-happiness/?year=2023', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(modified_since.status_code, 304)
+
+    def test_etag_depends_on_url_and_dataset_version(self):
+        etag = self.client.get('/api/happiness-data/?year=2023')['ETag']
+        self.assertNotEqual(self.client.get('/api/happiness-data/?year=2024')['ETag'], etag)
+
+        DatasetVersion.bump(DatasetVersion.WORLDBANK)
+        response = self.client.get('/api/happiness-data/?year=2023', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_cache_control_per_endpoint(self):
+        with self.settings(DASHBOARD_API_CACHE_CONTROL={'default': 'no-store', 'indicator-list': 'public, max-age=60'}):
+            self.assertEqual(self.client.get('/api/indicators/')['Cache-Control'], 'public, max-age=60')
+            self.assertEqual(self.client.get('/api/countries/')['Cache-Control'], 'no-store')
+
+    def test_errors_are_not_validated(self):
+        self.assertNotIn('ETag', self.client.get('/api/countries/XXX/'))
+        self.assertNotIn('ETag', self.client.get('/api/country-data/'))  # 400 without indicators
+
+    def test_pages_are_validated_by_cursor(self):
+        first = self.client.get('/api/countries/?page_size=5')
+        second = self.client.get(first.json()['next'])
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        revalidated = self.client.get(first.json()['next'], HTTP_IF_NONE_MATCH=second['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+
+
+class APIResponseCacheTests(APITestCase):
+    """Serialized API responses are reused until an ingest bumps the dataset version"""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_scaled_dataset(countries=20, indicators=2)
+        DatasetVersion.bump(DatasetVersion.WORLDBANK)
+
+    def test_repeat_requests_are_served_from_cache(self):
+        first = self.client.get('/api/regional-indicators/Sub-Saharan%20Africa/IND.1/2023/')
+        with self.assertNumQueries(1):  # Only the dataset version
+            second = self.client.get('/api/regional-indicators/Sub-Saharan%20Africa/IND.1/2023/')
+        self.assertEqual(second.content, first.content)
+        self.assertIn('GET', first['Allow'])
+        for header in ('Content-Type', 'ETag', 'Vary', 'Allow'):
+            self.assertEqual(second.get(header), first.get(header))
+
+        # Parameter order does not split entries
+        self.client.get('/api/happiness-data/?year=2023&region=Sub-Saharan%20Africa')
+        with self.assertNumQueries(1):
+            self.client.get('/api/happiness-data/?region=Sub-Saharan%20Africa&year=2023')
+
+        self.assertEqual(
+            response_cache_stats()['regional_indicator_data'], {'hits': 1, 'misses': 1, 'hit_ratio': 0.5}
+        )
+
+    def test_version_bump_invalidates(self):
+        self.assertEqual(len(self.client.get('/api/indicators/').json()['results']), 2)
+        Indicator.objects.create(id='NEW.IND', name='New indicator')
+        self.assertEqual(len(self.client.get('/api/indicators/').json()['results']), 2)
+        DatasetVersion.bump(DatasetVersion.WORLDBANK)
+        self.assertEqual(len(self.client.get('/api/indicators/').json()['results']), 3)
+
+    def test_errors_are_not_cached(self):
+        self.client.get('/api/countries/XXX/')
+        with CaptureQueriesContext(connection) as captured:
+            self.assertEqual(self.client.get('/api/countries/XXX/').status_code, 404)
+        self.assertGreater(len(captured.captured_queries), 1)
+
+    def test_entries_are_kept_per_origin(self):
+        """Absolute ``next`` links point back at the host and scheme the page was requested on"""
+        url = '/api/countries/?page_size=5'
+        self.assertTrue(self.client.get(url).json()['next'].startswith('http://testserver/api/countries/'))
+        self.assertTrue(self.client.get(url, HTTP_HOST='localhost').json()['next'].startswith('http://localhost/'))
+        self.assertTrue(self.client.get(url, secure=True).json()['next'].startswith('https://testserver/'))
+        with self.assertNumQueries(1):
+            self.assertTrue(self.client.get(url, HTTP_HOST='localhost').json()['next'].startswith('http://localhost/'))
+
+    def test_prewarm_command(self):
+        output = StringIO()
+        call_command('prewarm_api_cache', host='testserver', stdout=output)
+        self.assertIn('Warmed', output.getvalue())
+        with self.assertNumQueries(1):
+            self.client.get('/api/regional-happiness/?year=2023')
+        with self.assertNumQueries(1):
+            self.client.get('/api/cross-section/2021/columns/')
+
+    def test_prewarm_refuses_a_process_local_cache(self):
+        output = StringIO()
+        with self.settings(DASHBOARD_API_RESPONSE_CACHE={'CACHE': 'default'}):
+            call_command('prewarm_api_cache', host='testserver', stdout=output)
+        self.assertIn("'default' is local to each process", output.getvalue())
+        self.assertNotIn('Warmed', output.getvalue())
+        self.assertEqual(response_cache_stats(), {})
+
+
+class QueryCountMixin:
+    """Every API endpoint runs the same fixed number of queries however many rows it returns.
+
+    Counts include the dataset version read by the conditional GET middleware;
+    the response cache is disabled so each request reaches its view.
+    """
+
+    countries = None
+    EXPECTED_QUERIES = {
+        '/api/countries/': 2,  # Version, page
+        '/api/countries/C001/': 2,
+        f'/api/countries/by_region/?region={quote(REGIONS[1])}': 2,
+        '/api/indicators/': 2,
+        '/api/happiness-data/': 2,
+        f'/api/happiness-data/?year=2023&region={quote(REGIONS[1])}': 2,
+        '/api/happiness-data/?count=true': 3,  # Plus the total, only when asked for
+        '/api/happiness-data/C001/': 2,
+        '/api/country-data/C001/IND.0/': 2,
+        f'/api/country-data/?indicators=IND.0&region={quote(REGIONS[1])}': 2,
+        '/api/regional-happiness/': 2,
+        '/api/regional-happiness/?year=2023': 2,
+        f'/api/regional-indicators/{quote(REGIONS[1])}/IND.0/2023/': 2,
+        '/api/cross-section/2023/?indicators=IND.0': 3,  # Version, fact columns, one range scan
+        '/api/cross-section/2023/columns/': 5,  # Plus the payload cache's version and the indicator list
+        '/api/correlations/?year=2023': 6,  # Plus the indicator names
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        create_scaled_dataset(countries=cls.countries, indicators=1)
+
+    def test_query_counts(self):
+        with self.settings(DASHBOARD_API_RESPONSE_CACHE=None):
+            for url, expected in self.EXPECTED_QUERIES.items():
+                cache.clear()
+                with self.subTest(url=url), self.assertNumQueries(expected):
+                    response = self.client.get(url)
+                    self.assertEqual(response.status_code, 200)
+
+
+class SmallQueryCountTests(QueryCountMixin, APITestCase):
+    countries = 2  # 12 country-years
+
+
+class LargeQueryCountTests(QueryCountMixin, APITestCase):
+    countries = 170  # 1,020 country-years
+
+
+class KeysetPaginationTests(APITestCase):
+    """Listings page by cursor over a unique ordering, without counting unless asked"""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_scaled_dataset(countries=30, indicators=1)
+        # Ties on the ranking columns and unscored rows, which sort last
+        HappinessData.objects.filter(country_id__in=['C001', 'C002', 'C003']).update(ladder_score=Decimal('5.5000'))
+        HappinessData.objects.filter(country_id='C004').update(ladder_score=None)
+
+    def walk(self, url):
+        rows, pages = [], 0
+        while url:
+            data = self.client.get(url).json()
+            rows += data['results']
+            pages += 1
+            url = data['next']
+        return rows, pages
+
+    def test_pages_cover_the_ordering_once(self):
+        rows, pages = self.walk('/api/happiness-data/?page_size=7')
+        expected = list(HappinessData.objects.order_by('-ladder_score', 'year', 'id'))
+        self.assertEqual(pages, 26)  # 180 rows
+        self.assertEqual([(row['country_name'], row['year']) for row in rows], [(h.country_name, h.year) for h in expected])
+        self.assertEqual([row['ladder_score'] for row in rows[-6:]], [None] * 6)
+
+        rows, _ = self.walk('/api/countries/?page_size=4')
+        self.assertEqual([row['id'] for row in rows], [f'C{index:03d}' for index in range(30)])
+
+    def test_filters_carry_over_to_later_pages(self):
+        rows, pages = self.walk(f'/api/happiness-data/?year=2023&region={quote(REGIONS[1])}&page_size=3')
+        self.assertEqual(pages, 3)
+        self.assertEqual(len(rows), 8)
+        self.assertEqual({(row['year'], row['region']) for row in rows}, {(2023, REGIONS[1])})
+
+    def test_page_size_and_count(self):
+        data = self.client.get('/api/countries/').json()
+        self.assertEqual(set(data), {'next', 'results'})
+        self.assertEqual(len(data['results']), 30)
+        self.assertIsNone(data['next'])
+
+        data = self.client.get('/api/happiness-data/?page_size=5000&count=true').json()
+        self.assertEqual(len(data['results']), 180)
+        self.assertEqual(data['count'], 180)
+        self.assertEqual(len(self.client.get('/api/happiness-data/?page_size=0').json()['results']), 100)
+
+        next_page = self.client.get('/api/happiness-data/?count=true').json()['next']
+        self.assertNotIn('count=', next_page)
+
+        with patch.object(KeysetPagination, 'max_page_size', 20):
+            self.assertEqual(len(self.client.get('/api/happiness-data/?page_size=50').json()['results']), 20)
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get('/api/happiness-data/?cursor=not-a-cursor').status_code, 404)
+        self.assertEqual(self.client.get('/api/happiness-data/?cursor=WzFd').status_code, 404)  # [1]
+
+    def test_cursor_values_of_the_wrong_type(self):
+        """Tampered values are refused as their ordering fields would refuse them, not passed to the database"""
+        for position in (
+            ['abc', 2020, 1], [{'a': 1}, 2020, 1], ['5.0', 'x', 1], ['5.0', 2020, [1]], ['NaN', 2020, 1],
+            ['5.0', 2 ** 70, 1], ['5.0', None, 1],
+        ):
+            cursor = quote(b64encode(json.dumps(position).encode()).decode())
+            with self.subTest(position=position):
+                self.assertEqual(self.client.get(f'/api/happiness-data/?cursor={cursor}').status_code, 404)
+
+        # Well-formed values of another JSON type are converted, and NULL is allowed where the column has NULLs
+        for position in ([5, '2020', '1'], [None, 2020, 1]):
+            cursor = quote(b64encode(json.dumps(position).encode()).decode())
+            with self.subTest(position=position):
+                self.assertEqual(self.client.get(f'/api/happiness-data/?cursor={cursor}').status_code, 200)
@@ -19,13 +19,22 @@ urlpatterns = [
     path('regional-comparison/', views.RegionalComparisonView.as_view(), name='regional_comparison'),
     
     # API endpoints
+    # The happiness-data detail route only matches numeric ids, so country codes fall through to this one
     path('api/', include(router.urls)),
-    path('api/country-data/<str:country_code>/<str:indicator_code>/', 
-         views.CountryIndicatorDataView.as_view(), name='country_indicator_data'),
     path('api/happiness-data/<str:country_code>/', 
          views.CountryHappinessDataView.as_view(), name='country_happiness_data'),
+    path('api/country-data/', 
+         views.CountryIndicatorBatchView.as_view(), name='country_indicator_batch'),
+    path('api/country-data/<str:country_code>/<str:indicator_code>/', 
+         views.CountryIndicatorDataView.as_view(), name='country_indicator_data'),
     path('api/regional-happiness/', 
          views.RegionalHappinessAPIView.as_view(), name='regional_happiness_api'),
     path('api/regional-indicators/<str:region>/<str:indicator_code>/<int:year>/', 
          views.RegionalIndicatorDataView.as_view(), name='regional_indicator_data'),
+    path('api/cross-section/<int:year>/', 
+         views.CrossSectionView.as_view(), name='cross_section'),
+    path('api/cross-section/<int:year>/columns/', 
+         views.ColumnarYearView.as_view(), name='cross_section_columns'),
+    path('api/correlations/', 
+         views.HappinessCorrelationAPIView.as_view(), name='happiness_correlations'),
 ]
\ No newline at end of file
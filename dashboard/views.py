@@ -1,6 +1,6 @@
 from django.shortcuts import render
 from django.views.generic import TemplateView
-from django.db.models import Avg, Count
+from django.db.models import Exists, OuterRef, Q, Subquery
 from rest_framework import viewsets, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -8,7 +8,9 @@ from rest_framework.decorators import action
 import logging
 import traceback
 
-from .models import Country, Indicator, CountryData, HappinessData
+from .analytics import cube_enabled, get_cube, happiness_correlations
+from .facts import HAPPINESS_COLUMNS, UnknownIndicatorError, read_columnar_year, read_cross_section
+from .models import Country, Indicator, CountryData, HappinessData, RegionalAggregate
 from .serializers import (
     CountrySerializer, IndicatorSerializer, CountryDataSerializer,
     HappinessDataSerializer, RegionalHappinessSerializer
@@ -87,7 +89,7 @@ class RegionalComparisonView(TemplateView):
 
 # API ViewSets
 class CountryViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Country.objects.all().order_by('name')
+    queryset = Country.objects.all().order_by('name', 'id')
     serializer_class = CountrySerializer
     
     @action(detail=False, methods=['get'])
@@ -103,13 +105,14 @@ class CountryViewSet(viewsets.ReadOnlyModelViewSet):
 
 
 class IndicatorViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Indicator.objects.all().order_by('name')
+    queryset = Indicator.objects.all().order_by('name', 'id')
     serializer_class = IndicatorSerializer
 
 
 class HappinessDataViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = HappinessData.objects.all().order_by('-ladder_score', 'year')
+    queryset = HappinessData.objects.all().order_by('-ladder_score', 'year', 'id')
     serializer_class = HappinessDataSerializer
+    lookup_value_regex = '[0-9]+'  # Leaves /api/happiness-data/<country_code>/ to CountryHappinessDataView
     
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -140,45 +143,43 @@ class CountryIndicatorDataView(APIView):
         logger.info(f"CountryIndicatorDataView called with country: {country_code}, indicator: {indicator_code}")
         
         try:
-            # Check if country exists
-            try:
-                country = Country.objects.get(id=country_code)
-                logger.info(f"Found country: {country.name}")
-            except Country.DoesNotExist:
-                logger.error(f"Country not found: {country_code}")
-                available_countries = list(Country.objects.values_list('id', 'name')[:10])
-                logger.info(f"Available countries (first 10): {available_countries}")
-                return Response(
-                    {'error': f'Country not found: {country_code}', 'available_countries': available_countries}, 
-                    status=status.HTTP_404_NOT_FOUND
-                )
+            if cube_enabled():
+                cube = get_cube()
+                # Unknown codes and empty series fall through to the ORM path for its error details
+                if country_code in cube.country_index and indicator_code in cube.indicator_index:
+                    data = cube.indicator_series(country_code, indicator_code)
+                    if data:
+                        return Response(data)
             
-            # Check if indicator exists
-            try:
-                indicator = Indicator.objects.get(id=indicator_code)
-                logger.info(f"Found indicator: {indicator.name}")
-            except Indicator.DoesNotExist:
-                logger.error(f"Indicator not found: {indicator_code}")
-                available_indicators = list(Indicator.objects.values_list('id', 'name'))
-                logger.info(f"Available indicators: {available_indicators}")
-                return Response(
-                    {'error': f'Indicator not found: {indicator_code}', 'available_indicators': available_indicators}, 
-                    status=status.HTTP_404_NOT_FOUND
-                )
-            
-            # Get the data
-            data = CountryData.objects.filter(
-                country=country,
-                indicator=indicator
-            ).order_by('date')
-            
-            logger.info(f"Found {data.count()} data points for {country.name} - {indicator.name}")
+            # One query for the series; the lookups behind the error responses only run when it is empty
+            data = list(
+                CountryData.objects.filter(country_id=country_code, indicator_id=indicator_code)
+                .select_related('country', 'indicator').order_by('year')
+            )
+            logger.info(f"Found {len(data)} data points for {country_code} - {indicator_code}")
             
-            if data.count() == 0:
+            if not data:
+                country = Country.objects.filter(id=country_code).first()
+                if country is None:
+                    logger.error(f"Country not found: {country_code}")
+                    available_countries = list(Country.objects.values_list('id', 'name')[:10])
+                    return Response(
+                        {'error': f'Country not found: {country_code}', 'available_countries': available_countries}, 
+                        status=status.HTTP_404_NOT_FOUND
+                    )
+                
+                indicator = Indicator.objects.filter(id=indicator_code).first()
+                if indicator is None:
+                    logger.error(f"Indicator not found: {indicator_code}")
+                    available_indicators = list(Indicator.objects.values_list('id', 'name'))
+                    return Response(
+                        {'error': f'Indicator not found: {indicator_code}', 'available_indicators': available_indicators}, 
+                        status=status.HTTP_404_NOT_FOUND
+                    )
+                
                 logger.warning(f"No data found for {country.name} - {indicator.name}")
                 # Show what data is available for this country
                 available_data = CountryData.objects.filter(country=country).values_list('indicator__name', flat=True).distinct()
-                logger.info(f"Available indicators for {country.name}: {list(available_data)}")
                 return Response({
                     'error': 'No data available for this country/indicator combination',
                     'country': country.name,
@@ -199,27 +200,80 @@ class CountryIndicatorDataView(APIView):
             )
 
 
+class CountryIndicatorBatchView(APIView):
+    """Get time series for many countries and indicators in one request
+    
+    Countries are chosen with ``countries`` (comma separated codes), ``region``
+    and ``income_level``; ``indicators`` is required and ``start_year`` and
+    ``end_year`` bound the range. Series are grouped by country, then indicator,
+    as parallel year and value lists.
+    """
+    
+    def get(self, request):
+        params = request.query_params
+        country_codes = [code for code in params.get('countries', '').split(',') if code]
+        indicator_codes = [code for code in params.get('indicators', '').split(',') if code]
+        if not indicator_codes:
+            return Response(
+                {'error': 'At least one indicator code is required'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            start_year = int(params['start_year']) if params.get('start_year') else None
+            end_year = int(params['end_year']) if params.get('end_year') else None
+        except ValueError:
+            return Response(
+                {'error': 'start_year and end_year must be years'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        data = CountryData.objects.filter(indicator_id__in=indicator_codes, year__isnull=False)
+        if country_codes:
+            data = data.filter(country_id__in=country_codes)
+        if params.get('region'):
+            data = data.filter(country__region_value=params['region'])
+        if params.get('income_level'):
+            data = data.filter(country__income_level_value=params['income_level'])
+        if start_year is not None:
+            data = data.filter(year__gte=start_year)
+        if end_year is not None:
+            data = data.filter(year__lte=end_year)
+        
+        # One query in (country, indicator, year) order, so each series is built in a single pass
+        countries = {}
+        series = {}
+        rows = data.order_by('country_id', 'indicator_id', 'year').values_list(
+            'country_id', 'country__name', 'indicator_id', 'year', 'value'
+        )
+        for country_id, country_name, indicator_id, year, value in rows:
+            countries[country_id] = country_name
+            points = series.setdefault(country_id, {}).setdefault(indicator_id, {'years': [], 'values': []})
+            points['years'].append(year)
+            points['values'].append(float(value) if value is not None else None)
+        
+        return Response({'countries': countries, 'series': series})
+
+
 class CountryHappinessDataView(APIView):
     """Get happiness data for a specific country across all years"""
     
     def get(self, request, country_code):
-        try:
-            country = Country.objects.get(id=country_code)
-        except Country.DoesNotExist:
+        # Rows are linked to their country at ingest; unlinked rows still match by name.
+        # Both branches are index lookups, answered together in one query.
+        country_name = Country.objects.filter(id=country_code).values('name')[:1]
+        happiness_data = list(
+            HappinessData.objects.filter(
+                Q(country_id=country_code) | Q(country__isnull=True, country_name=Subquery(country_name))
+            ).order_by('year')
+        )
+        
+        if not happiness_data and not Country.objects.filter(id=country_code).exists():
             return Response(
                 {'error': 'Country not found'}, 
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        # Try to get data by mapped country first, then by country name
-        happiness_data = HappinessData.objects.filter(country=country).order_by('year')
-        
-        if not happiness_data.exists():
-            # Fallback to country name matching
-            happiness_data = HappinessData.objects.filter(
-                country_name=country.name
-            ).order_by('year')
-        
         serializer = HappinessDataSerializer(happiness_data, many=True)
         return Response(serializer.data)
 
@@ -232,25 +286,16 @@ class RegionalHappinessAPIView(APIView):
         
         try:
             year = request.query_params.get('year')
+            income_level = request.query_params.get('income_level', RegionalAggregate.ALL_INCOME_LEVELS)
             
-            # Since HappinessData.region is empty, we need to join with Country model
-            # to get region information from World Bank data
-            queryset = HappinessData.objects.select_related('country').filter(
-                country__isnull=False,
-                country__region_value__isnull=False
-            ).exclude(country__region_value='')
-            
-            logger.info(f"Initial queryset count (with country regions): {queryset.count()}")
-            
+            # Summaries are materialized by the loaders, grouped by the countries' World Bank regions
+            queryset = RegionalAggregate.objects.filter(metric='ladder_score', income_level=income_level)
             if year:
                 queryset = queryset.filter(year=year)
-                logger.info(f"Filtered queryset for year {year}: {queryset.count()}")
             
-            # Group by country region and year, calculate averages
-            regional_data = queryset.values('country__region_value', 'year').annotate(
-                avg_ladder_score=Avg('ladder_score'),
-                country_count=Count('id')
-            ).order_by('country__region_value', 'year')
+            regional_data = list(
+                queryset.order_by('region', 'year').values('region', 'year', 'mean', 'country_count')
+            )
             
             logger.info(f"Regional data aggregation result: {len(regional_data)} records")
             
@@ -271,9 +316,9 @@ class RegionalHappinessAPIView(APIView):
             transformed_data = []
             for item in regional_data:
                 transformed_data.append({
-                    'region': item['country__region_value'],
+                    'region': item['region'],
                     'year': item['year'],
-                    'avg_ladder_score': item['avg_ladder_score'],
+                    'avg_ladder_score': item['mean'],
                     'country_count': item['country_count']
                 })
             
@@ -293,23 +338,91 @@ class RegionalIndicatorDataView(APIView):
     """Get indicator data for all countries in a region for a specific year"""
     
     def get(self, request, region, indicator_code, year):
-        try:
-            indicator = Indicator.objects.get(id=indicator_code)
-        except Indicator.DoesNotExist:
+        if cube_enabled():
+            cube = get_cube()
+            if indicator_code in cube.indicator_index:
+                return Response(cube.region_indicator(region, indicator_code, year))
+        
+        # The region is checked per row with EXISTS, so SQLite walks the indicator-year's
+        # (indicator, year, -value) index already in value order instead of sorting a join;
+        # both names for the serializer still come from the same query
+        in_region = Country.objects.filter(id=OuterRef('country_id'), region_value=region)
+        data = list(
+            CountryData.objects.filter(
+                Exists(in_region),
+                indicator_id=indicator_code,
+                year=year
+            ).select_related('country', 'indicator').order_by('-value')
+        )
+        
+        if not data and not Indicator.objects.filter(id=indicator_code).exists():
             return Response(
                 {'error': 'Indicator not found'}, 
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        # Get countries in the region
-        countries = Country.objects.filter(region_value=region)
+        serializer = CountryDataSerializer(data, many=True)
+        return Response(serializer.data)
+
+
+class CrossSectionView(APIView):
+    """Get happiness scores and selected indicators for every country in a year"""
+    
+    def get(self, request, year):
+        indicator_codes = [code for code in request.query_params.get('indicators', '').split(',') if code]
+        region = request.query_params.get('region')
+        
+        # One range scan of the wide country-year fact table instead of a request per country
+        try:
+            rows = read_cross_section(year, indicator_codes, region=region)
+        except UnknownIndicatorError as e:
+            return Response(
+                {'error': f'Indicator not found: {e}'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(rows)
+
+
+class ColumnarYearView(APIView):
+    """Get every country's happiness scores and indicator values for a year as compact columns"""
+    
+    def get(self, request, year):
+        return Response(read_columnar_year(
+            year,
+            region=request.query_params.get('region'),
+            income_level=request.query_params.get('income_level'),
+        ))
+
+
+class HappinessCorrelationAPIView(APIView):
+    """Correlate happiness with indicators across countries for a year or year range"""
+    
+    def get(self, request):
+        params = request.query_params
+        indicator_codes = [code for code in params.get('indicators', '').split(',') if code]
+        metric = params.get('metric', 'ladder_score')
+        if metric not in HAPPINESS_COLUMNS:
+            return Response(
+                {'error': f'Unknown happiness metric: {metric}', 'available_metrics': HAPPINESS_COLUMNS}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        # Get indicator data for these countries
-        data = CountryData.objects.filter(
-            country__in=countries,
-            indicator=indicator,
-            date=str(year)
-        ).select_related('country').order_by('-value')
+        try:
+            if params.get('year'):
+                start_year = end_year = int(params['year'])
+            else:
+                start_year = int(params['start_year']) if params.get('start_year') else None
+                end_year = int(params['end_year']) if params.get('end_year') else None
+        except ValueError:
+            return Response(
+                {'error': 'year, start_year and end_year must be years'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        serializer = CountryDataSerializer(data, many=True)
-        return Response(serializer.data)
\ No newline at end of file
+        try:
+            return Response(happiness_correlations(indicator_codes, start_year, end_year, metric=metric))
+        except UnknownIndicatorError as e:
+            return Response(
+                {'error': f'Indicator not found: {e}'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
@@ -0,0 +1,214 @@
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+from requests.adapters import BaseAdapter
+
+REGIONS = [
+    ('EAS', 'East Asia & Pacific'),
+    ('ECS', 'Europe & Central Asia'),
+    ('LCN', 'Latin America & Caribbean'),
+    ('MEA', 'Middle East & North Africa'),
+    ('NAC', 'North America'),
+    ('SAS', 'South Asia'),
+    ('SSF', 'Sub-Saharan Africa'),
+]
+INCOME_LEVELS = [
+    ('HIC', 'High income'),
+    ('UMC', 'Upper middle income'),
+    ('LMC', 'Lower middle income'),
+    ('LIC', 'Low income'),
+]
+CODE_ALPHABET = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
+
+
+def _code(index: int, length: int) -> str:
+    """Deterministic fixed-length code for a synthetic country"""
+    chars = []
+    for _ in range(length):
+        index, remainder = divmod(index, len(CODE_ALPHABET))
+        chars.append(CODE_ALPHABET[remainder])
+    return ''.join(reversed(chars))
+
+
+class WorldBankStubAdapter(BaseAdapter):
+    """Offline stand-in for the World Bank v2 API, mounted as a requests transport adapter.
+
+    Serves deterministic synthetic JSON for ``/country``, ``/sources``,
+    ``/indicator/{id}`` and ``/country/{c}/indicator/{i}`` (including the ``all``
+    and ``A;B`` forms), paginated by ``page``/``per_page`` like the real API,
+    with ETags for conditional requests and a configurable per-request latency.
+    ``error_rate`` and ``throttle_rate`` make that share of requests fail with a
+    503 or a 429 carrying ``Retry-After``, to exercise the client's retry policy.
+    ``scale`` multiplies the number of countries (217 at 1x, plus 49 aggregates).
+    """
+
+    BASE_COUNTRIES = 217
+    AGGREGATES = 49
+    LAST_UPDATED = '2025-07-01'
+
+    request_count = 0
+    _count_lock = threading.Lock()
+
+    def __init__(self, scale: int = 1, latency: float = 0.0, last_updated: str = LAST_UPDATED,
+                 null_ratio: float = 0.1, seed: int = 0, error_rate: float = 0.0, throttle_rate: float = 0.0):
+        super().__init__()
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self._random = random.Random(seed)
+        self.last_updated = last_updated
+        self.null_ratio = null_ratio
+        self.seed = seed
+        self.countries = self._build_countries(self.BASE_COUNTRIES * scale)
+
+    @classmethod
+    def reset_count(cls):
+        with cls._count_lock:
+            cls.request_count = 0
+
+    def _build_countries(self, count: int) -> List[Dict]:
+        countries = []
+        for index in range(self.AGGREGATES):
+            countries.append({
+                'id': 'Z' + _code(index, 2), 'iso2Code': f'{index // 26 + 1}{chr(65 + index % 26)}', 'name': f'Aggregate {index + 1}',
+                'region': {'id': 'NA', 'iso2code': 'NA', 'value': 'Aggregates'},
+                'adminregion': {'id': '', 'iso2code': '', 'value': ''},
+                'incomeLevel': {'id': 'NA', 'iso2code': 'NA', 'value': 'Aggregates'},
+                'lendingType': {'id': '', 'iso2code': '', 'value': 'Aggregates'},
+                'capitalCity': '', 'longitude': '', 'latitude': '',
+            })
+        for index in range(count):
+            region_id, region = REGIONS[index % len(REGIONS)]
+            income_id, income = INCOME_LEVELS[index % len(INCOME_LEVELS)]
+            countries.append({
+                'id': _code(index, 3), 'iso2Code': _code(index, 2), 'name': f'Country {index + 1}',
+                'region': {'id': region_id, 'iso2code': region_id[:2], 'value': region},
+                'adminregion': {'id': '', 'iso2code': '', 'value': ''},
+                'incomeLevel': {'id': income_id, 'iso2code': income_id[:2], 'value': income},
+                'lendingType': {'id': 'IBD', 'iso2code': 'XF', 'value': 'IBRD'},
+                'capitalCity': f'Capital {index + 1}',
+                'longitude': f'{(index * 7.3) % 360 - 180:.4f}', 'latitude': f'{(index * 3.1) % 180 - 90:.4f}',
+            })
+        return countries
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        with self._count_lock:
+            WorldBankStubAdapter.request_count += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.error_rate or self.throttle_rate:
+            with self._count_lock:
+                roll = self._random.random()
+            if roll < self.error_rate:
+                return self._response(request, 503, b'Service Unavailable', '')
+            if roll < self.error_rate + self.throttle_rate:
+                response = self._response(request, 429, b'Too Many Requests', '')
+                response.headers['Retry-After'] = '1'
+                return response
+
+        url = urlsplit(request.url)  # urlsplit keeps ";" in the path, as in A;B indicator lists
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        path = re.sub(r'^/v2/', '', url.path).strip('/')
+
+        status, payload = self._route(path, params)
+        body = json.dumps(payload).encode('utf-8')
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        if status == 200 and request.headers.get('If-None-Match') == etag:
+            return self._response(request, 304, b'', etag)
+        return self._response(request, status, body, etag)
+
+    def close(self):
+        pass
+
+    def _response(self, request, status: int, body: bytes, etag: str) -> requests.Response:
+        response = requests.Response()
+        response.status_code = status
+        response._content = body
+        response.headers['Content-Type'] = 'application/json;charset=utf-8'
+        response.headers['ETag'] = etag
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        return response
+
+    def _route(self, path: str, params: Dict[str, str]) -> Tuple[int, list]:
+        parts = path.split('/')
+        if parts == ['country']:
+            return 200, self._paginate(self.countries, params)
+        if parts == ['sources']:
+            sources = [
+                {'id': '2', 'name': 'World Development Indicators', 'code': 'WDI', 'lastupdated': self.last_updated},
+                {'id': '3', 'name': 'Worldwide Governance Indicators', 'code': 'WGI', 'lastupdated': '2024-10-01'},
+            ]
+            return 200, self._paginate(sources, params)
+        if len(parts) == 2 and parts[0] == 'indicator':
+            indicator = {
+                'id': parts[1], 'name': f'Indicator {parts[1]}', 'unit': '',
+                'source': {'id': '2', 'value': 'World Development Indicators'},
+                'sourceNote': 'Synthetic indicator served by the offline stand-in.',
+                'sourceOrganization': 'HappyData offline stand-in',
+            }
+            return 200, self._paginate([indicator], params)
+        if len(parts) == 4 and parts[0] == 'country' and parts[2] == 'indicator':
+            return self._indicator_data(parts[1], parts[3].split(';'), params)
+        return 200, [{'message': [{'id': '120', 'key': 'Invalid value', 'value': 'The provided parameter value is not valid'}]}]
+
+    def _paginate(self, items: List, params: Dict[str, str], extra: Dict = None) -> list:
+        per_page = int(params.get('per_page', 50))
+        page = int(params.get('page', 1))
+        pages = max(1, math.ceil(len(items) / per_page))
+        metadata = {'page': page, 'pages': pages, 'per_page': per_page, 'total': len(items), **(extra or {})}
+        return [metadata, items[(page - 1) * per_page:page * per_page] or None]
+
+    def _indicator_data(self, country_part: str, indicator_codes: List[str], params: Dict[str, str]):
+        if len(indicator_codes) > 1 and 'source' not in params:
+            return 200, [{'message': [{'id': '160', 'key': 'Parameter missing', 'value': 'source is required'}]}]
+
+        if country_part.lower() == 'all':
+            countries = self.countries
+        else:
+            wanted = {code.upper() for code in country_part.split(';')}
+            countries = [c for c in self.countries if c['id'] in wanted or c['iso2Code'] in wanted]
+        start_year, _, end_year = params.get('date', '2020:2025').partition(':')
+        years = list(range(int(end_year or start_year), int(start_year) - 1, -1))  # Newest first, like the API
+
+        # Records are generated only for the requested page
+        per_page = int(params.get('per_page', 50))
+        page = int(params.get('page', 1))
+        total = len(indicator_codes) * len(countries) * len(years)
+        records = []
+        for position in range((page - 1) * per_page, min(page * per_page, total)):
+            indicator_index, rest = divmod(position, len(countries) * len(years))
+            country_index, year_index = divmod(rest, len(years))
+            records.append(self._record(indicator_codes[indicator_index], countries[country_index], years[year_index]))
+
+        metadata = {
+            'page': page, 'pages': max(1, math.ceil(total / per_page)), 'per_page': per_page, 'total': total,
+            'sourceid': params.get('source', '2'), 'lastupdated': self.last_updated,
+        }
+        return 200, [metadata, records or None]
+
+    def _record(self, indicator_code: str, country: Dict, year: int) -> Dict:
+        digest = hashlib.blake2b(f'{self.seed}|{indicator_code}|{country["id"]}|{year}'.encode(), digest_size=8).digest()
+        fraction = int.from_bytes(digest, 'big') / 2 ** 64
+        value: Optional[float] = None
+        if fraction >= self.null_ratio:
+            value = round(fraction * 100000, 4)
+        return {
+            'indicator': {'id': indicator_code, 'value': f'Indicator {indicator_code}'},
+            'country': {'id': country['iso2Code'], 'value': country['name']},
+            'countryiso3code': country['id'],
+            'date': str(year),
+            'value': value,
+            'unit': '',
+            'obs_status': '',
+            'decimal': 1,
+        }
@@ -49,6 +49,10 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'dashboard.snapshots.SnapshotMiddleware',
+    # After the snapshot middleware, so validators come from the version being served
+    'dashboard.conditional.DatasetConditionalGetMiddleware',
+    'dashboard.api_cache.DatasetResponseCacheMiddleware',
 ]
 
 ROOT_URLCONF = 'happydata.urls'
@@ -81,6 +85,20 @@ DATABASES = {
     }
 }
 
+# Serve dashboard reads from immutable snapshots of db.sqlite3 published after each
+# load (dashboard/snapshots.py), so ingest never contends with or exposes partial data
+# to web requests. Set to e.g. {'DIR': BASE_DIR / 'snapshots', 'KEEP': 3} to enable;
+# KEEP is how many versions stay on disk for rollback, MMAP_SIZE the bytes memory-mapped.
+DASHBOARD_SNAPSHOTS = None
+
+if DASHBOARD_SNAPSHOTS:
+    DATABASES['snapshot'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': '',  # Set per request to the current snapshot's read-only URI
+    }
+
+DATABASE_ROUTERS = ['dashboard.snapshots.SnapshotRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -126,10 +144,71 @@ REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
         'rest_framework.renderers.JSONRenderer',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'dashboard.pagination.KeysetPagination',
     'PAGE_SIZE': 100
 }
 
+# Answer the country, regional indicator and regional happiness APIs from an
+# in-memory NumPy copy of the data instead of the database (dashboard/analytics.py).
+# The copy is rebuilt whenever an ingest bumps a DatasetVersion.
+DASHBOARD_ANALYTIC_CUBE = False
+
+# Cache-Control for the dashboard APIs, keyed by URL name with 'default' for the rest.
+# Responses carry ETag/Last-Modified derived from the DatasetVersions, so 'no-cache'
+# lets browsers keep them and revalidate cheaply; a max-age skips even that round trip
+# at the cost of serving the previous data for that long after an ingest.
+DASHBOARD_API_CACHE_CONTROL = {
+    'default': 'public, no-cache',
+    # 'indicator-list': 'public, max-age=3600',
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Shared by every web worker and by management commands such as prewarm_api_cache
+    'api_responses': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / '.cache' / 'api_responses',
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+}
+
+# Server-side cache of serialized API responses, keyed by view, query and dataset
+# version so every ingest retires old entries. CACHE names an entry in CACHES; it must
+# be shared between processes (file, database, memcached or Redis) for prewarming and
+# hit counts to reach the web workers. Set to None to disable.
+# Warm it after a load with `python manage.py prewarm_api_cache`.
+DASHBOARD_API_RESPONSE_CACHE = {
+    'CACHE': 'api_responses',
+    'TIMEOUT': 24 * 60 * 60,  # Seconds; entries of older dataset versions expire unused
+}
+
+# World Bank API client
+# Responses are cached on disk across runs; stale entries are revalidated with
+# ETag/Last-Modified and least recently used entries are evicted past MAX_BYTES.
+WORLDBANK_RESPONSE_CACHE = {
+    'PATH': BASE_DIR / '.cache' / 'worldbank_responses.sqlite3',
+    'MAX_BYTES': 256 * 1024 * 1024,
+    'MAX_AGE': 3600,  # Seconds before an entry is revalidated
+}
+
+# Rate limiting, retry and circuit breaker policy for World Bank API requests
+WORLDBANK_CLIENT_POLICY = {
+    'RATE': 10,  # Requests per second, with bursts of up to BURST
+    'BURST': 20,
+    'MAX_ATTEMPTS': 4,
+    'BACKOFF_BASE': 0.5,  # Seconds; doubled per attempt with full jitter, up to BACKOFF_CAP
+    'BACKOFF_CAP': 30,
+    'FAILURE_THRESHOLD': 5,  # Consecutive failures before the circuit breaker opens
+    'RESET_TIMEOUT': 30,  # Seconds before an open circuit lets a trial request through
+    'LATENCY_TARGET': 5.0,  # Seconds; slower responses lower the concurrency limit
+}
+
+# Set to e.g. {'SCALE': 10, 'LATENCY': 0.2} to replace the World Bank API with the
+# offline stand-in in dashboard/worldbank_stub.py (used by `manage.py benchmark`)
+WORLDBANK_OFFLINE_STUB = None
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 